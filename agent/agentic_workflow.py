@@ -1,9 +1,14 @@
+import time
+from typing import Any, AsyncIterator, Dict, Iterator
 from langgraph.graph import StateGraph, MessagesState, END, START
 from langgraph.prebuilt import ToolNode, tools_condition
 from utils.model_loader import ModelLoader
+from utils.answer_cache import get_answer_cache
+from utils.graph_streaming import astream_events, node_started, stream_events
 from tools.web_search_tool import WebSearchTool
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import tool
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
 from prompt_library.prompt import SYSTEM_PROMPT_IPO, SYSTEM_PROMPT_ORCHESTRATOR 
 
 class IPOAdvisorAgent:
@@ -14,7 +19,7 @@ class IPOAdvisorAgent:
         
         # IPO-specific tools with enhanced Tavily search
         self.web_search_tool = WebSearchTool()
-        self.tools = self.web_search_tool.get_tools()  # Gets all 4 tools including new ones
+        self.tools = self.web_search_tool.get_tools()  # Gets all search tools including the local document index
         self.llm_with_tools = self.llm.bind_tools(self.tools)
         self.system_prompt = SYSTEM_PROMPT_IPO
         
@@ -25,8 +30,8 @@ class IPOAdvisorAgent:
         """Build the IPO agent workflow graph"""
         graph_builder = StateGraph(MessagesState)
         
-        # Add nodes
-        graph_builder.add_node("ipo_agent", self._ipo_agent_function)
+        # Add nodes (the agent node runs natively under both invoke and ainvoke)
+        graph_builder.add_node("ipo_agent", RunnableLambda(self._ipo_agent_function, afunc=self._aipo_agent_function))
         graph_builder.add_node("tools", ToolNode(tools=self.tools))  # Must be named "tools" for tools_condition
         
         # Add edges
@@ -41,11 +46,20 @@ class IPOAdvisorAgent:
 
     def _ipo_agent_function(self, state: MessagesState):
         """IPO agent function for LangGraph"""
+        node_started("ipo_agent")
         messages = state["messages"]
         full_messages = [self.system_prompt] + messages
         response = self.llm_with_tools.invoke(full_messages)
         return {"messages": [response]}
 
+    async def _aipo_agent_function(self, state: MessagesState):
+        """Async IPO agent function for LangGraph"""
+        node_started("ipo_agent")
+        messages = state["messages"]
+        full_messages = [self.system_prompt] + messages
+        response = await self.llm_with_tools.ainvoke(full_messages)
+        return {"messages": [response]}
+
     def process_query(self, query: str) -> str:
         """Process IPO-related queries using the graph"""
         try:
@@ -55,6 +69,38 @@ class IPOAdvisorAgent:
         except Exception as e:
             return f"IPO Agent Error: {str(e)}"
 
+    async def aprocess_query(self, query: str) -> str:
+        """Process IPO-related queries on the event loop; tool calls from one turn run concurrently"""
+        try:
+            initial_state = {"messages": [HumanMessage(content=query)]}
+            result = await self.graph.ainvoke(initial_state)
+            return result["messages"][-1].content
+        except Exception as e:
+            return f"IPO Agent Error: {str(e)}"
+
+    def stream_query(self, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Process an IPO query, yielding node, tool-call and token events as they happen
+
+        Args:
+            query (str): The IPO question
+
+        Returns:
+            Iterator: Event dicts from utils.graph_streaming, ending with a "final" event
+        """
+        try:
+            yield from stream_events(self.graph, {"messages": [HumanMessage(content=query)]}, root_agent="ipo_advisor")
+        except Exception as e:
+            yield {"type": "final", "content": f"IPO Agent Error: {str(e)}", "time_to_first_token": None, "latency": None}
+
+    async def astream_query(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of stream_query"""
+        try:
+            async for event in astream_events(self.graph, {"messages": [HumanMessage(content=query)]}, root_agent="ipo_advisor"):
+                yield event
+        except Exception as e:
+            yield {"type": "final", "content": f"IPO Agent Error: {str(e)}", "time_to_first_token": None, "latency": None}
+
 class OrchestratorAgent:
     """Main orchestrator agent that routes queries to specialized agents"""
     def __init__(self, model_provider: str = "groq_oss"):
@@ -87,10 +133,12 @@ class OrchestratorAgent:
 
         self.system_prompt = SYSTEM_PROMPT_ORCHESTRATOR
 
+        # Paraphrases of recently answered questions skip the whole graph
+        self.answer_cache = get_answer_cache()
+
     def _create_agent_tools(self):
         """Create tools that represent specialized agents"""
         
-        @tool
         def ipo_advisor_agent(query: str) -> str:
             """
             Get IPO advice and information. Use for IPO-related queries.
@@ -107,16 +155,25 @@ class OrchestratorAgent:
             except Exception as e:
                 return f"Error from IPO Advisor: {str(e)}"
         
+        async def aipo_advisor_agent(query: str) -> str:
+            """Async counterpart of ipo_advisor_agent"""
+            try:
+                result = await self.ipo_agent.aprocess_query(query)
+                return f"IPO Advisor Response:\n{result}"
+            except Exception as e:
+                return f"Error from IPO Advisor: {str(e)}"
+        
         # Future: Add more agent tools here
         # @tool
         # def stock_advisor_agent(query: str) -> str:
         #     """Route stock-related queries to stock advisor agent"""
         #     return self.stock_agent.process_query(query)
         
-        return [ipo_advisor_agent]
+        return [StructuredTool.from_function(func=ipo_advisor_agent, coroutine=aipo_advisor_agent)]
 
     def orchestrator_function(self, state: MessagesState):
         """Main orchestrator function that routes queries"""
+        node_started("orchestrator")
         messages = state["messages"]
         
         # Add orchestrator system prompt
@@ -127,12 +184,20 @@ class OrchestratorAgent:
         
         return {"messages": [response]}
 
+    async def aorchestrator_function(self, state: MessagesState):
+        """Async orchestrator function that routes queries"""
+        node_started("orchestrator")
+        messages = state["messages"]
+        full_messages = [self.system_prompt] + messages
+        response = await self.llm_with_tools.ainvoke(full_messages)
+        return {"messages": [response]}
+
     def build_graph(self):
         """Build the orchestrator workflow graph"""
         graph_builder = StateGraph(MessagesState)
         
         # Add nodes
-        graph_builder.add_node("orchestrator", self.orchestrator_function)
+        graph_builder.add_node("orchestrator", RunnableLambda(self.orchestrator_function, afunc=self.aorchestrator_function))
         graph_builder.add_node("tools", ToolNode(tools=self.all_tools))
         
         # Add edges
@@ -155,15 +220,94 @@ class OrchestratorAgent:
         if not hasattr(self, 'graph'):
             self.build_graph()
         
+        cached = self.answer_cache.lookup(user_message) if self.answer_cache is not None else None
+        if cached is not None:
+            return cached["answer"]
+        
         # Create initial state
         initial_state = {
             "messages": [HumanMessage(content=user_message)]
         }
         
         # Run the graph
+        started = time.perf_counter()
         result = self.graph.invoke(initial_state)
+        answer = result["messages"][-1].content
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(user_message, answer, time.perf_counter() - started)
+        return answer
+
+    async def arun(self, user_message: str):
+        """Run the orchestrator on the event loop, e.g. to serve many chat sessions from one process"""
+        if not hasattr(self, 'graph'):
+            self.build_graph()
+        
+        cached = self.answer_cache.lookup(user_message) if self.answer_cache is not None else None
+        if cached is not None:
+            return cached["answer"]
+        
+        initial_state = {
+            "messages": [HumanMessage(content=user_message)]
+        }
+        
+        started = time.perf_counter()
+        result = await self.graph.ainvoke(initial_state)
+        answer = result["messages"][-1].content
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(user_message, answer, time.perf_counter() - started)
+        return answer
+
+    def _cached_final(self, user_message: str):
+        """Final event for a cached answer, or None"""
+        cached = self.answer_cache.lookup(user_message) if self.answer_cache is not None else None
+        if cached is None:
+            return None
+        return {"type": "final", "content": cached["answer"], "cached": True, "time_to_first_token": 0.0, "latency": 0.0}
+
+    def stream(self, user_message: str) -> Iterator[Dict[str, Any]]:
+        """
+        Run the orchestrator, yielding events as they happen: node starts, tool calls and
+        results, and LLM token deltas (including the nested IPO advisor's)
+
+        Args:
+            user_message (str): The user query
+
+        Returns:
+            Iterator: Event dicts from utils.graph_streaming, ending with a "final" event
+        """
+        if not hasattr(self, 'graph'):
+            self.build_graph()
+        
+        final = self._cached_final(user_message)
+        if final is not None:
+            yield final
+            return
+        
+        for event in stream_events(self.graph, {"messages": [HumanMessage(content=user_message)]}, root_agent="orchestrator"):
+            if event["type"] == "final":
+                event["cached"] = False
+                if self.answer_cache is not None:
+                    self.answer_cache.store(user_message, event["content"], event["latency"])
+            yield event
+
+    async def astream(self, user_message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of stream, e.g. to serve many chat sessions from one process"""
+        if not hasattr(self, 'graph'):
+            self.build_graph()
+        
+        final = self._cached_final(user_message)
+        if final is not None:
+            yield final
+            return
         
-        return result["messages"][-1].content
+        async for event in astream_events(self.graph, {"messages": [HumanMessage(content=user_message)]}, root_agent="orchestrator"):
+            if event["type"] == "final":
+                event["cached"] = False
+                if self.answer_cache is not None:
+                    self.answer_cache.store(user_message, event["content"], event["latency"])
+            yield event
 
 # Legacy support - keep the old GraphBuilder name for backward compatibility
 class GraphBuilder(OrchestratorAgent):
@@ -11,6 +11,8 @@ class SimpleOrchestratorAgent:
     def __init__(self, model_provider: str = "groq"):
         self.model_loader = ModelLoader(model_provider=model_provider)
         self.llm = self.model_loader.load_llm()
+        # IPO advisor model, resolved once instead of on every routed query
+        self.ipo_llm = ModelLoader().load_llm()
         
         # Initialize web search tool
         self.web_search_tool = WebSearchTool()
@@ -57,9 +59,8 @@ class SimpleOrchestratorAgent:
                 search_result = ipo_search_tool.invoke(query)
                 
                 # Process with IPO prompt
-                ipo_llm = ModelLoader().load_llm()
                 messages = [SYSTEM_PROMPT_IPO, HumanMessage(content=f"Based on this search data: {search_result}\n\nUser query: {query}")]
-                response = ipo_llm.invoke(messages)
+                response = self.ipo_llm.invoke(messages)
                 
                 return f"IPO Advisor Response:\n{response.content}"
                 
@@ -8,6 +8,7 @@ import streamlit as st
 import time
 from datetime import datetime
 from agent.agentic_workflow import OrchestratorAgent
+from utils.cache_warmer import start_cache_warmer
 from dotenv import load_dotenv
 import os
 
@@ -162,6 +163,8 @@ def initialize_system():
         with st.spinner("🤖 Initializing AI Financial Advisor System..."):
             st.session_state.orchestrator = OrchestratorAgent(model_provider="groq_oss")
             st.session_state.system_initialized = True
+            # Keep the IPO search cache warm in the background (once per process)
+            start_cache_warmer()
             
         st.success("✅ AI Financial Advisor System initialized successfully!")
         return True
@@ -173,28 +176,46 @@ def initialize_system():
 def get_response(query):
     """Get response from the orchestrator"""
     try:
-        with st.spinner("🔄 Processing your query..."):
-            start_time = time.time()
-            response = st.session_state.orchestrator.run(query)
-            processing_time = time.time() - start_time
-            
-            # Determine which agent/tool was used
-            if "IPO Advisor Response:" in response:
-                agent_used = "📊 IPO Advisor Agent (DeepSeek)"
-                route_info = "Specialized IPO Analysis"
-            elif "Search Results" in response or "search_web" in response.lower():
-                agent_used = "🔍 Web Search Tool (Tavily)"
-                route_info = "General Market Research"
-            else:
-                agent_used = "🎯 Orchestrator (Qwen)"
-                route_info = "Direct Response"
-            
-            return {
-                "response": response,
-                "agent_used": agent_used,
-                "route_info": route_info,
-                "processing_time": processing_time
-            }
+        start_time = time.time()
+        status = st.empty()
+        placeholder = st.empty()
+        status.caption("🔄 Processing your query...")
+        
+        # Show progress and token deltas (including the IPO advisor's) while the answer is generated
+        streamed = ""
+        response = ""
+        for event in st.session_state.orchestrator.stream(query):
+            if event["type"] == "node_started":
+                streamed = ""
+                status.caption(f"🤖 {event['agent'].replace('_', ' ').title()} is thinking...")
+            elif event["type"] == "tool_call":
+                status.caption(f"🔧 {event['agent'].replace('_', ' ').title()} is calling {event['name']}...")
+            elif event["type"] == "token":
+                streamed += event["content"]
+                placeholder.markdown(streamed + "▌")
+            elif event["type"] == "final":
+                response = event["content"]
+        status.empty()
+        placeholder.empty()
+        processing_time = time.time() - start_time
+        
+        # Determine which agent/tool was used
+        if "IPO Advisor Response:" in response:
+            agent_used = "📊 IPO Advisor Agent (DeepSeek)"
+            route_info = "Specialized IPO Analysis"
+        elif "Search Results" in response or "search_web" in response.lower():
+            agent_used = "🔍 Web Search Tool (Tavily)"
+            route_info = "General Market Research"
+        else:
+            agent_used = "🎯 Orchestrator (Qwen)"
+            route_info = "Direct Response"
+        
+        return {
+            "response": response,
+            "agent_used": agent_used,
+            "route_info": route_info,
+            "processing_time": processing_time
+        }
     except Exception as e:
         return {
             "response": f"❌ Error: {str(e)}",
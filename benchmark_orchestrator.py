@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark the orchestrator pipeline against a recorded cassette.
+
+Record once with API keys:
+    CASSETTE_MODE=record python benchmark_orchestrator.py
+Then replay offline, without network or API keys:
+    CASSETTE_MODE=replay python benchmark_orchestrator.py
+
+With the cassette on, the persistent caches under .cache/ are swapped for
+in-memory ones, and the answer cache is switched off, so every query runs the
+whole pipeline.
+"""
+
+import os
+import time
+from agent.agentic_workflow import OrchestratorAgent
+from utils.search_runtime import close_search_runtime, get_search_runtime
+
+BENCHMARK_QUERIES = [
+    "Tell me about upcoming IPOs in India with their GMP",
+    "What is the current subscription status of the latest mainboard IPO?",
+    "Which IPOs listed recently and how did they perform?",
+]
+
+
+def main():
+    mode = os.getenv("CASSETTE_MODE", "off")
+    if mode == "off":
+        print("⚠️  CASSETTE_MODE is not set; this run calls the live APIs and records nothing")
+
+    orchestrator = OrchestratorAgent()
+    # A cached final answer would skip the pipeline being measured
+    orchestrator.answer_cache = None
+    timings = []
+    for query in BENCHMARK_QUERIES:
+        started = time.perf_counter()
+        orchestrator.run(query)
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        print(f"⏱️  {elapsed:6.2f}s  {query}")
+
+    print(f"\n📊 Total {sum(timings):.2f}s over {len(timings)} queries ({mode} mode)")
+    print(f"📼 Cassette: {get_search_runtime().stats()['cassette']}")
+    close_search_runtime()
+
+
+if __name__ == "__main__":
+    main()
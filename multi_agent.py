@@ -234,11 +234,7 @@ class MultiAgentWorkflowDemo:
                     self.show_task_status(task_id, "N/A", "Failed", "FAILED")
                 
                 self.log_task("TASK_FAILED", "N/A", query, "FAILED", {"error": error_msg})
-            
-            # Wait between queries to avoid rate limiting
-            if i < len(queries):
-                print(f"\n⏳ Waiting 8 seconds before next query...")
-                time.sleep(8)
+            # No fixed pause between queries: every model call queues through the per-model rate limiter
         
         return successful_tasks, len(queries)
     
@@ -34,7 +34,7 @@ SYSTEM_PROMPT_IPO = SystemMessage(
         ---
 
         💰 **Expected Listing Gain**  
-        - **Est. % Gain on Listing:** Based on GMP and market buzz.  
+        - **Est. % Gain on Listing:** Based on GMP and market buzz. Quote the `calculate_listing_gains` tool output (listing price, gain %, profit per lot, minimum application) instead of calculating by hand.  
         - **Risk Level:** Low / Moderate / High  
         - **Advisory Verdict:**  
         - 📗 Apply for listing gain  
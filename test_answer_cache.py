@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the semantic answer cache in front of OrchestratorAgent.run
+"""
+
+from agent.agentic_workflow import OrchestratorAgent
+from utils.answer_cache import SemanticAnswerCache, match_text
+
+NOW = 1_760_000_000.0
+
+
+def test_paraphrases_hit():
+    """Reworded questions about the same thing reuse the stored answer"""
+    cache = SemanticAnswerCache(":memory:")
+    cache.store("Tell me about upcoming IPOs in India with their GMP", "Upcoming IPO table", 42.0, now=NOW)
+
+    hit = cache.lookup("Show me the upcoming IPOs in India and their GMP", now=NOW + 60)
+    assert hit is not None and hit["answer"] == "Upcoming IPO table"
+    assert hit["similarity"] >= 0.82 and hit["latency_saved"] == 42.0
+
+    assert match_text("What is the GMP of Swiggy IPO?") == match_text("Swiggy IPO GMP")
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["hit_rate"] == 1.0 and stats["latency_saved_seconds"] == 42.0
+    print("✅ Paraphrase served from cache")
+
+
+def test_different_company_or_numbers_miss():
+    """Similar wording about another company or other figures is not a match"""
+    cache = SemanticAnswerCache(":memory:")
+    cache.store("What is the GMP of Swiggy IPO?", "Swiggy GMP answer", 10.0, now=NOW)
+    cache.store("Best IPOs under 15000 rupees", "Cheap IPO answer", 10.0, now=NOW)
+
+    assert cache.lookup("What is the GMP of Zomato IPO?", now=NOW + 10) is None
+    assert cache.lookup("Best IPOs under 20000 rupees", now=NOW + 10) is None
+    assert cache.lookup("Best IPOs under 15000 rupees?", now=NOW + 10)["answer"] == "Cheap IPO answer"
+
+    # Relative dates are compared as the dates they resolve to
+    cache.store("upcoming IPOs this week", "This week's IPOs", 10.0, now=NOW)
+    assert cache.lookup("upcoming IPOs next week", now=NOW + 10) is None
+    print("✅ Company, number and date guards respected")
+
+
+def test_negations_and_modal_verbs_kept():
+    """Negated questions and "should I" advice questions never borrow the opposite answer"""
+    cache = SemanticAnswerCache(":memory:")
+    cache.store("Should I apply for Swiggy IPO?", "Apply answer", 10.0, now=NOW)
+    assert cache.lookup("Should I not apply for Swiggy IPO?", now=NOW + 10) is None
+    assert cache.lookup("Why shouldn't I apply for Swiggy IPO?", now=NOW + 10) is None
+    assert "should" in match_text("Should I apply for Swiggy IPO?").split()
+    assert match_text("I don't want Swiggy") == match_text("I do not want Swiggy")
+
+    # The company is read from the query as typed, not its lower-cased form
+    assert cache.lookup("should I apply for Swiggy IPO", now=NOW + 10)["answer"] == "Apply answer"
+    print("✅ Negations and modal verbs respected")
+
+
+def test_error_answers_not_stored():
+    """Agent and tool error texts are never served from the cache"""
+    cache = SemanticAnswerCache(":memory:")
+    cache.store("What is the Swiggy IPO GMP?", "Error from IPO Advisor: rate limit reached", 3.0, now=NOW)
+    cache.store("Swiggy subscription status", "Error getting subscription status: timeout", 3.0, now=NOW)
+    assert cache.stats()["entries"] == 0
+    print("✅ Error answers skipped")
+
+
+def test_freshness_windows():
+    """Live questions expire sooner than general ones"""
+    cache = SemanticAnswerCache(":memory:", max_age_seconds=1800, live_max_age_seconds=300)
+    cache.store("Swiggy IPO subscription status", "Subscribed 3x", 20.0, now=NOW)
+    cache.store("Explain how IPO allotment works", "Allotment explainer", 20.0, now=NOW)
+
+    assert cache.lookup("Swiggy IPO subscription status", now=NOW + 200) is not None
+    assert cache.lookup("Swiggy IPO subscription status", now=NOW + 400) is None
+    assert cache.lookup("explain how ipo allotment works", now=NOW + 1000) is not None
+    assert cache.lookup("explain how ipo allotment works", now=NOW + 2000) is None
+    print("✅ Freshness windows applied")
+
+
+class FakeGraph:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, state):
+        self.calls += 1
+        return {"messages": [type("Message", (), {"content": f"answer {self.calls}"})()]}
+
+
+def test_orchestrator_run_bypasses_graph():
+    """A cache hit returns without invoking the orchestrator graph"""
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.graph = FakeGraph()
+    orchestrator.answer_cache = SemanticAnswerCache(":memory:")
+
+    assert orchestrator.run("Which IPOs are opening next week?") == "answer 1"
+    assert orchestrator.run("which ipos are opening next week") == "answer 1"
+    assert orchestrator.graph.calls == 1
+    assert orchestrator.answer_cache.stats()["hits"] == 1
+    print("✅ Graph skipped on a cache hit")
+
+
+if __name__ == "__main__":
+    test_paraphrases_hit()
+    test_different_company_or_numbers_miss()
+    test_negations_and_modal_verbs_kept()
+    test_error_answers_not_stored()
+    test_freshness_windows()
+    test_orchestrator_run_bypasses_graph()
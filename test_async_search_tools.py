@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test that the search tools run natively on the event loop
+"""
+
+import asyncio
+import time
+from utils import search_runtime
+from tools.web_search_tool import WebSearchTool
+
+class SlowFakeTavily:
+    """Async Tavily stand-in that takes a fixed time per request"""
+    async def ainvoke(self, query):
+        await asyncio.sleep(0.3)
+        return {"results": [{"title": query, "url": "https://example.com", "content": "IPO data"}]}
+
+def test_tool_calls_run_concurrently(monkeypatch):
+    """Several async tool calls from one turn overlap instead of running serially"""
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    search_runtime.close_search_runtime()
+    runtime = search_runtime.get_search_runtime()
+    runtime.query_generator = None
+    runtime.search_tool.search_tool = SlowFakeTavily()
+    runtime.search_tool.cache = None
+
+    web_tool = WebSearchTool()
+
+    async def run_turn():
+        return await asyncio.gather(
+            web_tool.search_web.ainvoke({"query": "Hyundai IPO"}),
+            web_tool.search_ipo_info.ainvoke({"query": "Swiggy IPO GMP"}),
+            web_tool.tavily_financial_search.ainvoke({"query": "Nifty today"}),
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(run_turn())
+    elapsed = time.perf_counter() - start
+
+    assert "Search Results for: 'Hyundai IPO'" in results[0]
+    assert "IPO Information for: 'Swiggy IPO GMP'" in results[1]
+    assert "FINANCIAL MARKET SEARCH" in results[2]
+    assert elapsed < 0.8
+    print(f"✅ 3 async tool calls finished in {elapsed:.2f}s")
+    search_runtime.close_search_runtime()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the bulk IPO lookup API on TavilyIPOInfoSearch
+"""
+
+import asyncio
+import threading
+import time
+from utils.ipo_info_search import TavilyIPOInfoSearch
+
+
+class SlowSearch:
+    """Search client stand-in that tracks how many calls run at once"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+
+    def _enter(self, query, search_type):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls.append((query, search_type))
+
+    def _leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def invoke(self, query, search_type="general"):
+        self._enter(query, search_type)
+        time.sleep(self.delay)
+        self._leave()
+        return {"query": query, "results": [{"url": f"https://example.com/{search_type}"}]}
+
+    async def ainvoke(self, query, search_type="general"):
+        self._enter(query, search_type)
+        await asyncio.sleep(self.delay)
+        self._leave()
+        return {"query": query, "results": [{"url": f"https://example.com/{search_type}"}]}
+
+
+def make_search(monkeypatch, client):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    ipo_search = TavilyIPOInfoSearch(api_key="test-key", search_tool=client)
+    ipo_search.query_generator = None
+    ipo_search.query_memo = None
+    ipo_search.ipo_store = None
+    return ipo_search
+
+
+def test_search_many_bounded_and_streamed(monkeypatch):
+    """Every (company, kind) pair is looked up once, at most max_concurrency at a time"""
+    client = SlowSearch()
+    ipo_search = make_search(monkeypatch, client)
+    companies = ["Hyundai Motor India", "Swiggy", "swiggy ", "NTPC Green Energy", "Waaree Energies"]
+
+    started = time.perf_counter()
+    lookups = list(ipo_search.search_many(companies, kinds=("gmp", "subscription"), max_concurrency=4))
+    elapsed = time.perf_counter() - started
+
+    assert len(lookups) == 8  # duplicate company dropped
+    assert {lookup.kind for lookup in lookups} == {"gmp", "subscription"}
+    assert all(lookup.result["results"] for lookup in lookups)
+    assert client.peak <= 4
+    assert elapsed < 8 * client.delay
+    print(f"✅ 8 lookups in {elapsed:.2f}s with peak concurrency {client.peak}")
+
+    try:
+        list(ipo_search.search_many(["Swiggy"], kinds=("rhp",)))
+        assert False, "expected ValueError"
+    except ValueError:
+        print("✅ Unknown lookup kinds are rejected")
+
+
+def test_asearch_many(monkeypatch):
+    """The async variant yields in completion order under a semaphore"""
+    client = SlowSearch()
+    ipo_search = make_search(monkeypatch, client)
+
+    async def collect():
+        return [lookup async for lookup in ipo_search.asearch_many(["Swiggy", "Hyundai"], max_concurrency=2)]
+
+    lookups = asyncio.run(collect())
+    assert len(lookups) == 6
+    assert client.peak <= 2
+    assert {(lookup.company, lookup.kind) for lookup in lookups} == {
+        (company, kind) for company in ("Swiggy", "Hyundai") for kind in ("company", "gmp", "subscription")
+    }
+    print("✅ Async bulk lookups complete")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the market-hours cache warmer and the query log it prioritizes with
+"""
+
+from datetime import datetime
+from utils import search_runtime
+from utils.cache_warmer import IST, CacheWarmer, MarketHoursSchedule
+from utils.query_log import QueryLog
+from utils.search_cache import CachedSearchTool, SearchCache
+
+
+class FakeTavily:
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query)
+        return {"query": query, "results": [
+            {"url": "https://example.com/a", "title": "Swiggy IPO GMP today", "score": 0.8,
+             "content": "Swiggy IPO price band ₹371 – ₹390 per share. Swiggy IPO GMP ₹12."},
+            # A list page without IPO facts must not turn its title into a company
+            {"url": "https://example.com/b", "title": "Mainboard IPO Calendar: Dates", "score": 0.7, "content": "See the list."},
+        ]}
+
+
+def test_market_hours_schedule():
+    """Short intervals while the market is open, waking up for the next pre-open"""
+    schedule = MarketHoursSchedule(market_interval_seconds=300, off_hours_interval_seconds=3600, closed_interval_seconds=14400)
+    assert schedule.next_interval(datetime(2026, 10, 15, 11, 0, tzinfo=IST)) == 300  # Thursday, open
+    assert schedule.next_interval(datetime(2026, 10, 15, 20, 0, tzinfo=IST)) == 3600  # Thursday evening
+    assert schedule.next_interval(datetime(2026, 10, 16, 8, 15, tzinfo=IST)) == 15 * 60  # just before pre-open
+    assert schedule.next_interval(datetime(2026, 10, 17, 12, 0, tzinfo=IST)) == 14400  # Saturday
+    print("✅ Schedule follows market hours")
+
+
+def test_query_log_ranks_hot_companies():
+    """Frequently asked-about companies come first"""
+    log = QueryLog(":memory:")
+    for _ in range(3):
+        log.record_query("What is the Swiggy IPO GMP?", "ipo")
+    log.record_query("Hyundai Motor India IPO subscription", "ipo")
+    log.record_company("Hyundai Motor India", "gmp")
+    assert log.hot_companies()[:2] == ["Swiggy", "Hyundai Motor India"]
+    assert log.hot_queries(1) == [("What is the Swiggy IPO GMP?", "ipo")]
+    print("✅ Query log ranks hot companies and queries")
+
+
+def test_run_once_refreshes_cache(tmp_path, monkeypatch):
+    """A warm-up run re-fetches only the cache entries that expire before the next run"""
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    runtime = search_runtime.SearchRuntime()
+    fake = FakeTavily()
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"))
+    tool = CachedSearchTool(fake, cache)
+    runtime.search_tool = tool
+    runtime.ipo_search.search_tool = tool
+    runtime.ipo_search.query_generator = None
+    runtime.ipo_search.ipo_store = None
+    runtime.query_generator = None
+    runtime.query_log = QueryLog(":memory:")
+    runtime.query_log.record_query("Hyundai Motor India IPO GMP", "ipo")
+
+    warmer = CacheWarmer(runtime, max_companies=5, refresh_ahead_seconds=60)
+    first = warmer.run_once()
+    assert first["companies"] == 2  # hot company from the log, then the one extracted from the results
+    calls = len(fake.queries)
+
+    # Nothing is about to expire yet
+    warmer.run_once()
+    assert len(fake.queries) == calls
+
+    # GMP entries now expire within the refresh-ahead window and are re-fetched
+    cache.ttl_seconds["gmp"] = 30
+    for query in [query for query in fake.queries if "GMP" in query]:
+        cache.set(query, "gmp", fake.invoke(query))
+    fake.queries.clear()
+    warmer.run_once()
+    assert fake.queries and all("GMP" in query for query in fake.queries)
+    runtime.close()
+    print(f"✅ Warm-up runs refreshed the cache ({first})")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the record/replay cassette for Tavily and Groq calls
+"""
+
+import asyncio
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from utils import cassette as cassette_module
+from utils import search_cache as search_cache_module
+from utils import search_runtime
+from utils.cassette import Cassette, CassetteChatModel, CassetteMissError, CassetteSearchTool, cassette_cache_settings
+
+
+class FakeTavily:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        return {"query": query, "results": [{"url": "https://example.com/ipo", "content": "GMP ₹50", "score": 0.9}]}
+
+
+def test_record_then_replay(tmp_path):
+    """Recorded searches and chat replies are served offline, with simulated latency"""
+    path = str(tmp_path / "cassette.jsonl.gz")
+
+    recorder = Cassette(path, mode="record", flush_every=1)
+    tavily = FakeTavily()
+    search = CassetteSearchTool(tavily, recorder)
+    recorded_search = search.invoke("Hyundai IPO GMP 17 October 2026")
+
+    inner = GenericFakeChatModel(messages=iter([AIMessage(content="Subscribe for listing gains")]))
+    llm = CassetteChatModel(inner=inner, model_name="fake-model", cassette=recorder)
+    prompt = [SystemMessage(content="Current date: 2026-10-17 09:15:00"), HumanMessage(content="Should I apply?")]
+    assert llm.invoke(prompt).content == "Subscribe for listing gains"
+    assert recorder.stats()["recorded"] == 2
+    print("✅ Search and chat calls recorded")
+
+    player = Cassette(path, mode="replay", latency=0.01)
+    replay_search = CassetteSearchTool(None, player)
+    # The date in the query changed since recording; the recording still matches
+    assert replay_search.invoke("Hyundai IPO GMP 18 October 2026") == recorded_search
+
+    replay_llm = CassetteChatModel(model_name="fake-model", cassette=player)
+    later_prompt = [SystemMessage(content="Current date: 2026-10-18 11:00:00"), HumanMessage(content="Should I apply?")]
+    assert replay_llm.invoke(later_prompt).content == "Subscribe for listing gains"
+    assert asyncio.run(replay_llm.ainvoke(later_prompt)).content == "Subscribe for listing gains"
+    assert player.delay_for({"latency": 3.0}) == 0.01
+    print("✅ Calls replayed without the real clients")
+
+    try:
+        replay_llm.invoke([HumanMessage(content="Never recorded")])
+        assert False, "expected a cassette miss"
+    except CassetteMissError:
+        print("✅ Unrecorded calls fail loudly")
+
+
+def test_runtime_replays_without_api_keys(tmp_path, monkeypatch):
+    """The shared search runtime starts from a cassette with no Tavily key"""
+    path = str(tmp_path / "cassette.jsonl.gz")
+    recorder = Cassette(path, mode="record", flush_every=1)
+    CassetteSearchTool(FakeTavily(), recorder).invoke("upcoming IPO")
+
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setattr(cassette_module, "_cassette", Cassette(path, mode="replay", latency=0))
+    monkeypatch.setattr(cassette_module, "_cassette_loaded", True)
+
+    runtime = search_runtime.SearchRuntime()
+    runtime.search_tool.cache = None
+    assert runtime.search_tool.search_tool.hedge is False  # a hedge would replay the same recording
+    result = runtime.search_tool.invoke("upcoming IPO", search_type="upcoming")
+    assert result["results"][0]["url"] == "https://example.com/ipo"
+    assert runtime.stats()["cassette"]["replayed"] == 1
+    runtime.close()
+    print("✅ Search runtime replays offline")
+
+
+def test_persistent_caches_isolated(tmp_path, monkeypatch):
+    """With the cassette on, caches never read or write the stores under .cache/"""
+    monkeypatch.setattr(cassette_module, "_cassette", None)
+    monkeypatch.setattr(cassette_module, "_cassette_loaded", True)
+    assert cassette_cache_settings("search_cache").get("path") != ":memory:"
+
+    monkeypatch.setattr(cassette_module, "_cassette", Cassette(str(tmp_path / "cassette.jsonl.gz"), mode="replay"))
+    assert cassette_cache_settings("llm_cache")["path"] == ":memory:"
+    assert cassette_cache_settings("gmp_history", in_memory=False)["enabled"] is False
+    assert cassette_cache_settings("doc_index")["segment_store"]["enabled"] is False
+
+    monkeypatch.setattr(search_cache_module, "_search_cache", None)
+    monkeypatch.setattr(search_cache_module, "_search_cache_loaded", False)
+    cache = search_cache_module.get_search_cache()
+    assert cache.path == ":memory:" and cache.payload_store is None
+    cache.close()
+    print("✅ Persistent caches isolated from the cassette")
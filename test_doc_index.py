@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the offline BM25 document index and its feed from the search cache
+"""
+
+from utils.doc_index import DocumentIndex, tokenize
+from utils.search_cache import CachedSearchTool, SearchCache
+
+SWIGGY = {
+    "url": "https://www.example.com/swiggy-ipo?utm_source=x",
+    "title": "Swiggy IPO GMP today",
+    "content": "Swiggy IPO grey market premium GMP is ₹12. Price band 371 to 390, lot size 38 shares.",
+}
+HYUNDAI = {
+    "url": "https://example.com/hyundai-ipo",
+    "title": "Hyundai Motor India IPO subscription",
+    "content": "Hyundai Motor India IPO subscribed 2.37 times; QIB portion 6.97 times on the final day.",
+}
+MARKET = {
+    "url": "https://example.com/nifty",
+    "title": "Nifty closes higher",
+    "content": "Nifty 50 closed higher led by banks and IT stocks.",
+}
+
+
+class FakeSearch:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        return {"query": query, "results": [SWIGGY, HYUNDAI, MARKET]}
+
+
+def test_bm25_ranking_and_incremental_updates():
+    """Relevant documents rank first; re-fetching unchanged pages does not duplicate postings"""
+    index = DocumentIndex(":memory:")
+    assert index.add_documents({"results": [SWIGGY, HYUNDAI, MARKET]}, "ipo") == 3
+    assert "the" not in tokenize("What is the GMP today") and "2.37" in tokenize("subscribed 2.37 times")
+
+    hits = index.search("Swiggy GMP price band")
+    assert hits[0]["url"] == "https://example.com/swiggy-ipo"
+    assert hits[0]["coverage"] == 1.0 and hits[0]["score"] > 0
+    assert index.search("Hyundai QIB subscription")[0]["title"].startswith("Hyundai")
+    assert index.search("zomato") == []
+
+    assert index.add_documents([SWIGGY], "gmp") == 0  # unchanged text
+    updated = {**SWIGGY, "content": "Swiggy IPO GMP falls to ₹2 ahead of listing."}
+    assert index.add_documents([updated], "gmp") == 1
+    assert index.stats()["documents"] == 3
+    assert "falls" in index.search("Swiggy GMP")[0]["content"]
+
+    small = DocumentIndex(":memory:", max_documents=2)
+    small.add_documents([SWIGGY], fetched_at=1.0)
+    small.add_documents([HYUNDAI, MARKET])
+    assert small.stats()["documents"] == 2
+    print("✅ BM25 ranking, updates and eviction work")
+
+
+def test_cached_search_feeds_index(tmp_path):
+    """Fresh search results are indexed, and the cache can be backfilled into a new index"""
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"))
+    index = DocumentIndex(":memory:")
+    tool = CachedSearchTool(FakeSearch(), cache, index)
+    tool.invoke("swiggy ipo gmp", search_type="gmp")
+    assert index.stats()["documents"] == 3
+    assert index.search("Swiggy lot size")[0]["search_type"] == "gmp"
+
+    fresh = DocumentIndex(":memory:")
+    assert fresh.backfill(cache.payloads()) == 3
+    print("✅ Search results indexed and cache backfilled")
+
+
+def test_local_search_needs_good_recall():
+    """The runtime only answers locally when enough documents clear the score and coverage bars"""
+    from types import SimpleNamespace
+    from utils.search_runtime import SearchRuntime
+
+    index = DocumentIndex(":memory:")
+    index.add_documents([SWIGGY, HYUNDAI, MARKET])
+    runtime = SimpleNamespace(doc_index=index, local_max_results=5, local_min_score=1.0,
+                              local_min_coverage=0.6, local_min_documents=1)
+    assert SearchRuntime.local_search(runtime, "Swiggy GMP price band")[0]["title"] == "Swiggy IPO GMP today"
+    assert SearchRuntime.local_search(runtime, "Zomato IPO allotment status") is None
+    runtime.local_min_documents = 2
+    assert SearchRuntime.local_search(runtime, "Swiggy GMP price band") is None
+    print("✅ Poor local recall falls back to live search")
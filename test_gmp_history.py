@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test the array-backed GMP history and its trend queries
+"""
+
+from utils.gmp_history import GMPHistory, parse_observed_at
+from utils.ipo_info_search import TavilyIPOInfoSearch
+from tools.web_search_tool import _format_gmp_trend
+
+DAY = 86400
+OPEN = 1_730_700_000.0  # 4 Nov 2024, ~11:30 IST
+
+
+class GMPSearch:
+    def invoke(self, query, search_type="general"):
+        return {"query": query, "results": [
+            {"title": "Swiggy IPO GMP today", "url": "https://example.com/a", "content": "Swiggy IPO GMP ₹17 (4.4%).",
+             "published_date": "2024-11-06T10:00:00Z"},
+            {"title": "Swiggy IPO GMP", "url": "https://example.com/b", "content": "Swiggy IPO GMP ₹15."},
+        ]}
+
+
+def test_trend_statistics(tmp_path):
+    """Change, day-over-day, momentum and volatility come from the recorded samples"""
+    history = GMPHistory(str(tmp_path), min_interval_seconds=900, momentum_hours=24)
+    for day, gmp in enumerate([10, 12, 11, 14]):
+        assert history.append("Swiggy Ltd", gmp, observed_at=OPEN + day * DAY)
+    assert history.append("Swiggy", 14, observed_at=OPEN + 3 * DAY + 60) is False  # unchanged within the interval
+    assert history.append("Swiggy", 14, 3.6, observed_at=OPEN + 3 * DAY + 3600)
+
+    trend = history.trend("swiggy IPO")
+    assert trend["samples"] == 5 and trend["first"] == 10 and trend["last"] == 14
+    assert trend["change"] == 4 and trend["change_percent"] == 40.0
+    assert trend["day_over_day"] == 3 and trend["momentum"] == 3
+    assert trend["volatility"] > 0 and trend["direction"] == "rising"
+    assert trend["last_gmp_percent"] == 3.6
+
+    assert history.trend("swiggy", since=OPEN + 2 * DAY)["first"] == 11
+    assert history.trend("unknown co") is None
+    assert history.companies() == ["swiggy"]
+
+    report = _format_gmp_trend("Swiggy", trend, since_open=True)
+    assert "+₹4 (+40%)" in report and "since IPO open" in report
+    print("✅ GMP trend computed from history")
+
+
+def test_search_pipeline_feeds_history(tmp_path, monkeypatch):
+    """Extracted GMP records are appended, first record per company wins"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    ipo_search = TavilyIPOInfoSearch(api_key="test-key", search_tool=GMPSearch())
+    ipo_search.query_generator = None
+    ipo_search.ipo_store = None
+    ipo_search.gmp_history = GMPHistory(str(tmp_path))
+
+    ipo_search.search_ipo_gmp("Swiggy")
+    series = ipo_search.gmp_history.series("Swiggy")
+    assert list(series["gmp"]) == [17]
+    assert series["ts"][0] == parse_observed_at("2024-11-06T10:00:00Z")
+    assert parse_observed_at("Wed, 06 Nov 2024 10:00:00 GMT") == series["ts"][0]
+    print("✅ Search results feed the GMP history")
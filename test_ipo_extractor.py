@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test structured IPO record extraction from search result content
+"""
+
+from datetime import datetime
+from utils.ipo_extractor import extract_ipo_record, extract_ipo_records, format_ipo_records
+from tools.web_search_tool import _format_ipo_results
+
+SWIGGY = {
+    "title": "Swiggy IPO GMP today: Grey market premium falls",
+    "url": "https://example.com/swiggy-ipo-gmp",
+    "content": (
+        "Swiggy IPO price band is ₹371 – ₹390 per share. Lot size 38 shares. Issue size ₹11,327.43 crore. "
+        "Swiggy IPO GMP today is ₹12 (3.08%). The issue was subscribed 3.59 times on the final day; "
+        "QIB portion 6.02 times, NII 0.41 times and retail investors 1.14 times. "
+        "IPO opens on November 6, 2024 and closes on 8th Nov 2024. Listing date 13 November."
+    ),
+}
+
+
+def test_extracts_indian_market_formats():
+    """₹ ranges, crore sizes, GMP with percent, 'x times' subscription and dates are typed"""
+    record = extract_ipo_record(SWIGGY, now=datetime(2024, 11, 10))
+    assert record.company == "Swiggy"
+    assert (record.price_band_low, record.price_band_high) == (371.0, 390.0)
+    assert record.lot_size == 38
+    assert record.issue_size_cr == 11327.43
+    assert (record.gmp, record.gmp_percent) == (12.0, 3.08)
+    assert record.subscription_times == 3.59
+    assert record.subscription_by_category == {"QIB": 6.02, "NII": 0.41, "Retail": 1.14}
+    assert (record.open_date, record.close_date, record.listing_date) == ("2024-11-06", "2024-11-08", "2024-11-13")
+    assert record.source_url == SWIGGY["url"]
+    print(f"✅ {record.summary()}")
+
+    sme = extract_ipo_record({"title": "Ganesh SME IPO", "content": "Issue size Rs 45 lakh. GMP of ₹-5. Subscription status: 120.5x"})
+    assert (sme.board, sme.issue_size_cr, sme.gmp, sme.subscription_times) == ("SME", 0.45, -5.0, 120.5)
+    print("✅ Lakh sizes, negative GMP and SME board parsed")
+
+
+def test_records_replace_page_text():
+    """Formatted tool output carries compact records instead of the full content"""
+    noise = {"title": "Market wrap", "url": "https://example.com/wrap", "content": "Nifty closed higher. " * 40}
+    response = {"results": [SWIGGY, noise]}
+    records = extract_ipo_records(response)
+    assert len(records) == 1
+
+    response["records"] = [record.to_dict() for record in records]
+    formatted = _format_ipo_results("Swiggy IPO", "Swiggy IPO GMP", response)
+    assert "price band ₹371-390" in formatted
+    assert SWIGGY["content"] not in formatted
+    assert len(formatted) < len(SWIGGY["content"]) + len(noise["content"])
+    assert format_ipo_records(response["records"]).startswith("1. Swiggy")
+    print("✅ Structured records shrink the IPO tool output")
+
+
+def test_company_comes_from_the_facts_not_the_headline():
+    """List headlines never become companies; records without a named company are dropped"""
+    listing = {
+        "title": "Upcoming IPOs in October 2026: Full list",
+        "content": "Lenskart IPO price band Rs 382-402, opens on October 20, 2026.",
+    }
+    records = extract_ipo_records({"results": [listing]})
+    assert [record.company for record in records] == ["Lenskart"]
+    assert (records[0].price_band_low, records[0].price_band_high) == (382.0, 402.0)
+
+    anonymous = {"title": "Mainboard IPO Calendar: Dates", "content": "IPO price band ₹100 - ₹110 per share."}
+    assert extract_ipo_records({"results": [anonymous]}) == []
+    print("✅ Company taken from the '<Name> IPO' mention next to the facts")
+
+
+def test_premium_ranges_are_not_price_bands():
+    """Bare ₹ ranges count only next to 'price band' / 'per share', never next to premium words"""
+    grey = extract_ipo_record({"title": "Swiggy IPO", "content": "Shares were trading at ₹25 - ₹30 premium in grey market."})
+    assert grey.price_band_low is None
+    band = extract_ipo_record({"title": "Swiggy IPO", "content": "Bids can be placed at ₹371 to ₹390 per share."})
+    assert (band.price_band_low, band.price_band_high) == (371.0, 390.0)
+    print("✅ Premium ranges rejected")
+
+
+def test_dates_without_a_year():
+    """Yearless dates follow the dates stated in full, or published_date, across year ends"""
+    same_sentence = extract_ipo_record(
+        {"title": "Hyundai Motor India IPO", "content": "The IPO opens on October 15 and closes on October 17, 2024."},
+        now=datetime(2026, 10, 17),
+    )
+    assert (same_sentence.open_date, same_sentence.close_date) == ("2024-10-15", "2024-10-17")
+
+    year_end = extract_ipo_record({
+        "title": "Indo Farm IPO",
+        "content": "Indo Farm IPO opens on December 31 and closes on 2 January.",
+        "published_date": "Mon, 30 Dec 2024 10:00:00 GMT",
+    }, now=datetime(2026, 10, 17))
+    assert (year_end.open_date, year_end.close_date) == ("2024-12-31", "2025-01-02")
+    print("✅ Years inferred from the text and publication date")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the local IPO knowledge store and the store-first IPO lookups
+"""
+
+import time
+from datetime import date, timedelta
+from utils.ipo_extractor import IPORecord
+from utils.ipo_info_search import TavilyIPOInfoSearch
+from utils.ipo_store import IPOStore, company_key
+
+
+class CountingSearch:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def invoke(self, query, search_type="general"):
+        self.calls += 1
+        return {"query": query, "results": [{"title": "Swiggy IPO", "url": "https://example.com/swiggy", "content": self.content}]}
+
+
+def test_field_level_freshness():
+    """Static facts stay fresh for days while GMP goes stale in minutes"""
+    store = IPOStore(":memory:", ttl_seconds={"gmp": 600})
+    opens = (date.today() + timedelta(days=2)).isoformat()
+    store.upsert(IPORecord(company="Swiggy Ltd", price_band_low=371, price_band_high=390, lot_size=38,
+                           open_date=opens, close_date=opens, gmp=12, lead_managers=["Kotak"]))
+    record = store.get("swiggy")
+    assert record["lot_size"] == 38 and record["lead_managers"] == ["Kotak"]
+    assert record["status"] == "upcoming"
+    assert company_key("Swiggy Ltd.") == company_key("swiggy IPO") == "swiggy"
+
+    later = time.time() + 3600
+    assert store.stale_fields(record, ["price_band_low", "gmp"], now=later) == ["gmp"]
+    assert store.lookup("Swiggy", "company") is not None
+    assert [ipo["company"] for ipo in store.upcoming()] == ["Swiggy Ltd"]
+
+    store.upsert({"company": "Swiggy", "gmp": 15, "gmp_percent": 3.8})
+    assert [snapshot["gmp"] for snapshot in store.snapshots("Swiggy", "gmp")] == [12, 15]
+    print("✅ Field-level freshness and snapshots tracked")
+
+
+def test_lookups_read_store_first(monkeypatch):
+    """The second company lookup is served locally; stale GMP still goes to search"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    client = CountingSearch(
+        "Swiggy IPO price band ₹371 – ₹390. Lot size 38 shares. Opens on 6 Nov 2099 and closes on 8 Nov 2099. GMP ₹12."
+    )
+    ipo_search = TavilyIPOInfoSearch(api_key="test-key", search_tool=client)
+    ipo_search.query_generator = None
+    ipo_search.ipo_store = IPOStore(":memory:", ttl_seconds={"gmp": 0})
+    ipo_search.gmp_history = None
+
+    first = ipo_search.search_ipo_by_company("Swiggy")
+    assert first["records"][0]["price_band_high"] == 390
+    second = ipo_search.search_ipo_by_company("Swiggy")
+    assert second["source"] == "ipo_store" and client.calls == 1
+    assert ipo_search.local_answer("What is the Swiggy IPO price band?")["source"] == "ipo_store"
+
+    ipo_search.search_ipo_gmp("Swiggy")
+    assert client.calls == 2  # GMP TTL is zero, so it is re-searched
+    print("✅ Company lookups answered from the local store")
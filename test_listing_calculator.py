@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized listing-gain and application-cost calculator
+"""
+
+from utils.listing_calculator import ListingCalculator, format_listing_table
+
+RECORDS = [
+    {"company": "Swiggy", "board": "Mainboard", "price_band_low": 371, "price_band_high": 390, "lot_size": 38, "gmp": 12},
+    {"company": "Waaree Energies", "issue_price": 1503, "price_band_high": 1500, "lot_size": 9, "gmp": 1400},
+    {"company": "Tiny Foods", "board": "SME", "price_band_high": 100, "lot_size": 1200, "gmp": -5},
+    {"company": "Unknown Co", "gmp": 10},
+]
+
+
+def test_listing_estimates():
+    """Gain %, per-lot profit and minimum application are computed for every IPO at once"""
+    rows = {row["company"]: row for row in ListingCalculator(sme_min_lots=2).calculate(RECORDS)}
+
+    swiggy = rows["Swiggy"]
+    assert swiggy["issue_price"] == 390 and swiggy["expected_listing_price"] == 402
+    assert swiggy["gain_percent"] == 3.08 and swiggy["profit_per_lot"] == 456
+    assert swiggy["min_application"] == 14820 and swiggy["max_retail_lots"] == 13
+
+    assert rows["Waaree Energies"]["issue_price"] == 1503  # issue price wins over the band
+    assert rows["Waaree Energies"]["gain_percent"] == 93.15
+
+    sme = rows["Tiny Foods"]
+    assert sme["board"] == "SME" and sme["min_lots"] == 2
+    assert sme["min_application"] == 240000 and sme["profit_per_lot"] == -6000
+    assert sme["max_retail_lots"] is None
+
+    assert rows["Unknown Co"]["gain_percent"] is None and rows["Unknown Co"]["min_application"] is None
+    print("✅ Listing estimates computed")
+
+
+def test_table_ranked_by_gain():
+    """The table lists the best expected gain first and marks missing inputs"""
+    table = format_listing_table(ListingCalculator().calculate(RECORDS))
+    lines = table.splitlines()
+    assert lines[2].startswith("| Waaree Energies") and lines[-1].startswith("| Unknown Co")
+    assert "| ₹390 | ₹12 | ₹402 | 3.08% | ₹456 | ₹14,820 (1 lot) | 13 |" in table
+    assert "₹240,000 (2 lots)" in table
+    assert "n/a" in lines[-1]
+    print("✅ Listing table rendered")
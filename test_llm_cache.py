@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test the exact-match LLM response cache
+"""
+
+from typing import Any, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from utils.llm_cache import LLMResponseCache, market_date
+from utils.llm_proxy import DelegatingChatModel
+
+# 2025-06-02 10:00 IST
+NOW = 1748838600.0
+
+
+class CountingChatModel(BaseChatModel):
+    """Answers with the call number and asks for a tool on request"""
+
+    calls: int = 0
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"temperature": self.temperature}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        tool_calls = [{"name": "search_web", "args": {"query": "GMP"}, "id": f"call-{self.calls}"}] if kwargs.get("tools") else []
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}", tool_calls=tool_calls))])
+
+
+@tool
+def search_web(query: str) -> str:
+    """Search the web"""
+    return query
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_model(clock: Clock, **settings: Any):
+    cache = LLMResponseCache(":memory:", clock=clock, **settings)
+    inner = CountingChatModel()
+    return DelegatingChatModel(inner=inner, model_name="test-model", cache=cache), inner, cache
+
+
+def test_identical_calls_hit():
+    """The second identical call is served from the cache, including tool calls"""
+    model, inner, cache = make_model(Clock(NOW))
+    messages = [SystemMessage(content="You are an IPO advisor"), HumanMessage(content="Swiggy GMP?")]
+    first = model.invoke(messages)
+    second = model.invoke(messages)
+    assert inner.calls == 1 and second.content == first.content == "answer 1"
+
+    bound = model.bind_tools([search_web])
+    tool_answer = bound.invoke(messages)
+    assert inner.calls == 2  # tool schemas are part of the key
+    assert bound.invoke(messages).tool_calls == tool_answer.tool_calls
+
+    model.invoke([HumanMessage(content="Zomato GMP?")])
+    assert inner.calls == 3
+    assert cache.stats()["hits"] == 2
+    print("✅ Identical calls served from cache")
+
+
+def test_params_keep_entries_apart():
+    """Wrappers of differently configured models never share a cached response"""
+    model, inner, cache = make_model(Clock(NOW))
+    warm = DelegatingChatModel(inner=CountingChatModel(temperature=0.9), model_name="test-model", cache=cache)
+    assert model._get_llm_string() != warm._get_llm_string()
+
+    messages = [HumanMessage(content="Swiggy GMP?")]
+    model.invoke(messages)
+    warm.invoke(messages)
+    assert inner.calls == 1 and warm.inner.calls == 1
+    assert cache.stats()["hits"] == 0
+    print("✅ Parameter sets cached separately")
+
+
+def test_market_date_and_ttl():
+    """A new IST market date or an expired entry forces a fresh call"""
+    clock = Clock(NOW)
+    model, inner, _ = make_model(clock, ttl_seconds=3600)
+    messages = [HumanMessage(content="Upcoming IPOs this week")]
+    model.invoke(messages)
+
+    clock.now = NOW + 1800
+    model.invoke(messages)
+    assert inner.calls == 1
+
+    clock.now = NOW + 3601
+    model.invoke(messages)
+    assert inner.calls == 2
+
+    # 23:59 IST on the same day hits; one minute later is a new market date
+    end_of_day = NOW + 14 * 3600 - 60
+    assert market_date(end_of_day) == market_date(NOW)
+    assert market_date(end_of_day + 60) != market_date(NOW)
+    print("✅ Date bucket and TTL respected")
+
+
+def test_size_bounded():
+    """Least recently used responses are evicted above max_entries"""
+    model, inner, cache = make_model(Clock(NOW), max_entries=3)
+    for i in range(5):
+        model.invoke([HumanMessage(content=f"question {i}")])
+    assert cache.stats()["entries"] == 3
+    model.invoke([HumanMessage(content="question 4")])
+    model.invoke([HumanMessage(content="question 0")])
+    assert inner.calls == 6
+    print("✅ Cache size bounded")
+
+
+if __name__ == "__main__":
+    test_identical_calls_hit()
+    test_params_keep_entries_apart()
+    test_market_date_and_ttl()
+    test_size_bounded()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test automatic model failover with health tracking
+"""
+
+import asyncio
+from typing import Any, List, Optional
+import pytest
+import utils.model_failover as model_failover
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from utils.model_failover import FailoverChatModel, ModelHealth, retry_after_seconds
+from utils.rate_limiter import RateLimitExceeded
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Answers with its name, or raises the next scripted error"""
+
+    name: str = "model"
+    errors: List[Any] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"from {self.name}"))])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_failover, "_health", {
+        name: ModelHealth(name, default_cooldown_seconds=60, clock=clock) for name in ("deepseek", "oss")
+    })
+    monkeypatch.setattr(model_failover, "get_rate_limiter", lambda name: None)
+    return clock
+
+
+def make_failover(primary_errors=(), fallback_errors=()):
+    primary = ScriptedChatModel(name="deepseek", errors=list(primary_errors))
+    fallback = ScriptedChatModel(name="oss", errors=list(fallback_errors))
+    model = FailoverChatModel(inner=primary, model_name="deepseek", fallbacks=[fallback], fallback_names=["oss"])
+    return model, primary, fallback
+
+
+def test_rate_limited_primary_fails_over(clock):
+    """A 429 routes the call to the fallback and records who served it"""
+    model, primary, fallback = make_failover([RateLimitError("Rate limit reached. Please try again in 2m30s.")])
+    response = model.invoke("Best IPOs this week?")
+    assert response.content == "from oss"
+    assert response.response_metadata["served_by"] == "oss"
+
+    # The reset window keeps the primary out of rotation until it has passed
+    assert model.invoke("again").response_metadata["served_by"] == "oss"
+    assert primary.calls == 1
+    clock.now += 151
+    assert model.invoke("later").response_metadata["served_by"] == "deepseek"
+    assert model.served == {"oss": 2, "deepseek": 1}
+
+    health = model_failover.model_health_stats()["deepseek"]
+    assert health["rate_limited"] == 1 and health["errors"] == 1
+    print("✅ 429 failed over and respected the reset window")
+
+
+def test_error_rate_demotes(clock):
+    """Repeated errors demote a model behind its fallback"""
+    model, primary, fallback = make_failover([ConnectionError("reset")] * 4)
+    for _ in range(4):
+        assert model.invoke("q").content == "from oss"
+    assert model_failover.model_health_stats()["deepseek"]["error_rate"] > 0.5
+    model.invoke("q")
+    assert primary.calls == 4  # no longer tried first while its error rate is high
+    print("✅ Unhealthy model demoted")
+
+
+def test_all_models_failing(clock):
+    """When every model fails the last error surfaces"""
+    model, primary, fallback = make_failover([RateLimitExceeded("rate_limit: wait", retry_after=30)], [ValueError("boom")])
+    with pytest.raises(ValueError):
+        model.invoke("q")
+    assert primary.calls == fallback.calls == 1
+    print("✅ Last error raised when no model can serve")
+
+
+def test_async_failover(clock):
+    model, _, _ = make_failover([RateLimitError("429")])
+    response = asyncio.run(model.ainvoke("q"))
+    assert response.response_metadata["served_by"] == "oss"
+    print("✅ Async failover")
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(RateLimitError("Please try again in 1m23.5s.")) == pytest.approx(83.5)
+    assert retry_after_seconds(RateLimitError("Please try again in 7.66s")) == pytest.approx(7.66)
+    assert retry_after_seconds(RateLimitError("Please try again in 1h2m3s")) == pytest.approx(3723)
+    assert retry_after_seconds(RateLimitExceeded("wait", retry_after=12)) == 12
+    assert retry_after_seconds(RateLimitError("429")) is None
+    print("✅ Reset windows parsed")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
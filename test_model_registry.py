@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test the process-wide LLM client registry behind ModelLoader
+"""
+
+import pytest
+import utils.model_loader as model_loader
+from utils.model_loader import ConfigLoader, LLMRegistry, ModelLoader
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.delenv("CASSETTE_MODE", raising=False)
+    registry = LLMRegistry()
+    monkeypatch.setattr(model_loader, "_llm_registry", registry)
+    yield registry
+    registry.close()
+
+
+def test_one_client_per_model_and_params(registry):
+    """Repeated loads return the same client; different params get their own"""
+    first = ModelLoader(model_provider="groq_oss_20b").load_llm()
+    second = ModelLoader(model_provider="groq_oss_20b").load_llm()
+    assert first is second
+    warm = ModelLoader(model_provider="groq_oss_20b").load_llm(temperature=0.2)
+    assert warm is not first
+    # Each parameter set gets its own response cache key
+    assert warm._get_llm_string() != first._get_llm_string()
+    assert registry.stats() == {"clients": 2, "created": 2, "reused": 1}
+    print("✅ Clients cached per (provider, model, params)")
+
+
+def test_clients_share_connection_pool(registry):
+    """Every Groq client sends requests through the registry's HTTP clients"""
+    http_client, http_async_client = registry.http_clients()
+    for provider in ("groq_oss", "groq_deepseek"):
+        llm = ModelLoader(model_provider=provider).load_llm()
+        while getattr(llm, "inner", None) is not None:  # behind failover and the rate limiter
+            llm = llm.inner
+        assert llm.http_client is http_client
+        assert llm.http_async_client is http_async_client
+    print("✅ Connection pool shared")
+
+
+def test_failover_clients_do_not_retry_429(registry):
+    """Clients under a failover model hand a 429 straight to it; stats count every cached client"""
+    routed = ModelLoader(model_provider="groq_deepseek").load_llm()
+    limited = [routed.inner] + list(routed.fallbacks)
+    assert all(llm.max_retries == 0 for llm in limited)
+    single = ModelLoader(model_provider="groq_oss_20b").load_llm()
+    assert single.max_retries == 2
+    # The SDK itself never retries; the limiter and failover own every retry
+    for llm in limited + [single]:
+        while getattr(llm, "inner", None) is not None:
+            llm = llm.inner
+        assert llm.max_retries == 0
+    # groq_deepseek, groq_oss, the failover wrapper and groq_oss_20b
+    assert registry.stats()["clients"] == 4
+    print("✅ Failover clients raise the first 429")
+
+
+def test_groq_oss_20b_supported(registry):
+    """The 20B entry from config is accepted and resolves to its model"""
+    llm = ModelLoader(model_provider="groq_oss_20b").load_llm()
+    assert llm.model_name == "openai/gpt-oss-20b"
+    with pytest.raises(ValueError):
+        ModelLoader(model_provider="openai").load_llm()
+    print("✅ groq_oss_20b supported")
+
+
+def test_config_parsed_once(registry, monkeypatch):
+    """ModelLoader instances reuse the registry's parsed config"""
+    def fail():
+        raise AssertionError("config re-read")
+
+    monkeypatch.setattr(ConfigLoader, "__init__", lambda self: fail())
+    loader = ModelLoader(model_provider="groq_oss")
+    assert loader.config is registry.config
+    assert loader.load_llm() is not None
+    print("✅ Config parsed once")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test SimHash near-duplicate suppression of syndicated search results
+"""
+
+from types import SimpleNamespace
+from utils.near_duplicates import collapse_near_duplicates, hamming_distance, simhash
+from utils.search_runtime import SearchRuntime
+
+ORIGINAL = {
+    "url": "https://news-a.example.com/swiggy-gmp",
+    "title": "Swiggy IPO GMP today",
+    "content": "The grey market premium of Swiggy IPO stood at Rs 12 on Monday, indicating a listing gain of 3 per cent over the upper price band of Rs 390. The issue was subscribed 3.59 times on the final day with QIB portion booked 6.02 times.",
+    "score": 0.71,
+}
+SYNDICATED = {
+    "url": "https://news-b.example.com/markets/swiggy-ipo-gmp",
+    "title": "Swiggy IPO GMP today",
+    "content": "Grey market premium of Swiggy IPO stood at Rs 12 on Monday, indicating a listing gain of 3 percent over the upper end of price band of Rs 390. The issue was subscribed 3.59 times on final day, QIB portion booked 6.02 times.",
+    "score": 0.83,
+}
+TEMPLATED = {
+    "url": "https://news-a.example.com/waaree-gmp",
+    "title": "Waaree Energies IPO GMP today",
+    "content": "The grey market premium of Waaree Energies IPO stood at Rs 1400 on Monday, indicating a listing gain of 93 per cent over the upper price band of Rs 1503.",
+    "score": 0.65,
+}
+UNRELATED = {
+    "url": "https://news-c.example.com/hyundai-allotment",
+    "title": "Hyundai Motor India IPO allotment status",
+    "content": "Investors can check allotment on the registrar KFin Technologies website. The shares will list on NSE and BSE on October 22.",
+    "score": 0.5,
+}
+
+
+def test_syndicated_copies_collapse_to_best_scored():
+    """Reworded copies collapse into the best-scored one; templated stories about other companies survive"""
+    assert hamming_distance(simhash("a b c"), simhash("a b c")) == 0
+
+    kept = collapse_near_duplicates([ORIGINAL, SYNDICATED, TEMPLATED, UNRELATED])
+    assert [result["url"] for result in kept] == [SYNDICATED["url"], TEMPLATED["url"], UNRELATED["url"]]
+    assert kept[0]["duplicate_urls"] == [ORIGINAL["url"]]
+
+    newer = {**ORIGINAL, "score": 0.83, "published_date": "2024-11-05"}
+    assert collapse_near_duplicates([SYNDICATED, newer])[0]["url"] == ORIGINAL["url"]
+    print("✅ Syndicated copies collapsed")
+
+
+def test_runtime_drops_records_of_collapsed_copies():
+    """Extracted IPO records from dropped copies are dropped with them"""
+    runtime = SimpleNamespace(near_duplicate_distance=14, near_duplicate_shingle_size=2, near_duplicates_dropped=0)
+    results = {
+        "results": [ORIGINAL, SYNDICATED, UNRELATED],
+        "records": [{"company": "Swiggy", "source_url": ORIGINAL["url"]}, {"company": "Swiggy", "source_url": SYNDICATED["url"]}],
+    }
+    collapsed = SearchRuntime.collapse_duplicates(runtime, results)
+    assert len(collapsed["results"]) == 2
+    assert [record["source_url"] for record in collapsed["records"]] == [SYNDICATED["url"]]
+    assert runtime.near_duplicates_dropped == 1
+
+    runtime.near_duplicate_distance = None
+    assert SearchRuntime.collapse_duplicates(runtime, results) is results
+    print("✅ Records follow their collapsed sources")
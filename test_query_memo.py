@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test the memo of LLM query rewrites
+"""
+
+from datetime import date
+from utils.query_memo import QueryMemo, canonicalize_query
+
+def test_canonicalize_query():
+    """Case, whitespace, punctuation and relative dates collapse to one form"""
+    today = date(2025, 9, 17)
+    assert canonicalize_query("What's today's IPO GMP?", today) == canonicalize_query("what  TODAY ipo gmp", today)
+    assert canonicalize_query("IPOs this week", today) == "ipos week of 2025-09-15"
+    assert canonicalize_query("listing tomorrow!", today) == "listing 2025-09-18"
+    assert canonicalize_query("price band ₹115.50", today) == "price band ₹115.50"
+    print("✅ Canonicalization working")
+
+def test_memo_hits(tmp_path):
+    """Rewrites are served from the LRU, then from disk after a restart"""
+    path = str(tmp_path / "memo.sqlite3")
+    memo = QueryMemo(path=path)
+    assert memo.get("ipo", "Hyundai IPO GMP", "gmp") is None
+    memo.set("ipo", "Hyundai IPO GMP", "gmp", "Hyundai Motor India IPO GMP grey market premium")
+
+    assert memo.get("ipo", "hyundai ipo gmp?", "gmp") == "Hyundai Motor India IPO GMP grey market premium"
+    assert memo.get("web", "hyundai ipo gmp", "gmp") is None  # other generator
+    assert memo.get("ipo", "hyundai ipo gmp", "listing") is None  # other context
+    memo.close()
+
+    restarted = QueryMemo(path=path)
+    assert restarted.get("ipo", "HYUNDAI IPO GMP", "gmp") is not None
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1 and stats["hit_rate"] == 1.0
+    print(f"✅ Memo stats: {memo.stats()} / {stats}")
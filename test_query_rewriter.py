@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the rule-based query rewriter fast path
+"""
+
+from datetime import date
+from utils.query_rewriter import HeuristicQueryRewriter, detect_company
+
+def test_detect_company():
+    """Company names are found in capitalized and lower-case queries"""
+    assert detect_company("Bajaj Housing Finance IPO subscription") == "Bajaj Housing Finance"
+    assert detect_company("swiggy ipo gmp") == "Swiggy"
+    assert detect_company("Hyundai Motor India IPO allotment") == "Hyundai Motor India"
+    assert detect_company("upcoming IPOs this week") is None
+    print("✅ Company detection working")
+
+def test_confident_rewrites_skip_llm():
+    """Common IPO lookups are rewritten without the LLM, with dates resolved"""
+    rewriter = HeuristicQueryRewriter(min_confidence=0.6)
+    query, confidence = rewriter.rewrite("Hyundai IPO GMP today", "gmp", today=date(2025, 10, 14))
+    assert confidence >= 0.6
+    assert query.startswith("Hyundai")
+    assert "grey market premium" in query and "2025-10-14" in query
+
+    assert rewriter.try_rewrite("upcoming IPOs", "upcoming") is not None
+    print(f"✅ Fast path rewrite: {query} ({confidence})")
+
+def test_uncovered_words_are_kept():
+    """Words the keyword tables do not cover stay in the rewrite or send it to the LLM"""
+    rewriter = HeuristicQueryRewriter(min_confidence=0.6)
+    query, _ = rewriter.rewrite("latest news on Reliance", "general")
+    assert query == "Reliance latest news"
+    query, confidence = rewriter.rewrite("best IPOs this week", "ipo", today=date(2026, 10, 17))
+    assert query.startswith("best IPO") and query.endswith("week of 2026-10-12") and confidence >= 0.6
+    assert rewriter.try_rewrite("Is LIC a good stock to buy", "market") is None
+    print(f"✅ Residual words kept: {query}")
+
+def test_capitalized_words_need_a_market_cue():
+    """A capitalized word alone does not make a confident company lookup"""
+    rewriter = HeuristicQueryRewriter(min_confidence=0.6)
+    assert rewriter.try_rewrite("What is the weather in Paris", "general") is None
+    assert rewriter.try_rewrite("Is Nvidia a good buy", "market") is None
+    assert rewriter.try_rewrite("Bajaj Housing Finance share price", "market") is not None
+    assert rewriter.try_rewrite("Swiggy IPO allotment", "ipo") is not None
+    print("✅ Generic capitalized words escalated")
+
+def test_ambiguous_queries_escalate():
+    """Open-ended questions are left to the LLM query generator"""
+    rewriter = HeuristicQueryRewriter(min_confidence=0.6)
+    assert rewriter.try_rewrite("Should I invest in upcoming IPOs or mutual funds?", "ipo") is None
+    assert rewriter.try_rewrite("weather in delhi", "general") is None
+    stats = rewriter.stats()
+    assert stats["escalated"] == 2 and stats["fast_path"] == 0
+    print(f"✅ Escalation stats: {stats}")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test the per-model token-bucket rate limiter
+"""
+
+import asyncio
+from typing import Any, List, Optional
+import pytest
+import utils.rate_limiter as rate_limiter
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from utils.rate_limiter import ModelRateLimiter, RateLimitExceeded, RateLimitedChatModel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class UsageChatModel(BaseChatModel):
+    """Reports a fixed token usage; fails with 429 for the first `rejections` calls"""
+
+    calls: int = 0
+    rejections: int = 0
+    total_tokens: int = 100
+    error: str = "Error code: 429 - rate_limit_exceeded"
+
+    @property
+    def _llm_type(self) -> str:
+        return "usage"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.calls <= self.rejections:
+            raise RateLimitError(self.error)
+        usage = {"input_tokens": self.total_tokens - 10, "output_tokens": 10, "total_tokens": self.total_tokens}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok", usage_metadata=usage))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        # The 429 surfaces when the stream is opened, before any chunk
+        self.calls += 1
+        if self.calls <= self.rejections:
+            raise RateLimitError(self.error)
+        usage = {"input_tokens": self.total_tokens - 10, "output_tokens": 10, "total_tokens": self.total_tokens}
+        yield ChatGenerationChunk(message=AIMessageChunk(content="o"))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="k", usage_metadata=usage))
+
+
+def test_fifo_reservations():
+    """Queued callers are spaced by the refill rate, in arrival order"""
+    clock = Clock()
+    limiter = ModelRateLimiter("m", requests_per_minute=2, tokens_per_minute=1000, clock=clock)
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(100) == pytest.approx(30)  # third request waits for one RPM slot
+    assert limiter.reserve(100) == pytest.approx(60)
+    clock.now += 60
+    assert limiter.reserve(100) == pytest.approx(30)
+    assert limiter.stats()["queued"] == 3
+    print("✅ Reservations queued fairly")
+
+
+def test_token_limits_and_settlement():
+    """Token buckets charge the estimate first and the reported usage after the call"""
+    clock = Clock()
+    limiter = ModelRateLimiter("m", tokens_per_minute=600, tokens_per_day=10_000, clock=clock)
+    assert limiter.reserve(500) == 0
+    assert limiter.reserve(500) == pytest.approx(40)  # 400 tokens of debt at 10 tokens/s
+
+    clock.now += 40
+    limiter.settle(500, 100)  # the first call used far less than estimated
+    assert limiter.reserve(300) == 0
+
+    daily = ModelRateLimiter("m", tokens_per_day=1000, max_wait_seconds=60, clock=clock)
+    daily.reserve(800)
+    with pytest.raises(RateLimitExceeded, match="rate_limit"):
+        daily.reserve(800)  # the daily budget would take hours to refill
+    assert daily.reserve(200) == 0  # the rejected call reserved nothing
+    print("✅ Token estimates settled against usage")
+
+
+def test_estimate_counts_tools_and_completion():
+    limiter = ModelRateLimiter("m", expected_completion_tokens=200)
+    messages = [HumanMessage(content="x" * 400)]
+    plain = limiter.estimate_tokens(messages, {})
+    with_tools = limiter.estimate_tokens(messages, {"tools": [{"function": {"name": "search", "description": "y" * 400}}]})
+    assert plain == (400 + 16) // 4 + 200
+    assert with_tools > plain + 100
+    assert limiter.estimate_tokens(messages, {"max_tokens": 50}) == (400 + 16) // 4 + 50
+    print("✅ Estimates include tools and completion budget")
+
+
+def test_chat_model_waits_instead_of_failing(monkeypatch):
+    """Calls sleep for their reservation, settle on reported usage and re-queue after a 429"""
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    limiter = ModelRateLimiter("m", requests_per_minute=60, tokens_per_minute=10_000)
+    inner = UsageChatModel(rejections=1)
+    model = RateLimitedChatModel(inner=inner, model_name="m", limiter=limiter)
+
+    assert model.invoke("hello").content == "ok"
+    assert inner.calls == 2
+    assert sleeps[0] == 0 and sleeps[1] > 0  # the retry waited for the drained bucket
+    stats = limiter.stats()
+    assert stats["throttled"] == 1 and stats["actual_tokens"] == 100
+    print("✅ 429 re-queued instead of surfacing")
+
+
+def test_streams_requeue_429(monkeypatch):
+    """Sync and async streams throttle and re-queue a 429 raised before the first chunk"""
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    limiter = ModelRateLimiter("m", requests_per_minute=60, tokens_per_minute=10_000)
+    inner = UsageChatModel(rejections=1)
+    model = RateLimitedChatModel(inner=inner, model_name="m", limiter=limiter)
+    assert "".join(chunk.content for chunk in model.stream("hello")) == "ok"
+    assert inner.calls == 2 and sleeps[1] > 0
+    assert limiter.stats()["throttled"] == 1
+
+    async def collect(model):
+        return "".join([chunk.content async for chunk in model.astream("hello")])
+
+    # Under a failover model the async stream throttles and hands the 429 up at once
+    routed = UsageChatModel(rejections=1)
+    limiter = ModelRateLimiter("m", requests_per_minute=600)
+    model = RateLimitedChatModel(inner=routed, model_name="m", limiter=limiter, max_retries=0)
+    with pytest.raises(RateLimitError):
+        asyncio.run(collect(model))
+    assert routed.calls == 1 and limiter.stats()["throttled"] == 1
+    print("✅ Streams re-queue a 429 like single calls")
+
+
+def test_429_surfaces_without_retries(monkeypatch):
+    """Daily caps and clients under a failover model raise the first 429"""
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda seconds: None)
+    daily = UsageChatModel(rejections=1, error="Rate limit reached on tokens per day (TPD): Limit 500000. Please try again in 1h2m")
+    model = RateLimitedChatModel(inner=daily, model_name="m", limiter=ModelRateLimiter("m", requests_per_minute=60))
+    with pytest.raises(RateLimitError):
+        model.invoke("hello")
+    assert daily.calls == 1
+
+    routed = UsageChatModel(rejections=1)
+    limiter = ModelRateLimiter("m", requests_per_minute=60)
+    model = RateLimitedChatModel(inner=routed, model_name="m", limiter=limiter, max_retries=0)
+    with pytest.raises(RateLimitError):
+        model.invoke("hello")
+    assert routed.calls == 1 and limiter.stats()["throttled"] == 1
+    print("✅ 429 raised at once when retrying cannot help")
+
+
+if __name__ == "__main__":
+    test_fifo_reservations()
+    test_token_limits_and_settlement()
+    test_estimate_counts_tools_and_completion()
+    pytest.main([__file__, "-v", "-k", "chat_model"])
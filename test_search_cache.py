@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the disk-backed Tavily search result cache
+"""
+
+import time
+from utils.search_cache import SearchCache, CachedSearchTool, normalize_query
+
+class FakeTavily:
+    """Counts calls instead of hitting the Tavily API"""
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        return {"query": query, "results": [{"title": "GMP today", "url": "https://example.com", "content": "GMP ₹40"}]}
+
+def test_cache_hits_and_ttl(tmp_path):
+    """Repeated queries are served from disk until their search-type TTL expires"""
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite3"), ttl_seconds={"gmp": 1})
+    fake = FakeTavily()
+    search = CachedSearchTool(fake, cache)
+
+    search.invoke("Hyundai IPO GMP", search_type="gmp")
+    search.invoke("  hyundai ipo   gmp? ", search_type="gmp")
+    assert fake.calls == 1
+    assert normalize_query("  Hyundai IPO   GMP? ") == "hyundai ipo gmp"
+
+    # Same query under a different search type is a separate entry
+    search.invoke("Hyundai IPO GMP", search_type="company")
+    assert fake.calls == 2
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    print(f"✅ Cache stats: {stats}")
+
+    time.sleep(1.1)
+    search.invoke("Hyundai IPO GMP", search_type="gmp")
+    assert fake.calls == 3
+    print("✅ GMP entry expired after its TTL")
+
+def test_cache_eviction(tmp_path):
+    """The cache never grows past max_entries"""
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite3"), max_entries=3)
+    for i in range(6):
+        cache.set(f"query {i}", "general", {"results": [i]})
+    assert cache.stats()["entries"] == 3
+    assert cache.get("query 5", "general") == {"results": [5]}
+    assert cache.get("query 0", "general") is None
+    print("✅ Least recently used entries evicted")
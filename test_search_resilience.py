@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test hedged requests, retries, deadlines and the circuit breaker on the search path
+"""
+
+import asyncio
+import threading
+import time
+from utils.cassette import CassetteMissError
+from utils.search_cache import CachedSearchTool, SearchCache
+from utils.search_resilience import CircuitBreaker, ResilientSearchClient, SearchUnavailableError
+
+
+class ScriptedTavily:
+    """Search stand-in whose n-th call sleeps / fails as scripted"""
+
+    def __init__(self, delays=(), errors=()):
+        self.delays = list(delays)
+        self.errors = list(errors)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _next(self):
+        with self.lock:
+            index = self.calls
+            self.calls += 1
+        delay = self.delays[index] if index < len(self.delays) else 0.0
+        error = self.errors[index] if index < len(self.errors) else None
+        return index, delay, error
+
+    def invoke(self, query):
+        index, delay, error = self._next()
+        time.sleep(delay)
+        if error:
+            return {"error": Exception(error)}
+        return {"query": query, "results": [{"url": f"https://example.com/{index}"}]}
+
+    async def ainvoke(self, query):
+        index, delay, error = self._next()
+        await asyncio.sleep(delay)
+        if error:
+            return {"error": Exception(error)}
+        return {"query": query, "results": [{"url": f"https://example.com/{index}"}]}
+
+
+def make_client(tavily, **kwargs):
+    settings = dict(deadline_seconds=2.0, backoff_seconds=0.01, initial_hedge_delay=0.05, min_samples=1000)
+    settings.update(kwargs)
+    return ResilientSearchClient(tavily, **settings)
+
+
+def test_hedge_wins_over_slow_primary():
+    """A slow first request is raced by a hedge and the faster answer is returned"""
+    client = make_client(ScriptedTavily(delays=[0.5, 0.0]))
+    started = time.perf_counter()
+    result = client.invoke("Swiggy IPO GMP")
+    assert result["results"][0]["url"] == "https://example.com/1"
+    assert time.perf_counter() - started < 0.4
+    assert client.stats()["hedges"] == 1 and client.stats()["hedge_wins"] == 1
+
+    aclient = make_client(ScriptedTavily(delays=[0.5, 0.0]))
+    result = asyncio.run(aclient.ainvoke("Swiggy IPO GMP"))
+    assert result["results"][0]["url"] == "https://example.com/1"
+    print("✅ Hedged request beats the slow primary")
+
+
+def test_retries_then_breaker_opens():
+    """Failed attempts are retried; repeated failures open the breaker and fail fast"""
+    client = make_client(ScriptedTavily(errors=["boom", None]), max_retries=2)
+    assert client.invoke("q")["results"]
+    assert client.stats()["retries"] == 1
+
+    failing = make_client(ScriptedTavily(errors=["down"] * 100), max_retries=1, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        try:
+            failing.invoke("q")
+            assert False, "expected SearchUnavailableError"
+        except SearchUnavailableError:
+            pass
+    assert failing.breaker.state == CircuitBreaker.OPEN
+    calls = failing.search_tool.calls
+    try:
+        failing.invoke("q")
+    except SearchUnavailableError:
+        pass
+    assert failing.search_tool.calls == calls  # open breaker never reaches upstream
+    assert failing.stats()["breaker"]["rejected"] == 1
+    print("✅ Retries recover, breaker opens on an outage")
+
+
+def test_deadline_and_half_open():
+    """Calls stop at the deadline; an open breaker lets a probe through after the cool-down"""
+    client = make_client(ScriptedTavily(delays=[1.0, 1.0]), deadline_seconds=0.2, max_retries=0, failure_threshold=1, reset_timeout=0.1)
+    started = time.perf_counter()
+    try:
+        client.invoke("q")
+        assert False, "expected SearchUnavailableError"
+    except SearchUnavailableError:
+        pass
+    assert time.perf_counter() - started < 0.5
+    assert client.stats()["timeouts"] == 1
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.15)
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.invoke("q")["results"]  # third call is instant
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    print("✅ Deadline enforced, half-open probe closes the breaker")
+
+
+class MissingCassette:
+    """Replayed search with nothing recorded"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        raise CassetteMissError(f"No recording for {query}")
+
+
+def test_cassette_miss_is_not_an_outage():
+    """A cassette miss is raised at once and never counts against the breaker"""
+    replayed = MissingCassette()
+    client = make_client(replayed, max_retries=2, failure_threshold=1, hedge=False)
+    for _ in range(2):
+        try:
+            client.invoke("q")
+            assert False, "expected CassetteMissError"
+        except CassetteMissError:
+            pass
+    assert replayed.calls == 2 and client.stats()["retries"] == 0
+    assert client.breaker.state == CircuitBreaker.CLOSED and client.stats()["failures"] == 0
+    print("✅ Cassette misses surface without retries")
+
+
+def test_timeouts_and_abandoned_requests_recorded():
+    """Requests that time out or lose a hedge still enter the latency window"""
+    client = make_client(ScriptedTavily(delays=[1.0]), deadline_seconds=0.2, max_retries=0, hedge=False)
+    try:
+        client.invoke("q")
+        assert False, "expected SearchUnavailableError"
+    except SearchUnavailableError:
+        pass
+    assert client.stats()["hedges"] == 0 and len(client.latency) == 1
+    assert client.latency.percentile(50) >= 0.19  # recorded at the deadline
+
+    aclient = make_client(ScriptedTavily(delays=[0.5, 0.0]))
+    asyncio.run(aclient.ainvoke("q"))
+    # The cancelled primary counts too, as at least the time it was waited on
+    assert len(aclient.latency) == 2 and aclient.latency.percentile(100) >= 0.05
+    print("✅ Timed-out and abandoned requests keep the p95 honest")
+
+
+def test_stale_results_served_during_outage(tmp_path):
+    """CachedSearchTool falls back to an expired entry when the upstream is down"""
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"), ttl_seconds={"gmp": 0})
+    cache.set("Swiggy IPO GMP", "gmp", {"results": [{"url": "https://example.com/old"}]})
+    client = make_client(ScriptedTavily(errors=["down"] * 10), max_retries=0)
+    tool = CachedSearchTool(client, cache)
+
+    result = tool.invoke("Swiggy IPO GMP", search_type="gmp")
+    assert result["stale"] is True
+    assert result["results"][0]["url"] == "https://example.com/old"
+    assert cache.stats()["stale_hits"] == 1
+
+    try:
+        tool.invoke("never cached", search_type="gmp")
+        assert False, "expected SearchUnavailableError"
+    except SearchUnavailableError:
+        print("✅ Stale cache served during an outage")
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Test that the web search tools share one long-lived search runtime
+"""
+
+from utils import search_runtime
+from tools.web_search_tool import WebSearchTool
+
+def test_shared_runtime(monkeypatch):
+    """WebSearchTool instances reuse the process-wide runtime until it is closed"""
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+
+    first = WebSearchTool()
+    second = WebSearchTool()
+    assert first.runtime is second.runtime
+    assert first.tavily_ipo_search.search_tool is first.tavily_search
+    print("✅ Tools share one search runtime")
+
+    search_runtime.close_search_runtime()
+    assert first.runtime.closed
+    assert search_runtime.get_search_runtime() is not first.runtime
+    print("✅ Closed runtime is replaced on next use")
+    search_runtime.close_search_runtime()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test compressed segment storage for search cache payloads and indexed documents
+"""
+
+import json
+import sqlite3
+import time
+from utils.doc_index import DocumentIndex
+from utils.search_cache import SearchCache
+from utils.segment_store import SegmentStore
+
+PAYLOAD = {
+    "query": "swiggy ipo gmp",
+    "follow_up_questions": None,
+    "answer": None,
+    "images": [],
+    "results": [{
+        "url": "https://www.example.com/swiggy-gmp",
+        "title": "Swiggy IPO GMP today",
+        "content": "The grey market premium of Swiggy IPO stood at Rs 12 on Monday, indicating a listing gain of 3 per cent over the upper price band of Rs 390.",
+        "score": 0.71,
+        "raw_content": None,
+    }],
+    "response_time": 1.2,
+}
+
+
+def test_segments_roll_over_and_compact(tmp_path):
+    """Payloads compress below their size, span several segments and survive compaction"""
+    store = SegmentStore(str(tmp_path), max_segment_bytes=1000)
+    data = json.dumps(PAYLOAD).encode("utf-8")
+    refs = [store.put(data) for _ in range(20)]
+    assert store.get(refs[-1]) == data
+    stats = store.stats()
+    assert stats["segments"] > 1 and stats["compression_ratio"] > 2
+
+    moved = store.compact(refs[:2])
+    assert set(moved) == set(refs[:2])
+    assert store.get(moved[refs[0]]) == data
+    assert store.stats()["segments"] == 1
+    assert store.get(refs[5]) is None  # its segment is gone
+    print(f"✅ Segments compressed {stats['compression_ratio']}x and compacted")
+
+
+def test_search_cache_keeps_payloads_in_segments(tmp_path):
+    """Cache rows hold references; compaction drops long-expired entries"""
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"), ttl_seconds={"gmp": 0, "company": 3600},
+                        max_stale_seconds=0, payload_store=SegmentStore(str(tmp_path / "segments")))
+    cache.set("swiggy ipo", "company", PAYLOAD)
+    cache.set("swiggy gmp", "gmp", PAYLOAD)
+    assert cache.get("swiggy ipo", "company") == PAYLOAD
+    assert [search_type for search_type, _, _ in cache.payloads()] == ["company", "gmp"]
+    row = cache._connection().execute("SELECT payload, payload_ref FROM search_cache LIMIT 1").fetchone()
+    assert row[0] == "" and row[1]
+
+    time.sleep(0.01)
+    assert cache.compact() == {"removed": 1, "kept_payloads": 1}
+    assert cache.get("swiggy ipo", "company") == PAYLOAD
+    cache.close()
+    assert cache.get("swiggy ipo", "company") == PAYLOAD  # reopened after close
+    print("✅ Search cache payloads stored compressed")
+
+
+def test_legacy_cache_database_is_migrated(tmp_path):
+    """A cache file written before segment storage keeps working"""
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE search_cache (key TEXT PRIMARY KEY, search_type TEXT NOT NULL, query TEXT NOT NULL, "
+        "payload TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL, "
+        "hits INTEGER NOT NULL DEFAULT 0)"
+    )
+    now = time.time()
+    conn.execute("INSERT INTO search_cache VALUES (?, 'general', 'q', ?, ?, ?, ?, 0)",
+                 (SearchCache.make_key("q", "general"), json.dumps(PAYLOAD), now, now + 60, now))
+    conn.commit()
+    conn.close()
+
+    cache = SearchCache(path, payload_store=SegmentStore(str(tmp_path / "segments")))
+    assert cache.get("q", "general") == PAYLOAD
+    cache.set("q2", "general", PAYLOAD)
+    assert cache.get("q2", "general") == PAYLOAD
+    print("✅ Legacy cache rows still readable")
+
+
+def test_document_text_in_segments(tmp_path):
+    """Indexed document text is decompressed only for returned hits"""
+    store = SegmentStore(str(tmp_path))
+    index = DocumentIndex(":memory:", content_store=store, max_age_seconds=3600)
+    index.add_documents(PAYLOAD, "gmp")
+    index.add_documents({"results": [{**PAYLOAD["results"][0], "url": "https://example.com/old"}]}, fetched_at=1.0)
+    assert index.search("Swiggy grey market premium")[0]["content"].startswith("The grey market premium")
+    assert store.reads == 1
+
+    assert index.compact() == {"removed": 1, "kept_contents": 1}
+    assert index.stats()["documents"] == 1
+    assert index.search("Swiggy grey market premium")[0]["url"] == "https://example.com/swiggy-gmp"
+    print("✅ Document text stored compressed")
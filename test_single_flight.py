@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test request coalescing for identical in-flight searches
+"""
+
+import asyncio
+import threading
+import time
+from utils.single_flight import SingleFlight
+from utils.search_cache import CachedSearchTool
+
+class SlowFakeTavily:
+    """Counts requests; each one takes a while so callers overlap"""
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, query):
+        self.calls += 1
+        time.sleep(0.2)
+        return {"results": [{"url": "https://example.com", "content": query}]}
+
+    async def ainvoke(self, query):
+        self.calls += 1
+        await asyncio.sleep(0.2)
+        return {"results": [{"url": "https://example.com", "content": query}]}
+
+def test_threads_share_one_search():
+    """Ten threads asking the same question trigger one Tavily request"""
+    fake = SlowFakeTavily()
+    search = CachedSearchTool(fake, None)
+    search.flights = SingleFlight("test")
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(search.invoke("Hyundai IPO GMP", "gmp"))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake.calls == 1
+    assert len(results) == 10 and all(result is results[0] for result in results)
+    assert search.flights.stats()["shared"] == 9
+    print(f"✅ {search.flights.stats()}")
+
+def test_coroutines_share_one_search():
+    """Concurrent coroutines coalesce too, but different queries do not"""
+    fake = SlowFakeTavily()
+    search = CachedSearchTool(fake, None)
+    search.flights = SingleFlight("test")
+
+    async def herd():
+        return await asyncio.gather(
+            *(search.ainvoke("Swiggy IPO subscription", "subscription") for _ in range(5)),
+            search.ainvoke("Swiggy IPO GMP", "gmp"),
+        )
+
+    results = asyncio.run(herd())
+    assert fake.calls == 2
+    assert results[0] is results[4]
+    print("✅ Async callers coalesced")
+
+def test_errors_reach_every_waiter():
+    """A failed shared call raises in every caller"""
+    flights = SingleFlight("test")
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("Tavily down")
+
+    def caller():
+        try:
+            flights.do("key", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    print("✅ Errors propagated to all waiters")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the multi-query fan-out of tavily_smart_search
+"""
+
+from utils import search_runtime
+from utils.result_merge import canonicalize_url, merge_search_results
+from tools.web_search_tool import WebSearchTool
+
+def test_canonicalize_url():
+    """Tracking parameters, www., fragments and trailing slashes do not split a page"""
+    assert canonicalize_url("http://www.Chittorgarh.com/ipo/hyundai/?utm_source=x#gmp") == "https://chittorgarh.com/ipo/hyundai"
+    assert canonicalize_url("https://chittorgarh.com/ipo/hyundai?b=2&a=1") == canonicalize_url("https://chittorgarh.com/ipo/hyundai?a=1&b=2")
+    print("✅ URL canonicalization working")
+
+def test_merge_search_results():
+    """Duplicates collapse to the best-scored copy and overlap boosts ranking"""
+    merged = merge_search_results([
+        {"results": [{"url": "https://a.com/x", "score": 0.5, "title": "A"}, {"url": "https://b.com", "score": 0.55}]},
+        {"results": [{"url": "https://www.a.com/x/", "score": 0.52, "title": "A2"}]},
+    ])
+    assert [result["url"] for result in merged] == ["https://www.a.com/x/", "https://b.com"]
+    assert merged[0]["matched_queries"] == 2
+    print("✅ Merge and ranking working")
+
+class FakeTavily:
+    """Returns the same page for every variant plus one page per variant"""
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query)
+        return {"results": [
+            {"url": "https://example.com/ipo", "title": "IPO page", "content": "GMP ₹40", "score": 0.6},
+            {"url": f"https://example.com/{len(self.queries)}", "title": query, "content": "details", "score": 0.5},
+        ]}
+
+def test_fan_out_tool(monkeypatch):
+    """One tool call searches every IPO angle and returns one merged block"""
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    search_runtime.close_search_runtime()
+    runtime = search_runtime.get_search_runtime()
+    runtime.query_generator = None
+    fake = FakeTavily()
+    runtime.search_tool.search_tool = fake
+    runtime.search_tool.cache = None
+
+    output = WebSearchTool().tavily_smart_search.invoke({"query": "Hyundai IPO", "search_context": "ipo"})
+    assert len(fake.queries) == runtime.fan_out
+    assert output.count("https://example.com/ipo") == 1
+    assert f"found by {runtime.fan_out} of {runtime.fan_out} queries" in output
+    print(f"✅ Fan-out searched {len(fake.queries)} variants")
+    search_runtime.close_search_runtime()
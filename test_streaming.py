@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test end-to-end event streaming from the orchestrator and the nested IPO agent
+"""
+
+import asyncio
+import json
+from typing import Any, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import tool
+from agent.agentic_workflow import IPOAdvisorAgent, OrchestratorAgent
+from utils.answer_cache import SemanticAnswerCache
+
+
+class ScriptedStreamingModel(BaseChatModel):
+    """Replays scripted replies, streaming their content word by word"""
+
+    replies: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-streaming"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=next(self.replies))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        reply = next(self.replies)
+        if reply.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(reply.tool_calls)
+            ]))
+            return
+        words = reply.content.split(" ")
+        for i, word in enumerate(words):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + (" " if i < len(words) - 1 else "")))
+
+
+@tool
+def search_ipo_info(query: str) -> str:
+    """Search IPO information"""
+    return "Swiggy GMP ₹12"
+
+
+def build_orchestrator() -> OrchestratorAgent:
+    ipo_agent = IPOAdvisorAgent.__new__(IPOAdvisorAgent)
+    ipo_agent.tools = [search_ipo_info]
+    ipo_agent.system_prompt = SystemMessage(content="IPO advisor")
+    ipo_agent.llm_with_tools = ScriptedStreamingModel(replies=iter([
+        AIMessage(content="", tool_calls=[{"name": "search_ipo_info", "args": {"query": "Swiggy GMP"}, "id": "ipo-1"}]),
+        AIMessage(content="Swiggy GMP is ₹12 today"),
+    ]))
+    ipo_agent.graph = ipo_agent._build_ipo_graph()
+
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.ipo_agent = ipo_agent
+    orchestrator.all_tools = orchestrator._create_agent_tools()
+    orchestrator.system_prompt = SystemMessage(content="Orchestrator")
+    orchestrator.llm_with_tools = ScriptedStreamingModel(replies=iter([
+        AIMessage(content="", tool_calls=[{"name": "ipo_advisor_agent", "args": {"query": "Swiggy GMP"}, "id": "orc-1"}]),
+        AIMessage(content="The Swiggy GMP is ₹12"),
+    ]))
+    orchestrator.answer_cache = SemanticAnswerCache(":memory:")
+    orchestrator.build_graph()
+    return orchestrator
+
+
+def check_events(events: List[dict]) -> None:
+    kinds = [(event["type"], event.get("agent")) for event in events]
+    assert kinds[0] == ("node_started", "orchestrator")
+    assert ("tool_call", "orchestrator") in kinds
+    assert ("node_started", "ipo_advisor") in kinds and ("tool_call", "ipo_advisor") in kinds
+
+    nested = "".join(event["content"] for event in events if event["type"] == "token" and event["agent"] == "ipo_advisor")
+    assert nested == "Swiggy GMP is ₹12 today"
+    # Nested tokens arrive before the orchestrator's own answer starts
+    first_nested = next(i for i, event in enumerate(events) if event["type"] == "token")
+    assert events[first_nested]["agent"] == "ipo_advisor"
+
+    final = events[-1]
+    assert final["type"] == "final" and final["content"] == "The Swiggy GMP is ₹12"
+    assert final["cached"] is False and final["time_to_first_token"] <= final["latency"]
+
+
+def test_sync_stream():
+    """stream() yields node, tool and token events of both agents, then the final answer"""
+    orchestrator = build_orchestrator()
+    check_events(list(orchestrator.stream("What is the Swiggy GMP?")))
+
+    # A repeat is answered from the answer cache without running the graph
+    repeat = list(orchestrator.stream("what is the Swiggy GMP"))
+    assert len(repeat) == 1 and repeat[0]["cached"] is True
+    print("✅ Sync streaming")
+
+
+def test_async_stream():
+    """astream() yields the same events on the event loop"""
+    orchestrator = build_orchestrator()
+
+    async def collect():
+        return [event async for event in orchestrator.astream("What is the Swiggy GMP?")]
+
+    check_events(asyncio.run(collect()))
+    print("✅ Async streaming")
+
+
+if __name__ == "__main__":
+    test_sync_stream()
+    test_async_stream()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test the subscription time series and its day-wise / projected figures
+"""
+
+from utils.ipo_info_search import TavilyIPOInfoSearch
+from utils.subscription_history import SubscriptionHistory
+from tools.web_search_tool import _format_subscription_summary
+
+DAY = 86400
+DAY1 = 1_730_694_600.0  # 4 Nov 2024 10:00 IST
+
+
+class SubscriptionSearch:
+    def invoke(self, query, search_type="general"):
+        return {"query": query, "results": [{
+            "title": "Swiggy IPO subscription status day 2",
+            "url": "https://example.com/swiggy-day-2",
+            "content": "Swiggy IPO subscribed 0.35 times on day 2. QIB portion 0.28 times, Non-institutional investors 0.14x, retail 0.84 times.",
+        }]}
+
+
+def test_summary_growth_ratios_and_projection(tmp_path):
+    """Day-wise closes, growth, ratios to retail and a linear projection to the close"""
+    history = SubscriptionHistory(str(tmp_path))
+    assert history.append("Swiggy", 0.12, {"QIB": 0.01, "Retail": 0.54}, observed_at=DAY1)
+    assert history.append("Swiggy", 0.35, {"QIB": 0.28, "NII": 0.14, "Retail": 0.84}, observed_at=DAY1 + 0.25 * DAY)
+    assert history.append("Swiggy", 0.35, {"QIB": 0.28, "NII": 0.14, "Retail": 0.84}, observed_at=DAY1 + 0.25 * DAY + 60) is False
+    assert history.append("Swiggy Ltd", 0.7, {"QIB": 1.0}, observed_at=DAY1 + DAY)
+
+    summary = history.summary("swiggy", close_date="2024-11-06", now=DAY1 + DAY + 60)
+    assert summary["samples"] == 3
+    assert summary["latest"] == {"total": 0.7, "QIB": 1.0, "NII": 0.14, "Retail": 0.84, "Employee": None}
+    assert [day["date"] for day in summary["daily_totals"]] == ["2024-11-04", "2024-11-05"]
+    assert summary["day_growth"] == [2.0]
+    assert summary["ratio_to_retail"]["QIB"] == 1.19
+    assert summary["projected_final"] > 0.7
+
+    closed = history.summary("swiggy", close_date="2024-11-06", now=DAY1 + 5 * DAY)
+    assert closed["projected_final"] is None
+    assert history.summary("unknown") is None
+
+    report = _format_subscription_summary("Swiggy", summary)
+    assert "Total: 0.7x" in report and "QIB 1.19x retail" in report and "Projected final" in report
+    print("✅ Subscription summary computed")
+
+
+def test_subscription_search_feeds_series(tmp_path, monkeypatch):
+    """search_ipo_subscription_status appends the extracted figures"""
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    ipo_search = TavilyIPOInfoSearch(api_key="test-key", search_tool=SubscriptionSearch())
+    ipo_search.query_generator = None
+    ipo_search.ipo_store = None
+    ipo_search.gmp_history = None
+    ipo_search.subscription_history = SubscriptionHistory(str(tmp_path))
+
+    ipo_search.search_ipo_subscription_status("Swiggy")
+    latest = ipo_search.subscription_history.summary("Swiggy")["latest"]
+    assert latest["total"] == 0.35 and latest["NII"] == 0.14 and latest["Retail"] == 0.84
+    assert ipo_search.subscription_history.is_fresh("Swiggy")
+    print("✅ Subscription search feeds the series")
@@ -1,347 +1,770 @@
-import os
-from typing import List, Dict, Any
-from langchain.tools import tool
-from langchain_tavily import TavilySearch
-from utils.ipo_info_search import TavilyIPOInfoSearch
-from utils.model_loader import ModelLoader
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from langchain_core.tools import StructuredTool
+from utils.search_runtime import get_search_runtime
+from utils.result_merge import merge_search_results
+from utils.ipo_extractor import format_ipo_records
+from utils.cache_warmer import IST
+from utils.listing_calculator import format_listing_table, get_listing_calculator
 from dotenv import load_dotenv
 import json
+import time
 
 load_dotenv()
 
+
+def _format_web_results(query: str, optimized_query: str, results: Any) -> str:
+    """Format general web search results"""
+    if not results:
+        return "No search results found for the given query."
+
+    # Format the results
+    formatted_results = f"Search Results for: '{query}'\n"
+    formatted_results += f"(Optimized query: '{optimized_query}')\n\n"
+
+    # Handle different result formats
+    if isinstance(results, str):
+        formatted_results += results
+    elif isinstance(results, list):
+        for i, result in enumerate(results, 1):
+            if isinstance(result, dict):
+                title = result.get('title', 'No title')
+                url = result.get('url', 'No URL')
+                content = result.get('content', 'No content available')
+
+                formatted_results += f"{i}. **{title}**\n"
+                formatted_results += f"   URL: {url}\n"
+                formatted_results += f"   Content: {content}\n\n"
+            else:
+                formatted_results += f"{i}. {str(result)}\n\n"
+    elif isinstance(results, dict):
+        formatted_results += f"Results: {json.dumps(results, indent=2)}\n"
+    else:
+        formatted_results += f"Results: {str(results)}\n"
+
+    return formatted_results
+
+
+def _format_ipo_results(query: str, optimized_query: str, results: Any) -> str:
+    """Format IPO search results"""
+    if not results:
+        return f"No IPO information found for: '{query}'"
+
+    # Format the results
+    formatted_results = f"IPO Information for: '{query}'\n"
+    formatted_results += f"(Optimized query: '{optimized_query}')\n\n"
+
+    if isinstance(results, dict) and results.get('records'):
+        # Structured records replace the page text of the sources they were extracted from
+        formatted_results += "Extracted IPO records:\n"
+        formatted_results += format_ipo_records(results['records']) + "\n\n"
+        covered = {record.get('source_url') for record in results['records']}
+        others = [result for result in results.get('results', []) if result.get('url') not in covered]
+        if others:
+            formatted_results += "Other sources:\n"
+            for i, result in enumerate(others, 1):
+                formatted_results += f"{i}. **{result.get('title', 'No title')}**\n"
+                formatted_results += f"   URL: {result.get('url', 'No URL')}\n"
+                formatted_results += f"   Content: {(result.get('content') or 'No content available')[:300]}\n\n"
+    elif isinstance(results, dict):
+        # Handle dictionary response
+        if 'results' in results:
+            for i, result in enumerate(results['results'], 1):
+                title = result.get('title', 'No title')
+                url = result.get('url', 'No URL')
+                content = result.get('content', 'No content available')
+
+                formatted_results += f"{i}. **{title}**\n"
+                formatted_results += f"   URL: {url}\n"
+                formatted_results += f"   Content: {content}\n\n"
+        else:
+            formatted_results += f"Raw results: {json.dumps(results, indent=2)}\n"
+    elif isinstance(results, list):
+        # Handle list response
+        for i, result in enumerate(results, 1):
+            if isinstance(result, dict):
+                title = result.get('title', 'No title')
+                url = result.get('url', 'No URL')
+                content = result.get('content', 'No content available')
+
+                formatted_results += f"{i}. **{title}**\n"
+                formatted_results += f"   URL: {url}\n"
+                formatted_results += f"   Content: {content}\n\n"
+            else:
+                formatted_results += f"{i}. {str(result)}\n\n"
+    else:
+        formatted_results += f"Results: {str(results)}\n"
+
+    return formatted_results
+
+
+def _format_smart_results(query: str, search_context: str, optimized_query: str, results: Any) -> str:
+    """Format smart search results with context awareness"""
+    if not results:
+        return f"No results found for: '{query}'"
+
+    # Enhanced formatting with context awareness
+    formatted_results = f"🧠 Smart Search Results\n"
+    formatted_results += f"Context: {search_context.upper()}\n"
+    formatted_results += f"Original Query: '{query}'\n"
+    formatted_results += f"AI-Optimized Query: '{optimized_query}'\n"
+    formatted_results += "="*60 + "\n\n"
+
+    # Process results with enhanced formatting
+    if isinstance(results, (list, dict)):
+        result_list = results.get('results', results) if isinstance(results, dict) else results
+
+        for i, result in enumerate(result_list[:5], 1):  # Limit to top 5 results
+            if isinstance(result, dict):
+                title = result.get('title', 'No title')
+                url = result.get('url', 'No URL')
+                content = result.get('content', 'No content available')
+
+                formatted_results += f"🔍 Result #{i}: {title}\n"
+                formatted_results += f"🌐 Source: {url}\n"
+                formatted_results += f"📄 Summary: {content[:300]}...\n"
+                formatted_results += "-"*40 + "\n\n"
+    else:
+        formatted_results += f"Search Results: {str(results)}\n"
+
+    return formatted_results
+
+
+def _format_fan_out_results(query: str, search_context: str, variants: List[tuple], merged: List[Dict[str, Any]]) -> str:
+    """Format merged results of a smart search fan-out as one compact block"""
+    if not merged:
+        return f"No results found for: '{query}'"
+
+    formatted_results = f"🧠 Smart Search Results\n"
+    formatted_results += f"Context: {search_context.upper()}\n"
+    formatted_results += f"Original Query: '{query}'\n"
+    formatted_results += f"AI-Optimized Queries ({len(variants)}):\n"
+    for variant_query, _ in variants:
+        formatted_results += f"  - '{variant_query}'\n"
+    formatted_results += "="*60 + "\n\n"
+
+    for i, result in enumerate(merged, 1):
+        title = result.get('title', 'No title')
+        url = result.get('url', 'No URL')
+        content = result.get('content', 'No content available')
+
+        formatted_results += f"🔍 Result #{i}: {title}\n"
+        formatted_results += f"🌐 Source: {url}\n"
+        formatted_results += f"⭐ Score: {result['rank_score']:.2f} (found by {result['matched_queries']} of {len(variants)} queries)\n"
+        formatted_results += f"📄 Summary: {content[:300]}...\n"
+        formatted_results += "-"*40 + "\n\n"
+
+    return formatted_results
+
+
+def _format_financial_results(query: str, enhanced_financial_query: str, results: Any) -> str:
+    """Format financial search results"""
+    if not results:
+        return f"No financial information found for: '{query}'"
+
+    # Financial-specific formatting
+    formatted_results = f"💰 FINANCIAL MARKET SEARCH\n"
+    formatted_results += f"Query: '{query}'\n"
+    formatted_results += f"Market-Optimized: '{enhanced_financial_query}'\n"
+    formatted_results += "="*60 + "\n\n"
+
+    # Process and format financial results
+    if isinstance(results, dict) and 'results' in results:
+        for i, result in enumerate(results['results'][:4], 1):
+            title = result.get('title', 'No title')
+            url = result.get('url', 'No URL')
+            content = result.get('content', 'No content available')
+
+            formatted_results += f"📊 Financial Source #{i}\n"
+            formatted_results += f"Title: {title}\n"
+            formatted_results += f"URL: {url}\n"
+            formatted_results += f"Analysis: {content[:250]}...\n"
+            formatted_results += "─"*40 + "\n\n"
+    elif isinstance(results, list):
+        for i, result in enumerate(results[:4], 1):
+            formatted_results += f"📊 Result #{i}: {str(result)}\n\n"
+    else:
+        formatted_results += f"Financial Data: {str(results)}\n"
+
+    return formatted_results
+
+
+def search_web(query: str) -> str:
+    """
+    Search the web for general information with AI-optimized query generation.
+
+    Args:
+        query (str): The search query to find information on the web
+
+    Returns:
+        str: Formatted search results with sources
+    """
+    try:
+        # Resolve the shared search runtime
+        runtime = get_search_runtime()
+
+        # Generate optimized search query
+        optimized_query = runtime.generate_search_query(query, "general")
+        print(f"🔍 Original: {query}")
+        print(f"🎯 Optimized: {optimized_query}")
+
+        # Perform the search with optimized query, keeping one copy of each syndicated article
+        results = runtime.search_tool.invoke(optimized_query, search_type="general")
+        return _format_web_results(query, optimized_query, runtime.collapse_duplicates(results))
+
+    except Exception as e:
+        return f"Error performing web search: {str(e)}"
+
+
+async def asearch_web(query: str) -> str:
+    """Async counterpart of search_web"""
+    try:
+        runtime = get_search_runtime()
+
+        optimized_query = await runtime.agenerate_search_query(query, "general")
+        print(f"🔍 Original: {query}")
+        print(f"🎯 Optimized: {optimized_query}")
+
+        results = await runtime.search_tool.ainvoke(optimized_query, search_type="general")
+        return _format_web_results(query, optimized_query, runtime.collapse_duplicates(results))
+
+    except Exception as e:
+        return f"Error performing web search: {str(e)}"
+
+
+def search_ipo_info(query: str) -> str:
+    """
+    Search for IPO information with AI-optimized query generation for specialized IPO sources.
+
+    Args:
+        query (str): The IPO-related search query
+
+    Returns:
+        str: Formatted IPO search results
+    """
+    try:
+        # Resolve the shared search runtime
+        runtime = get_search_runtime()
+        runtime.log_query(query, "ipo")
+
+        # Plain lookups about a known company are answered from the local IPO store
+        local = runtime.ipo_search.local_answer(query)
+        if local is not None:
+            return _format_ipo_results(query, "local IPO store", local)
+
+        # Generate optimized IPO search query
+        optimized_query = runtime.generate_search_query(query, "ipo")
+        print(f"🔍 IPO Original: {query}")
+        print(f"🎯 IPO Optimized: {optimized_query}")
+
+        # Perform the IPO search with optimized query, keeping one copy of each syndicated article
+        results = runtime.ipo_search.tavily_search_with_custom_query(optimized_query, search_type="ipo")
+        return _format_ipo_results(query, optimized_query, runtime.collapse_duplicates(results))
+
+    except Exception as e:
+        return f"Error performing IPO search: {str(e)}"
+
+
+async def asearch_ipo_info(query: str) -> str:
+    """Async counterpart of search_ipo_info"""
+    try:
+        runtime = get_search_runtime()
+        runtime.log_query(query, "ipo")
+
+        local = runtime.ipo_search.local_answer(query)
+        if local is not None:
+            return _format_ipo_results(query, "local IPO store", local)
+
+        optimized_query = await runtime.agenerate_search_query(query, "ipo")
+        print(f"🔍 IPO Original: {query}")
+        print(f"🎯 IPO Optimized: {optimized_query}")
+
+        results = await runtime.ipo_search.atavily_search_with_custom_query(optimized_query, search_type="ipo")
+        return _format_ipo_results(query, optimized_query, runtime.collapse_duplicates(results))
+
+    except Exception as e:
+        return f"Error performing IPO search: {str(e)}"
+
+
+def _format_local_results(query: str, documents: List[Dict[str, Any]]) -> str:
+    """Format documents retrieved from the offline document index"""
+    formatted_results = f"Local Results for: '{query}'\n"
+    formatted_results += f"(Answered from {len(documents)} previously fetched documents, no live search)\n\n"
+
+    now = time.time()
+    for i, document in enumerate(documents, 1):
+        age_hours = (now - document["fetched_at"]) / 3600
+        formatted_results += f"{i}. **{document['title'] or 'No title'}**\n"
+        formatted_results += f"   URL: {document['url']}\n"
+        formatted_results += f"   Fetched: {age_hours:.1f}h ago | BM25 score: {document['score']:.2f}\n"
+        formatted_results += f"   Content: {document['content']}\n\n"
+
+    return formatted_results
+
+
+def search_local_documents(query: str, max_results: int = 5) -> str:
+    """
+    Search every previously fetched web document offline (BM25 full-text ranking) and
+    fall back to a live web search only when nothing relevant was fetched before.
+    Prefer this for follow-up or repeat questions about topics already searched.
+
+    Args:
+        query (str): The search query
+        max_results (int): Maximum number of documents to return
+
+    Returns:
+        str: Formatted local results, or live web search results when local recall is poor
+    """
+    try:
+        runtime = get_search_runtime()
+
+        documents = runtime.local_search(query, max_results)
+        if documents is not None:
+            print(f"📚 Local index hit: {query}")
+            return _format_local_results(query, documents)
+
+        print(f"📚 Local index miss, searching live: {query}")
+        return search_web(query)
+
+    except Exception as e:
+        return f"Error performing local document search: {str(e)}"
+
+
+async def asearch_local_documents(query: str, max_results: int = 5) -> str:
+    """Async counterpart of search_local_documents"""
+    try:
+        runtime = get_search_runtime()
+
+        documents = runtime.local_search(query, max_results)
+        if documents is not None:
+            print(f"📚 Local index hit: {query}")
+            return _format_local_results(query, documents)
+
+        print(f"📚 Local index miss, searching live: {query}")
+        return await asearch_web(query)
+
+    except Exception as e:
+        return f"Error performing local document search: {str(e)}"
+
+
+def _ipo_open_timestamp(runtime, company_name: str) -> Optional[float]:
+    """Start of the IPO's open date (IST) from the local IPO store, if known"""
+    store = runtime.ipo_search.ipo_store
+    record = store.get(company_name) if store is not None else None
+    if not record or not record.get("open_date"):
+        return None
+    try:
+        return datetime.fromisoformat(record["open_date"]).replace(tzinfo=IST).timestamp()
+    except ValueError:
+        return None
+
+
+def _format_gmp_trend(company_name: str, trend: Optional[Dict[str, Any]], since_open: bool) -> str:
+    """Format GMP trend statistics as a short report"""
+    if trend is None:
+        return f"No GMP history found for: '{company_name}'"
+
+    def signed(value: Optional[float], unit: str = "₹") -> str:
+        if value is None:
+            return "n/a"
+        return f"{'+' if value >= 0 else '-'}{unit}{abs(value):g}" if unit == "₹" else f"{value:+g}%"
+
+    first_seen = datetime.fromtimestamp(trend["first_at"], IST).strftime("%d %b %Y %H:%M")
+    last_seen = datetime.fromtimestamp(trend["last_at"], IST).strftime("%d %b %Y %H:%M")
+    window = "since IPO open" if since_open else f"since first seen ({first_seen} IST)"
+
+    formatted_results = f"GMP Trend for: '{company_name}' ({trend['samples']} recorded samples)\n\n"
+    formatted_results += f"Latest GMP: ₹{trend['last']:g}"
+    if trend["last_gmp_percent"] is not None:
+        formatted_results += f" ({trend['last_gmp_percent']:g}% over issue price)"
+    formatted_results += f" as of {last_seen} IST\n"
+    formatted_results += f"Change {window}: {signed(trend['change'])} ({signed(trend['change_percent'], '%')}) from ₹{trend['first']:g}\n"
+    formatted_results += f"Day-over-day: {signed(trend['day_over_day'])} ({signed(trend['day_over_day_percent'], '%')})\n"
+    formatted_results += f"Momentum (last {trend['momentum_hours']:g}h): {signed(trend['momentum'])} | Trend: {trend['direction']} ({trend['slope_per_day']:+g} ₹/day)\n"
+    formatted_results += f"Range: ₹{trend['low']:g} – ₹{trend['high']:g}"
+    if trend["volatility"] is not None:
+        formatted_results += f" | Volatility (std of daily change): ₹{trend['volatility']:g}"
+    return formatted_results + "\n"
+
+
+def get_gmp_trend(company_name: str) -> str:
+    """
+    Grey market premium (GMP) trend of an IPO computed locally from recorded GMP history:
+    change since the IPO opened, day-over-day change, momentum, volatility and direction.
+    Use this instead of repeated GMP searches when asked how the GMP has moved.
+
+    Args:
+        company_name (str): Name of the IPO company
+
+    Returns:
+        str: GMP trend report
+    """
+    try:
+        runtime = get_search_runtime()
+        runtime.log_company(company_name, "gmp")
+        history = runtime.ipo_search.gmp_history
+        if history is None:
+            return "GMP history is disabled."
+
+        since = _ipo_open_timestamp(runtime, company_name)
+        trend = history.trend(company_name, since) or history.trend(company_name)
+        if trend is None:
+            # Nothing recorded yet: one GMP search seeds the history
+            runtime.ipo_search.search_ipo_gmp(company_name)
+            trend = history.trend(company_name)
+        return _format_gmp_trend(company_name, trend, since is not None and trend is not None and trend["first_at"] >= since)
+
+    except Exception as e:
+        return f"Error computing GMP trend: {str(e)}"
+
+
+async def aget_gmp_trend(company_name: str) -> str:
+    """Async counterpart of get_gmp_trend"""
+    try:
+        runtime = get_search_runtime()
+        runtime.log_company(company_name, "gmp")
+        history = runtime.ipo_search.gmp_history
+        if history is None:
+            return "GMP history is disabled."
+
+        since = _ipo_open_timestamp(runtime, company_name)
+        trend = history.trend(company_name, since) or history.trend(company_name)
+        if trend is None:
+            await runtime.ipo_search.asearch_ipo_gmp(company_name)
+            trend = history.trend(company_name)
+        return _format_gmp_trend(company_name, trend, since is not None and trend is not None and trend["first_at"] >= since)
+
+    except Exception as e:
+        return f"Error computing GMP trend: {str(e)}"
+
+
+def _subscription_summary(runtime, company_name: str) -> Optional[Dict[str, Any]]:
+    """Subscription summary from the local series, with the close date from the IPO store"""
+    store = runtime.ipo_search.ipo_store
+    record = store.get(company_name) if store is not None else None
+    return runtime.ipo_search.subscription_history.summary(company_name, (record or {}).get("close_date"))
+
+
+def _subscription_is_fresh(runtime, company_name: str) -> bool:
+    """Whether the latest subscription figures can be served without a search"""
+    if runtime.ipo_search.subscription_history.is_fresh(company_name):
+        return True
+    store = runtime.ipo_search.ipo_store
+    return store is not None and store.lookup(company_name, "subscription") is not None
+
+
+def _format_subscription_summary(company_name: str, summary: Optional[Dict[str, Any]]) -> str:
+    """Format a subscription summary as a short report"""
+    if summary is None:
+        return f"No subscription data found for: '{company_name}'"
+
+    def times(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"{value:g}x"
+
+    as_of = datetime.fromtimestamp(summary["as_of"], IST).strftime("%d %b %Y %H:%M")
+    latest = summary["latest"]
+    formatted_results = f"Subscription Status for: '{company_name}' (as of {as_of} IST, {summary['samples']} recorded samples)\n\n"
+    formatted_results += f"Total: {times(latest['total'])} | " + " | ".join(
+        f"{name}: {times(latest[name])}" for name in ("QIB", "NII", "Retail", "Employee")
+    ) + "\n"
+    if len(summary["daily_totals"]) > 1:
+        days = [f"{day['date']}: {times(day['total'])}" for day in summary["daily_totals"]]
+        formatted_results += f"Day-wise total: {', '.join(days)}\n"
+        formatted_results += f"Day-over-day growth: {', '.join(times(value) for value in summary['day_growth'])}\n"
+    ratios = {name: value for name, value in summary["ratio_to_retail"].items() if value is not None}
+    if ratios:
+        formatted_results += "Demand vs retail: " + ", ".join(f"{name} {value:g}x retail" for name, value in ratios.items()) + "\n"
+    if summary["projected_final"] is not None:
+        formatted_results += f"Projected final subscription (linear trend to close): {times(summary['projected_final'])}\n"
+    return formatted_results
+
+
+def get_subscription_status(company_name: str) -> str:
+    """
+    Live IPO subscription status (total, QIB, NII, retail, employee) from the locally recorded
+    subscription series, with day-wise growth, demand relative to retail and a projected final
+    subscription. Searches only when the latest recorded figures are stale.
+
+    Args:
+        company_name (str): Name of the IPO company
+
+    Returns:
+        str: Subscription status report
+    """
+    try:
+        runtime = get_search_runtime()
+        runtime.log_company(company_name, "subscription")
+        if runtime.ipo_search.subscription_history is None:
+            return "Subscription history is disabled."
+
+        if not _subscription_is_fresh(runtime, company_name):
+            # The search feeds the series through the extracted records
+            runtime.ipo_search.search_ipo_subscription_status(company_name)
+        return _format_subscription_summary(company_name, _subscription_summary(runtime, company_name))
+
+    except Exception as e:
+        return f"Error getting subscription status: {str(e)}"
+
+
+async def aget_subscription_status(company_name: str) -> str:
+    """Async counterpart of get_subscription_status"""
+    try:
+        runtime = get_search_runtime()
+        runtime.log_company(company_name, "subscription")
+        if runtime.ipo_search.subscription_history is None:
+            return "Subscription history is disabled."
+
+        if not _subscription_is_fresh(runtime, company_name):
+            await runtime.ipo_search.asearch_ipo_subscription_status(company_name)
+        return _format_subscription_summary(company_name, _subscription_summary(runtime, company_name))
+
+    except Exception as e:
+        return f"Error getting subscription status: {str(e)}"
+
+
+def _listing_records(runtime, company_names: Optional[List[str]]) -> tuple:
+    """Stored records for the named IPOs (or all live ones), and the names still missing price, lot size or GMP"""
+    store = runtime.ipo_search.ipo_store
+    if store is None:
+        return [], list(company_names or [])
+    if not company_names:
+        return store.upcoming(), []
+    records, missing = [], []
+    for name in company_names:
+        record = store.get(name)
+        if record is None or None in (record.get("lot_size"), record.get("gmp")) or (
+            record.get("issue_price") is None and record.get("price_band_high") is None
+        ):
+            missing.append(name)
+        if record is not None:
+            records.append(record)
+    return records, missing
+
+
+def calculate_listing_gains(company_names: Optional[List[str]] = None) -> str:
+    """
+    Calculate expected listing price, listing gain %, profit per lot and minimum application
+    amount (retail mainboard and SME lots) from GMP, price band and lot size, for every live
+    IPO at once or for the named IPOs. Quote these numbers instead of computing them by hand.
+
+    Args:
+        company_names (list): Optional IPO company names; all live and upcoming IPOs when omitted
+
+    Returns:
+        str: Table of listing estimates, best expected gain first
+    """
+    try:
+        runtime = get_search_runtime()
+        for company_name in company_names or []:
+            runtime.log_company(company_name, "listing")
+        records, missing = _listing_records(runtime, company_names)
+        if missing or not records:
+            # Fill the gaps once with bulk lookups, which feed the local IPO store
+            if missing:
+                list(runtime.ipo_search.search_many(missing, kinds=("company", "gmp")))
+            else:
+                runtime.ipo_search.search_upcoming_ipos()
+            records, _ = _listing_records(runtime, company_names)
+
+        rows = get_listing_calculator().calculate(records)
+        if not rows:
+            return "No live IPOs with price and GMP data found."
+        return "Listing gain estimates (from GMP, price band and lot size):\n\n" + format_listing_table(rows)
+
+    except Exception as e:
+        return f"Error calculating listing gains: {str(e)}"
+
+
+async def acalculate_listing_gains(company_names: Optional[List[str]] = None) -> str:
+    """Async counterpart of calculate_listing_gains"""
+    try:
+        runtime = get_search_runtime()
+        for company_name in company_names or []:
+            runtime.log_company(company_name, "listing")
+        records, missing = _listing_records(runtime, company_names)
+        if missing or not records:
+            if missing:
+                async for _ in runtime.ipo_search.asearch_many(missing, kinds=("company", "gmp")):
+                    pass
+            else:
+                await runtime.ipo_search.asearch_upcoming_ipos()
+            records, _ = _listing_records(runtime, company_names)
+
+        rows = get_listing_calculator().calculate(records)
+        if not rows:
+            return "No live IPOs with price and GMP data found."
+        return "Listing gain estimates (from GMP, price band and lot size):\n\n" + format_listing_table(rows)
+
+    except Exception as e:
+        return f"Error calculating listing gains: {str(e)}"
+
+
+def tavily_smart_search(query: str, search_context: str = "general", fan_out: bool = True) -> str:
+    """
+    Advanced Tavily search with AI-powered query optimization and context awareness.
+    With fan_out, searches several angles of the query at once (e.g. GMP, subscription
+    and price band for IPOs) and returns one merged, deduplicated result list.
+
+    Args:
+        query (str): The user's search query
+        search_context (str): Context for search optimization ('ipo', 'market', 'general', 'financial')
+        fan_out (bool): Search multiple query variants concurrently and merge the results
+
+    Returns:
+        str: Comprehensive search results with AI-enhanced queries
+    """
+    try:
+        # Resolve the shared search runtime
+        runtime = get_search_runtime()
+
+        # Generate the optimized query, then the variants to fan out over
+        optimized_query = runtime.generate_search_query(query, search_context)
+        variants = runtime.query_variants(optimized_query, search_context, None if fan_out else 1)
+
+        print(f"🧠 Smart Search Context: {search_context}")
+        print(f"🔍 Original Query: {query}")
+        print(f"🎯 AI-Optimized Queries: {[variant for variant, _ in variants]}")
+
+        if len(variants) == 1:
+            results = runtime.search_tool.invoke(optimized_query, search_type=search_context)
+            return _format_smart_results(query, search_context, optimized_query, results)
+
+        # Perform all variant searches concurrently and merge by canonical URL
+        responses = runtime.fan_out_search(variants)
+        merged = merge_search_results(responses, limit=runtime.fan_out_max_results)
+        return _format_fan_out_results(query, search_context, variants, merged)
+
+    except Exception as e:
+        return f"Error in smart search: {str(e)}"
+
+
+async def atavily_smart_search(query: str, search_context: str = "general", fan_out: bool = True) -> str:
+    """Async counterpart of tavily_smart_search"""
+    try:
+        runtime = get_search_runtime()
+
+        optimized_query = await runtime.agenerate_search_query(query, search_context)
+        variants = runtime.query_variants(optimized_query, search_context, None if fan_out else 1)
+
+        print(f"🧠 Smart Search Context: {search_context}")
+        print(f"🔍 Original Query: {query}")
+        print(f"🎯 AI-Optimized Queries: {[variant for variant, _ in variants]}")
+
+        if len(variants) == 1:
+            results = await runtime.search_tool.ainvoke(optimized_query, search_type=search_context)
+            return _format_smart_results(query, search_context, optimized_query, results)
+
+        responses = await runtime.afan_out_search(variants)
+        merged = merge_search_results(responses, limit=runtime.fan_out_max_results)
+        return _format_fan_out_results(query, search_context, variants, merged)
+
+    except Exception as e:
+        return f"Error in smart search: {str(e)}"
+
+
+def tavily_financial_search(query: str) -> str:
+    """
+    Specialized financial search tool with AI query optimization for financial markets, IPOs, and investments.
+
+    Args:
+        query (str): Financial query about markets, stocks, IPOs, etc.
+
+    Returns:
+        str: Financial search results with market-specific optimization
+    """
+    try:
+        # Resolve the shared search runtime
+        runtime = get_search_runtime()
+
+        # Generate financial-optimized query
+        financial_query = runtime.generate_search_query(query, "market")
+
+        # Add financial context keywords
+        enhanced_financial_query = f"{financial_query} financial market analysis stock price"
+
+        print(f"💰 Financial Search Query: {query}")
+        print(f"🎯 Market-Optimized: {enhanced_financial_query}")
+
+        # Perform financial search
+        results = runtime.search_tool.invoke(enhanced_financial_query, search_type="market")
+        return _format_financial_results(query, enhanced_financial_query, results)
+
+    except Exception as e:
+        return f"Error in financial search: {str(e)}"
+
+
+async def atavily_financial_search(query: str) -> str:
+    """Async counterpart of tavily_financial_search"""
+    try:
+        runtime = get_search_runtime()
+
+        financial_query = await runtime.agenerate_search_query(query, "market")
+        enhanced_financial_query = f"{financial_query} financial market analysis stock price"
+
+        print(f"💰 Financial Search Query: {query}")
+        print(f"🎯 Market-Optimized: {enhanced_financial_query}")
+
+        results = await runtime.search_tool.ainvoke(enhanced_financial_query, search_type="market")
+        return _format_financial_results(query, enhanced_financial_query, results)
+
+    except Exception as e:
+        return f"Error in financial search: {str(e)}"
+
+
 class WebSearchTool:
     def __init__(self):
-        """Initialize the Web Search Tool with Tavily API"""
-        self.api_key = os.getenv("TAVILY_API_KEY")
-        if not self.api_key:
-            raise ValueError("TAVILY_API_KEY not found in environment variables")
-        
-        # Initialize Tavily IPO search tool
-        self.tavily_ipo_search = TavilyIPOInfoSearch(self.api_key)
-        
-        # Initialize general Tavily search tool
-        self.tavily_search = TavilySearch(api_key=self.api_key)
-        
-        # Initialize LLM for query generation (using lighter model for cost efficiency)
-        try:
-            self.query_generator = ModelLoader(model_provider="groq_oss_20b").load_llm()
-        except:
-            self.query_generator = None  # Fallback if model loading fails
+        """Initialize the Web Search Tool on top of the shared search runtime"""
+        self.runtime = get_search_runtime()
+        self.api_key = self.runtime.api_key
+
+        # Shared Tavily IPO search tool and general Tavily search tool
+        self.tavily_ipo_search = self.runtime.ipo_search
+        self.tavily_search = self.runtime.search_tool
+
+        # Shared LLM for query generation (None if model loading failed)
+        self.query_generator = self.runtime.query_generator
 
     def _generate_search_query(self, user_query: str, search_type: str = "general") -> str:
         """
         Use LLM to generate optimized search queries based on user input
-        
+
         Args:
             user_query (str): The original user query
             search_type (str): Type of search - 'general', 'ipo', 'market'
-            
+
         Returns:
             str: Optimized search query
         """
-        if not self.query_generator:
-            return user_query  # Fallback to original query
-        
-        try:
-            if search_type == "ipo":
-                prompt = f"""
-                Transform the following user query into an optimized search query for IPO information.
-                Focus on IPO-specific terms, dates, prices, grey market premium (GMP), listing details.
-                
-                User Query: {user_query}
-                
-                Generate a concise, search-optimized query (max 20 words) that includes relevant IPO keywords:
-                """
-            elif search_type == "market":
-                prompt = f"""
-                Transform the following user query into an optimized search query for stock market information.
-                Focus on market trends, stock prices, financial data, company analysis.
-                
-                User Query: {user_query}
-                
-                Generate a concise, search-optimized query (max 20 words) that includes relevant market keywords:
-                """
-            else:  # general
-                prompt = f"""
-                Transform the following user query into an optimized search query for web search.
-                Make it more specific and search-friendly while preserving the user's intent.
-                
-                User Query: {user_query}
-                
-                Generate a concise, search-optimized query (max 20 words):
-                """
-            
-            response = self.query_generator.invoke(prompt)
-            optimized_query = response.content.strip() if hasattr(response, 'content') else str(response).strip()
-            
-            # Clean up the response (remove quotes, extra text)
-            optimized_query = optimized_query.replace('"', '').replace("'", "")
-            if len(optimized_query) > 100:  # Fallback if response is too long
-                return user_query
-            
-            return optimized_query
-            
-        except Exception as e:
-            print(f"Query generation error: {e}")
-            return user_query  # Fallback to original query
-
-    @tool
-    def search_web(query: str) -> str:
-        """
-        Search the web for general information with AI-optimized query generation.
-        
-        Args:
-            query (str): The search query to find information on the web
-            
-        Returns:
-            str: Formatted search results with sources
-        """
-        try:
-            # Create instance for accessing methods
-            web_tool = WebSearchTool()
-            
-            # Generate optimized search query
-            optimized_query = web_tool._generate_search_query(query, "general")
-            print(f"🔍 Original: {query}")
-            print(f"🎯 Optimized: {optimized_query}")
-            
-            # Initialize the tool if not already done
-            search_tool = TavilySearch(api_key=os.getenv("TAVILY_API_KEY"))
-            
-            # Perform the search with optimized query
-            results = search_tool.invoke(optimized_query)
-            
-            if not results:
-                return "No search results found for the given query."
-            
-            # Format the results
-            formatted_results = f"Search Results for: '{query}'\n"
-            formatted_results += f"(Optimized query: '{optimized_query}')\n\n"
-            
-            # Handle different result formats
-            if isinstance(results, str):
-                formatted_results += results
-            elif isinstance(results, list):
-                for i, result in enumerate(results, 1):
-                    if isinstance(result, dict):
-                        title = result.get('title', 'No title')
-                        url = result.get('url', 'No URL')
-                        content = result.get('content', 'No content available')
-                        
-                        formatted_results += f"{i}. **{title}**\n"
-                        formatted_results += f"   URL: {url}\n"
-                        formatted_results += f"   Content: {content}\n\n"
-                    else:
-                        formatted_results += f"{i}. {str(result)}\n\n"
-            elif isinstance(results, dict):
-                formatted_results += f"Results: {json.dumps(results, indent=2)}\n"
-            else:
-                formatted_results += f"Results: {str(results)}\n"
-            
-            return formatted_results
-            
-        except Exception as e:
-            return f"Error performing web search: {str(e)}"
-        
-    @tool
-    def search_ipo_info(query: str) -> str:
-        """
-        Search for IPO information with AI-optimized query generation for specialized IPO sources.
-        
-        Args:
-            query (str): The IPO-related search query
-            
-        Returns:
-            str: Formatted IPO search results
-        """
-        try:
-            # Create instance for accessing methods
-            web_tool = WebSearchTool()
-            
-            # Generate optimized IPO search query
-            optimized_query = web_tool._generate_search_query(query, "ipo")
-            print(f"🔍 IPO Original: {query}")
-            print(f"🎯 IPO Optimized: {optimized_query}")
-            
-            # Initialize IPO search tool
-            ipo_search = TavilyIPOInfoSearch(os.getenv("TAVILY_API_KEY"))
-            
-            # Perform the IPO search with optimized query
-            results = ipo_search.tavily_search_with_custom_query(optimized_query)
-            
-            if not results:
-                return f"No IPO information found for: '{query}'"
-            
-            # Format the results
-            formatted_results = f"IPO Information for: '{query}'\n"
-            formatted_results += f"(Optimized query: '{optimized_query}')\n\n"
-            
-            if isinstance(results, dict):
-                # Handle dictionary response
-                if 'results' in results:
-                    for i, result in enumerate(results['results'], 1):
-                        title = result.get('title', 'No title')
-                        url = result.get('url', 'No URL')
-                        content = result.get('content', 'No content available')
-                        
-                        formatted_results += f"{i}. **{title}**\n"
-                        formatted_results += f"   URL: {url}\n"
-                        formatted_results += f"   Content: {content}\n\n"
-                else:
-                    formatted_results += f"Raw results: {json.dumps(results, indent=2)}\n"
-            elif isinstance(results, list):
-                # Handle list response
-                for i, result in enumerate(results, 1):
-                    if isinstance(result, dict):
-                        title = result.get('title', 'No title')
-                        url = result.get('url', 'No URL')
-                        content = result.get('content', 'No content available')
-                        
-                        formatted_results += f"{i}. **{title}**\n"
-                        formatted_results += f"   URL: {url}\n"
-                        formatted_results += f"   Content: {content}\n\n"
-                    else:
-                        formatted_results += f"{i}. {str(result)}\n\n"
-            else:
-                formatted_results += f"Results: {str(results)}\n"
-            
-            return formatted_results
-            
-        except Exception as e:
-            return f"Error performing IPO search: {str(e)}"
-    
-    @tool
-    def tavily_smart_search(query: str, search_context: str = "general") -> str:
-        """
-        Advanced Tavily search with AI-powered query optimization and context awareness.
-        
-        Args:
-            query (str): The user's search query
-            search_context (str): Context for search optimization ('ipo', 'market', 'general', 'financial')
-            
-        Returns:
-            str: Comprehensive search results with AI-enhanced queries
-        """
-        try:
-            # Create instance for accessing methods
-            web_tool = WebSearchTool()
-            
-            # Generate multiple optimized queries based on context
-            optimized_query = web_tool._generate_search_query(query, search_context)
-            
-            print(f"🧠 Smart Search Context: {search_context}")
-            print(f"🔍 Original Query: {query}")
-            print(f"🎯 AI-Optimized Query: {optimized_query}")
-            
-            # Initialize Tavily search
-            search_tool = TavilySearch(api_key=os.getenv("TAVILY_API_KEY"))
-            
-            # Perform enhanced search
-            results = search_tool.invoke(optimized_query)
-            
-            if not results:
-                return f"No results found for: '{query}'"
-            
-            # Enhanced formatting with context awareness
-            formatted_results = f"🧠 Smart Search Results\n"
-            formatted_results += f"Context: {search_context.upper()}\n"
-            formatted_results += f"Original Query: '{query}'\n"
-            formatted_results += f"AI-Optimized Query: '{optimized_query}'\n"
-            formatted_results += "="*60 + "\n\n"
-            
-            # Process results with enhanced formatting
-            if isinstance(results, (list, dict)):
-                result_list = results.get('results', results) if isinstance(results, dict) else results
-                
-                for i, result in enumerate(result_list[:5], 1):  # Limit to top 5 results
-                    if isinstance(result, dict):
-                        title = result.get('title', 'No title')
-                        url = result.get('url', 'No URL')
-                        content = result.get('content', 'No content available')
-                        
-                        formatted_results += f"🔍 Result #{i}: {title}\n"
-                        formatted_results += f"🌐 Source: {url}\n"
-                        formatted_results += f"📄 Summary: {content[:300]}...\n"
-                        formatted_results += "-"*40 + "\n\n"
-            else:
-                formatted_results += f"Search Results: {str(results)}\n"
-            
-            return formatted_results
-            
-        except Exception as e:
-            return f"Error in smart search: {str(e)}"
-    
-    @tool
-    def tavily_financial_search(query: str) -> str:
-        """
-        Specialized financial search tool with AI query optimization for financial markets, IPOs, and investments.
-        
-        Args:
-            query (str): Financial query about markets, stocks, IPOs, etc.
-            
-        Returns:
-            str: Financial search results with market-specific optimization
-        """
-        try:
-            # Create instance for accessing methods
-            web_tool = WebSearchTool()
-            
-            # Generate financial-optimized query
-            financial_query = web_tool._generate_search_query(query, "market")
-            
-            # Add financial context keywords
-            enhanced_financial_query = f"{financial_query} financial market analysis stock price"
-            
-            print(f"💰 Financial Search Query: {query}")
-            print(f"🎯 Market-Optimized: {enhanced_financial_query}")
-            
-            # Initialize search
-            search_tool = TavilySearch(api_key=os.getenv("TAVILY_API_KEY"))
-            
-            # Perform financial search
-            results = search_tool.invoke(enhanced_financial_query)
-            
-            if not results:
-                return f"No financial information found for: '{query}'"
-            
-            # Financial-specific formatting
-            formatted_results = f"💰 FINANCIAL MARKET SEARCH\n"
-            formatted_results += f"Query: '{query}'\n"
-            formatted_results += f"Market-Optimized: '{enhanced_financial_query}'\n"
-            formatted_results += "="*60 + "\n\n"
-            
-            # Process and format financial results
-            if isinstance(results, dict) and 'results' in results:
-                for i, result in enumerate(results['results'][:4], 1):
-                    title = result.get('title', 'No title')
-                    url = result.get('url', 'No URL')
-                    content = result.get('content', 'No content available')
-                    
-                    formatted_results += f"📊 Financial Source #{i}\n"
-                    formatted_results += f"Title: {title}\n"
-                    formatted_results += f"URL: {url}\n"
-                    formatted_results += f"Analysis: {content[:250]}...\n"
-                    formatted_results += "─"*40 + "\n\n"
-            elif isinstance(results, list):
-                for i, result in enumerate(results[:4], 1):
-                    formatted_results += f"📊 Result #{i}: {str(result)}\n\n"
-            else:
-                formatted_results += f"Financial Data: {str(results)}\n"
-            
-            return formatted_results
-            
-        except Exception as e:
-            return f"Error in financial search: {str(e)}"
-    
+        return self.runtime.generate_search_query(user_query, search_type)
+
+    # Each tool runs synchronously under invoke() and natively on the event loop under
+    # ainvoke(), so ToolNode can execute several tool calls from one LLM turn concurrently
+    search_web = StructuredTool.from_function(func=search_web, coroutine=asearch_web)
+    search_ipo_info = StructuredTool.from_function(func=search_ipo_info, coroutine=asearch_ipo_info)
+    tavily_smart_search = StructuredTool.from_function(func=tavily_smart_search, coroutine=atavily_smart_search)
+    tavily_financial_search = StructuredTool.from_function(func=tavily_financial_search, coroutine=atavily_financial_search)
+    search_local_documents = StructuredTool.from_function(func=search_local_documents, coroutine=asearch_local_documents)
+    get_gmp_trend = StructuredTool.from_function(func=get_gmp_trend, coroutine=aget_gmp_trend)
+    calculate_listing_gains = StructuredTool.from_function(func=calculate_listing_gains, coroutine=acalculate_listing_gains)
+    get_subscription_status = StructuredTool.from_function(func=get_subscription_status, coroutine=aget_subscription_status)
+
     def get_tools(self):
         """Return all search tools for LangChain integration"""
-        return [self.search_web, self.search_ipo_info, self.tavily_smart_search, self.tavily_financial_search]
-    
+        return [
+            self.search_web,
+            self.search_ipo_info,
+            self.tavily_smart_search,
+            self.tavily_financial_search,
+            self.search_local_documents,
+            self.get_gmp_trend,
+            self.calculate_listing_gains,
+            self.get_subscription_status,
+        ]
+
     def get_tool(self):
         """Return the general search tool for backward compatibility"""
         return self.search_web
-    
+
     def get_advanced_tools(self):
         """Return advanced AI-powered search tools"""
         return [self.tavily_smart_search, self.tavily_financial_search]
-
@@ -0,0 +1,297 @@
+"""
+Semantic cache of final orchestrator answers.
+
+A new user query is compared with recently answered ones through a local
+character n-gram TF-IDF index (cosine similarity, no embedding model). When
+the best match is similar enough, names the same company and numbers and is
+still fresh, its answer is returned and the whole agent graph is skipped.
+Answers are persisted in SQLite so the cache survives restarts.
+"""
+
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from utils.cassette import cassette_cache_settings
+from utils.doc_index import tokenize
+from utils.query_memo import canonicalize_query
+from utils.query_rewriter import detect_company
+from utils.sqlite_utils import connect_sqlite
+from logger.logger import get_logger
+
+logger = get_logger("answer_cache")
+
+# Questions about figures that move during the day get the shorter freshness window
+_LIVE_RE = re.compile(r"\b(?:gmp|grey market|subscri\w*|live|status|today|now|latest|current)\b")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+# Error texts of the agents and tools; answers carrying them are not worth reusing
+_ERROR_ANSWER_RE = re.compile(
+    r"IPO Agent Error:|Error from IPO Advisor:|\bError (?:performing|getting|computing|calculating|in)\b[^:\n]*:"
+)
+# Conversational filler that does not change what is being asked; modal verbs ("should I ...") do
+_FILLER = frozenset("tell show give list please know want any all some".split())
+# "shouldn't" and "don't" are matched as "should not" and "do not"
+_CONTRACTED_NOT_RE = re.compile(r"n['’]t\b", re.IGNORECASE)
+_NEGATIONS = frozenset("not no never nor without".split())
+
+
+def match_text(query: str) -> str:
+    """
+    Text a query is matched on: canonicalized, without stopwords and filler, words sorted
+    so that "GMP of Swiggy IPO" and "Swiggy IPO GMP" compare equal; negations are kept
+
+    Args:
+        query (str): User query
+
+    Returns:
+        str: Space-separated sorted terms
+    """
+    expanded = _CONTRACTED_NOT_RE.sub(" not", str(query))
+    return " ".join(sorted(token for token in tokenize(canonicalize_query(expanded)) if token not in _FILLER))
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (3, 4, 5)) -> Counter:
+    """
+    Character n-gram counts of a text, with word boundaries marked by spaces
+
+    Args:
+        text (str): Canonicalized query
+        sizes (tuple): n-gram lengths
+
+    Returns:
+        Counter: n-gram -> count
+    """
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for n in sizes for i in range(len(padded) - n + 1))
+
+
+class _Entry:
+    __slots__ = ("id", "query", "live", "company", "numbers", "negated", "answer", "created_at", "latency", "grams")
+
+    def __init__(self, id: int, query: str, answer: str, created_at: float, latency: float):
+        self.id = id
+        self.query = query
+        self.live = bool(_LIVE_RE.search(str(query).lower()))
+        # Company names are recognised by their capitals, so they are detected on the query as typed
+        self.company = (detect_company(str(query)) or "").lower()
+        # Numbers are compared on the canonical form, so relative dates count as the ISO dates they resolve to
+        self.numbers = frozenset(_NUMBER_RE.findall(canonicalize_query(query)))
+        terms = match_text(query)
+        self.negated = any(term in _NEGATIONS for term in terms.split())
+        self.answer = answer
+        self.created_at = created_at
+        self.latency = latency
+        self.grams = char_ngrams(terms)
+
+
+class SemanticAnswerCache:
+    """Recent answers indexed by character n-gram TF-IDF for paraphrase lookups"""
+
+    def __init__(
+        self,
+        path: str = ".cache/answer_cache.sqlite3",
+        min_similarity: float = 0.82,
+        max_age_seconds: int = 30 * 60,
+        live_max_age_seconds: int = 5 * 60,
+        max_entries: int = 500,
+    ):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory cache)
+            min_similarity (float): Cosine similarity a previous query needs to be reused
+            max_age_seconds (int): How long an answer is reused
+            live_max_age_seconds (int): Freshness window for GMP, subscription and other live questions
+            max_entries (int): Number of recent answers kept in the index
+        """
+        self.path = path
+        self.min_similarity = min_similarity
+        self.max_age_seconds = max_age_seconds
+        self.live_max_age_seconds = live_max_age_seconds
+        self.max_entries = max_entries
+
+        self.lookups = 0
+        self.hits = 0
+        self.latency_saved = 0.0
+
+        self._entries: List[_Entry] = []
+        self._df: Counter = Counter()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "SemanticAnswerCache":
+        """Build a cache from the answer_cache section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/answer_cache.sqlite3"),
+            min_similarity=settings.get("min_similarity", 0.82),
+            max_age_seconds=settings.get("max_age_seconds", 30 * 60),
+            live_max_age_seconds=settings.get("live_max_age_seconds", 5 * 60),
+            max_entries=settings.get("max_entries", 500),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use and load the still fresh answers into the index"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    query TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    latency REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("DELETE FROM answer_cache WHERE created_at <= ?", (time.time() - self.max_age_seconds,))
+            conn.commit()
+            self._conn = conn
+            rows = conn.execute(
+                "SELECT id, query, answer, created_at, latency FROM answer_cache ORDER BY created_at DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+            for row in reversed(rows):
+                self._index(_Entry(*row))
+        return self._conn
+
+    def _index(self, entry: _Entry) -> None:
+        self._entries.append(entry)
+        self._df.update(entry.grams.keys())
+
+    def _unindex(self, entry: _Entry) -> None:
+        self._entries.remove(entry)
+        self._df.subtract(entry.grams.keys())
+
+    def _vector(self, grams: Counter) -> Dict[str, float]:
+        """Sublinear TF-IDF weights, L2-normalized"""
+        total = len(self._entries) + 1
+        weights = {
+            gram: (1 + math.log(count)) * (math.log((1 + total) / (1 + self._df[gram])) + 1)
+            for gram, count in grams.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {gram: weight / norm for gram, weight in weights.items()}
+
+    def _expire(self, now: float) -> None:
+        for entry in [
+            entry for entry in self._entries
+            if now - entry.created_at > (self.live_max_age_seconds if entry.live else self.max_age_seconds)
+        ]:
+            self._unindex(entry)
+
+    def lookup(self, query: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find a fresh answer to the same question, however it was phrased
+
+        Args:
+            query (str): User query
+            now (float): Current time (defaults to now)
+
+        Returns:
+            dict: answer, matched_query, similarity, age and the latency the original run took;
+                  None if no previous query is similar and fresh enough
+        """
+        now = now or time.time()
+        probe = _Entry(0, query, "", now, 0.0)
+        with self._lock:
+            self._connection()
+            self._expire(now)
+            self.lookups += 1
+            vector = self._vector(probe.grams)
+            best, best_score = None, 0.0
+            for entry in self._entries:
+                # Paraphrases only count when they ask about the same company and figures, the same way round
+                if entry.company != probe.company or entry.numbers != probe.numbers or entry.negated != probe.negated:
+                    continue
+                candidate = self._vector(entry.grams)
+                score = sum(weight * candidate.get(gram, 0.0) for gram, weight in vector.items())
+                if score > best_score:
+                    best, best_score = entry, score
+            if best is None or best_score < self.min_similarity:
+                return None
+            self.hits += 1
+            self.latency_saved += best.latency
+            self._conn.execute("UPDATE answer_cache SET hits = hits + 1 WHERE id = ?", (best.id,))
+            self._conn.commit()
+        logger.info(f"Answer cache hit ({best_score:.2f}): '{query}' ~ '{best.query}'")
+        return {
+            "answer": best.answer,
+            "matched_query": best.query,
+            "similarity": round(best_score, 3),
+            "age_seconds": now - best.created_at,
+            "latency_saved": best.latency,
+        }
+
+    def store(self, query: str, answer: str, latency: float, now: Optional[float] = None) -> None:
+        """
+        Remember the answer to a query (error answers are skipped)
+
+        Args:
+            query (str): User query
+            answer (str): Final answer returned to the user
+            latency (float): Seconds the full agent run took, reported as saved on later hits
+            now (float): Answer time (defaults to now)
+        """
+        if not answer or not str(query).strip() or _ERROR_ANSWER_RE.search(str(answer)):
+            return
+        now = now or time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "INSERT INTO answer_cache (query, answer, created_at, latency) VALUES (?, ?, ?, ?)",
+                (query, answer, now, latency),
+            )
+            self._index(_Entry(cursor.lastrowid, query, answer, now, latency))
+            while len(self._entries) > self.max_entries:
+                oldest = self._entries[0]
+                self._unindex(oldest)
+                conn.execute("DELETE FROM answer_cache WHERE id = ?", (oldest.id,))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and the agent latency the hits avoided"""
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 2),
+        }
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened (and the index reloaded) on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._entries.clear()
+                self._df.clear()
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_loaded = False
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """
+    Return the process-wide answer cache configured in config/config.yaml
+
+    Returns:
+        SemanticAnswerCache: The shared cache, or None when disabled in config
+    """
+    global _answer_cache, _answer_cache_loaded
+    if not _answer_cache_loaded:
+        with _answer_cache_lock:
+            if not _answer_cache_loaded:
+                settings = cassette_cache_settings("answer_cache")
+                if settings.get("enabled", True):
+                    _answer_cache = SemanticAnswerCache.from_config(settings)
+                _answer_cache_loaded = True
+    return _answer_cache
@@ -0,0 +1,293 @@
+"""
+Background warm-cache scheduler for IPO searches.
+
+Periodically refreshes the upcoming / recent IPO lists, market-wide GMP, the
+hottest recent user queries and per-company GMP / subscription lookups for the
+IPOs extracted from those lists, so user-facing queries hit a warm search
+cache. Refreshes run every few minutes during Indian market hours and much
+less often when the market is closed; each run only re-fetches cache entries
+that have expired or are about to.
+"""
+
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from utils.config_loader import load_config_section
+from utils.search_cache import force_refresh
+from utils.search_runtime import get_search_runtime
+from logger.logger import get_logger
+
+logger = get_logger("cache_warmer")
+
+# India has no daylight saving, so a fixed offset is exact
+IST = timezone(timedelta(hours=5, minutes=30), name="IST")
+
+
+def _parse_clock(value: str) -> dt_time:
+    hours, minutes = str(value).split(":")
+    return dt_time(int(hours), int(minutes))
+
+
+class MarketHoursSchedule:
+    """Refresh interval depending on where we are in the NSE/BSE trading day"""
+
+    def __init__(
+        self,
+        market_open: str = "09:00",
+        market_close: str = "15:30",
+        lead_minutes: int = 30,
+        market_interval_seconds: int = 300,
+        off_hours_interval_seconds: int = 3600,
+        closed_interval_seconds: int = 4 * 60 * 60,
+    ):
+        """
+        Args:
+            market_open (str): Pre-open start, HH:MM IST
+            market_close (str): Market close, HH:MM IST
+            lead_minutes (int): Start the market-hours cadence this long before the open
+            market_interval_seconds (int): Interval while the market is open
+            off_hours_interval_seconds (int): Interval on trading days outside market hours
+            closed_interval_seconds (int): Interval on weekends
+        """
+        self.market_open = _parse_clock(market_open)
+        self.market_close = _parse_clock(market_close)
+        self.lead = timedelta(minutes=lead_minutes)
+        self.market_interval = market_interval_seconds
+        self.off_hours_interval = off_hours_interval_seconds
+        self.closed_interval = closed_interval_seconds
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "MarketHoursSchedule":
+        """Build a schedule from the cache_warmer section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            market_open=settings.get("market_open", "09:00"),
+            market_close=settings.get("market_close", "15:30"),
+            lead_minutes=settings.get("lead_minutes", 30),
+            market_interval_seconds=settings.get("market_interval_seconds", 300),
+            off_hours_interval_seconds=settings.get("off_hours_interval_seconds", 3600),
+            closed_interval_seconds=settings.get("closed_interval_seconds", 4 * 60 * 60),
+        )
+
+    def _session(self, now: datetime):
+        day = now.date()
+        opens = datetime.combine(day, self.market_open, tzinfo=IST) - self.lead
+        closes = datetime.combine(day, self.market_close, tzinfo=IST)
+        return opens, closes
+
+    def is_trading_day(self, now: datetime) -> bool:
+        return now.astimezone(IST).weekday() < 5
+
+    def is_market_hours(self, now: Optional[datetime] = None) -> bool:
+        """True from lead_minutes before the open until the close on weekdays"""
+        now = (now or datetime.now(IST)).astimezone(IST)
+        opens, closes = self._session(now)
+        return self.is_trading_day(now) and opens <= now <= closes
+
+    def next_interval(self, now: Optional[datetime] = None) -> float:
+        """
+        Seconds until the next refresh
+
+        Args:
+            now (datetime): Current time (defaults to now)
+
+        Returns:
+            float: Delay, never sleeping past the start of the next market session
+        """
+        now = (now or datetime.now(IST)).astimezone(IST)
+        if self.is_market_hours(now):
+            return self.market_interval
+        interval = self.off_hours_interval if self.is_trading_day(now) else self.closed_interval
+        # Wake up in time for the pre-open warm-up
+        next_open = self._session(now)[0]
+        while next_open <= now or next_open.weekday() >= 5:
+            next_open = self._session(next_open + timedelta(days=1))[0]
+        return max(1.0, min(interval, (next_open - now).total_seconds()))
+
+
+class CacheWarmer:
+    """Refreshes the search cache for IPO queries ahead of user demand"""
+
+    def __init__(
+        self,
+        runtime: Any,
+        schedule: Optional[MarketHoursSchedule] = None,
+        max_companies: int = 30,
+        hot_queries: int = 10,
+        hot_window_seconds: int = 24 * 60 * 60,
+        compact_interval_seconds: int = 24 * 60 * 60,
+        refresh_ahead_seconds: float = 60.0,
+    ):
+        """
+        Args:
+            runtime (SearchRuntime): Shared search runtime whose clients and cache are warmed
+            schedule (MarketHoursSchedule): Refresh cadence
+            max_companies (int): Cap on per-company lookups per run
+            hot_queries (int): Number of hottest user queries replayed per run
+            hot_window_seconds (int): Query log window used to rank hot queries and companies
+            compact_interval_seconds (int): Minimum time between storage compactions (run outside market hours)
+            refresh_ahead_seconds (float): Re-fetch cache entries expiring within this window; fresher ones are kept
+        """
+        self.runtime = runtime
+        self.schedule = schedule or MarketHoursSchedule()
+        self.max_companies = max_companies
+        self.hot_queries = hot_queries
+        self.hot_window_seconds = hot_window_seconds
+        self.compact_interval_seconds = compact_interval_seconds
+        self.last_compaction = time.time()
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.last_run: Dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, runtime: Any, settings: Optional[dict] = None) -> "CacheWarmer":
+        """Build a warmer from the cache_warmer section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            runtime,
+            schedule=MarketHoursSchedule.from_config(settings),
+            max_companies=settings.get("max_companies", 30),
+            hot_queries=settings.get("hot_queries", 10),
+            hot_window_seconds=settings.get("hot_window_seconds", 24 * 60 * 60),
+            compact_interval_seconds=settings.get("compact_interval_seconds", 24 * 60 * 60),
+            refresh_ahead_seconds=settings.get("refresh_ahead_seconds", 60.0),
+        )
+
+    def live_companies(self, *responses: Any) -> List[str]:
+        """Companies of the IPO records extracted from list results, then the upcoming IPOs in the store"""
+        names = []
+        for response in responses:
+            if isinstance(response, dict):
+                names.extend(record.get("company") for record in response.get("records") or [])
+        store = self.runtime.ipo_search.ipo_store
+        if store is not None:
+            try:
+                names.extend(record.get("company") for record in store.upcoming())
+            except Exception as e:
+                logger.warning(f"Could not read upcoming IPOs from the store: {e}")
+        companies = []
+        for name in names:
+            if name and name not in companies:
+                companies.append(name)
+        return companies
+
+    def companies_to_warm(self, live: List[str]) -> List[str]:
+        """Hottest companies from the query log first, then the live ones"""
+        hot = []
+        if self.runtime.query_log is not None:
+            hot = self.runtime.query_log.hot_companies(self.max_companies, self.hot_window_seconds)
+        ordered = []
+        seen = set()
+        for company in hot + live:
+            if company.lower() not in seen:
+                seen.add(company.lower())
+                ordered.append(company)
+        return ordered[:self.max_companies]
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Refresh everything once
+
+        Returns:
+            dict: Counts of refreshed lists, queries and company lookups, plus elapsed seconds
+        """
+        started = time.perf_counter()
+        ipo_search = self.runtime.ipo_search
+        market_hours = self.schedule.is_market_hours()
+
+        # Entries that outlive the refresh-ahead window are still fresh and skipped
+        with force_refresh(self.refresh_ahead_seconds):
+            # Market-wide lists first: they are what "today's IPOs" questions need
+            upcoming = ipo_search.search_upcoming_ipos()
+            recent = ipo_search.search_recent_ipos()
+            gmp = ipo_search.search_ipo_gmp()
+
+            # Hottest user questions, through the same path as the search_ipo_info tool
+            queries = []
+            if self.runtime.query_log is not None:
+                hottest = self.runtime.query_log.hot_queries(self.hot_queries, self.hot_window_seconds)
+                queries = [query for query, search_type in hottest if search_type == "ipo"]
+            for query in queries:
+                optimized_query = self.runtime.generate_search_query(query, "ipo")
+                ipo_search.tavily_search_with_custom_query(optimized_query, search_type="ipo")
+
+            companies = self.companies_to_warm(self.live_companies(upcoming, gmp))
+            # Live numbers only move while the market is open
+            live_kinds = ("gmp", "subscription") if market_hours else ("gmp",)
+            lookups = sum(1 for _ in ipo_search.search_many(companies, kinds=live_kinds))
+
+        # Background lookups have day-long TTLs: only fetched when missing or expired
+        lookups += sum(1 for _ in ipo_search.search_many(companies, kinds=("company",)))
+
+        self.runs += 1
+        self.last_run = {
+            "lists": 3,
+            "queries": len(queries),
+            "companies": len(companies),
+            "lookups": lookups,
+            "market_hours": market_hours,
+            "elapsed": round(time.perf_counter() - started, 2),
+        }
+        logger.info(f"Cache warm-up run {self.runs}: {self.last_run}")
+        return self.last_run
+
+    def compact_if_due(self) -> Optional[Dict[str, Any]]:
+        """Compact the cache and index storage once per interval, never during market hours"""
+        if self.schedule.is_market_hours() or time.time() - self.last_compaction < self.compact_interval_seconds:
+            return None
+        self.last_compaction = time.time()
+        return self.runtime.compact_storage()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.compact_if_due()
+            except Exception as e:
+                logger.warning(f"Cache warm-up run failed: {e}")
+            self._stop.wait(self.schedule.next_interval())
+
+    def start(self) -> "CacheWarmer":
+        """Run the warmer in a daemon thread; a no-op if already running"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+            self._thread.start()
+            logger.info("Cache warmer started")
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread after its current run"""
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+
+_warmer: Optional[CacheWarmer] = None
+_warmer_lock = threading.Lock()
+
+
+def start_cache_warmer() -> Optional[CacheWarmer]:
+    """
+    Start the process-wide cache warmer on the shared search runtime
+
+    Returns:
+        CacheWarmer: The running warmer, or None when disabled in config
+    """
+    global _warmer
+    settings = load_config_section("cache_warmer")
+    if not settings.get("enabled", True):
+        return None
+    with _warmer_lock:
+        if _warmer is None or not _warmer.running:
+            runtime = get_search_runtime()
+            _warmer = CacheWarmer.from_config(runtime, settings)
+            runtime.add_closer(_warmer.stop)
+            _warmer.start()
+        return _warmer
@@ -0,0 +1,458 @@
+"""
+Record/replay cassette for Tavily searches and Groq chat calls.
+
+In record mode every TavilySearch and ChatGroq call made through the search
+tools and agents is passed through to the real client and its response is
+appended to a gzip-compressed JSON-lines cassette. In replay mode the same
+calls are answered from the cassette, with simulated latency, so the whole
+orchestrator pipeline can be benchmarked and profiled offline without API keys.
+
+The mode comes from the cassette section of config/config.yaml and can be
+overridden with the CASSETTE_MODE, CASSETTE_PATH and CASSETTE_LATENCY
+environment variables.
+"""
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from utils.llm_proxy import DelegatingChatModel
+from utils.config_loader import load_config_section
+from logger.logger import get_logger
+
+logger = get_logger("cassette")
+
+MODES = ("off", "record", "replay")
+
+# Timestamps that change between the recording and the replay run (prompts embed the current date)
+_VOLATILE_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"
+    r"|\b\d{1,2} (?:January|February|March|April|May|June|July|August|September|October|November|December) \d{4}\b"
+    r"|\b(?:January|February|March|April|May|June|July|August|September|October|November|December) \d{4}\b"
+)
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a call was never recorded"""
+
+
+def mask_volatile(text: str) -> str:
+    """Replace dates and times so a recording still matches on a later day"""
+    return _VOLATILE_RE.sub("<date>", text)
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(mask_volatile(raw).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Append-only store of recorded responses keyed by request fingerprint"""
+
+    def __init__(
+        self,
+        path: str = ".cache/cassette.jsonl.gz",
+        mode: str = "record",
+        latency: Any = "recorded",
+        latency_scale: float = 1.0,
+        flush_every: int = 20,
+    ):
+        """
+        Args:
+            path (str): Cassette file (gzip-compressed JSON lines)
+            mode (str): 'record' or 'replay'
+            latency: 'recorded' to replay each call's measured duration, or a fixed number of seconds
+            latency_scale (float): Multiplier applied to the simulated latency (0 disables it)
+            flush_every (int): Number of new recordings buffered before they are written out
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = float(latency_scale)
+        self.flush_every = flush_every
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+
+        if self.replaying:
+            self._load()
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "Cassette":
+        """Build a cassette from the cassette section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/cassette.jsonl.gz"),
+            mode=settings.get("mode", "record"),
+            latency=settings.get("latency", "recorded"),
+            latency_scale=settings.get("latency_scale", 1.0),
+            flush_every=settings.get("flush_every", 20),
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.warning(f"Cassette {self.path} does not exist; every call will miss")
+            return
+        # Concatenated gzip members (one per flush) read back as a single stream
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in self._entries.values())} recordings from {self.path}")
+
+    def key(self, kind: str, payload: Any) -> str:
+        """Fingerprint of a request ('search' or 'llm') with volatile timestamps masked"""
+        return f"{kind}:{_digest(payload)}"
+
+    def record(self, key: str, label: str, response: Any, latency: float) -> None:
+        """
+        Store one response
+
+        Args:
+            key (str): Request fingerprint from key()
+            label (str): Short human-readable description (query or model name)
+            response: JSON-serializable response
+            latency (float): Measured duration of the real call in seconds
+        """
+        entry = {"key": key, "label": label[:200], "latency": round(latency, 4), "response": response}
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            self._pending.append(entry)
+            self.recorded += 1
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def lookup(self, key: str, label: str = "") -> Dict[str, Any]:
+        """
+        Next recording for a request; repeated calls walk through the recordings in order
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.missed += 1
+                raise CassetteMissError(f"No cassette recording for {label[:80]!r} ({key})")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.replayed += 1
+            # Once exhausted, keep serving the last recording
+            return entries[min(cursor, len(entries) - 1)]
+
+    def delay_for(self, entry: Dict[str, Any]) -> float:
+        """Simulated latency for a replayed entry"""
+        if self.latency == "recorded":
+            base = float(entry.get("latency", 0.0))
+        else:
+            base = float(self.latency or 0.0)
+        return max(0.0, base * self.latency_scale)
+
+    def flush(self) -> None:
+        """Append buffered recordings to the cassette file"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for entry in pending:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "keys": len(self._entries),
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "missed": self.missed,
+            }
+
+
+class CassetteSearchTool:
+    """TavilySearch stand-in that records or replays invoke/ainvoke calls"""
+
+    def __init__(self, search_tool: Any, cassette: Cassette):
+        """
+        Args:
+            search_tool: Real TavilySearch client (None in replay mode)
+            cassette (Cassette): Cassette to record to or replay from
+        """
+        self.search_tool = search_tool
+        self.cassette = cassette
+
+    def _key(self, query: Any) -> str:
+        return self.cassette.key("search", query)
+
+    def invoke(self, query: Any, *args, **kwargs) -> Any:
+        key = self._key(query)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key, str(query))
+            time.sleep(self.cassette.delay_for(entry))
+            return entry["response"]
+        started = time.perf_counter()
+        result = self.search_tool.invoke(query, *args, **kwargs)
+        self.cassette.record(key, str(query), result, time.perf_counter() - started)
+        return result
+
+    async def ainvoke(self, query: Any, *args, **kwargs) -> Any:
+        key = self._key(query)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key, str(query))
+            await asyncio.sleep(self.cassette.delay_for(entry))
+            return entry["response"]
+        started = time.perf_counter()
+        result = await self.search_tool.ainvoke(query, *args, **kwargs)
+        self.cassette.record(key, str(query), result, time.perf_counter() - started)
+        return result
+
+
+def _message_fingerprint(message: BaseMessage) -> Dict[str, Any]:
+    """The parts of a message that determine the model's answer (no run ids)"""
+    return {
+        "type": message.type,
+        "content": message.content,
+        "tool_calls": [
+            {"name": call["name"], "args": call["args"], "id": call.get("id")}
+            for call in getattr(message, "tool_calls", None) or []
+        ],
+        "tool_call_id": getattr(message, "tool_call_id", None),
+    }
+
+
+class CassetteChatModel(DelegatingChatModel):
+    """Chat model that records or replays the wrapped ChatGroq model's responses"""
+
+    cassette: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-chat-model"
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+        payload = {
+            "model": self.model_name,
+            "messages": [_message_fingerprint(message) for message in messages],
+            "stop": stop,
+            "kwargs": kwargs,
+        }
+        return self.cassette.key("llm", payload)
+
+    @staticmethod
+    def _dump(result: ChatResult) -> Dict[str, Any]:
+        return {
+            "messages": messages_to_dict([generation.message for generation in result.generations]),
+            "llm_output": result.llm_output,
+        }
+
+    @staticmethod
+    def _load(response: Dict[str, Any]) -> ChatResult:
+        messages = messages_from_dict(response["messages"])
+        for message in messages:
+            # Fresh run ids, so replaying a recording twice in one thread does not overwrite the first reply
+            message.id = None
+        return ChatResult(
+            generations=[ChatGeneration(message=message) for message in messages],
+            llm_output=response.get("llm_output"),
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key, self.model_name)
+            time.sleep(self.cassette.delay_for(entry))
+            return self._load(entry["response"])
+        started = time.perf_counter()
+        result = self._require_inner()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.cassette.record(key, self.model_name, self._dump(result), time.perf_counter() - started)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key, self.model_name)
+            await asyncio.sleep(self.cassette.delay_for(entry))
+            return self._load(entry["response"])
+        started = time.perf_counter()
+        result = await self._require_inner()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.cassette.record(key, self.model_name, self._dump(result), time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def _as_chunk(result: ChatResult) -> ChatGenerationChunk:
+        message = result.generations[0].message
+        chunk = AIMessageChunk(
+            content=message.content,
+            additional_kwargs=message.additional_kwargs,
+            response_metadata=message.response_metadata,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call.get("id"), "index": index}
+                for index, call in enumerate(getattr(message, "tool_calls", None) or [])
+            ],
+            id=message.id,
+        )
+        return ChatGenerationChunk(message=chunk)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # Recordings hold whole responses, so a stream is a single chunk
+        chunk = self._as_chunk(self._generate(messages, stop=stop, **kwargs))
+        if run_manager:
+            run_manager.on_llm_new_token(str(chunk.message.content), chunk=chunk)
+        yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        chunk = self._as_chunk(await self._agenerate(messages, stop=stop, **kwargs))
+        if run_manager:
+            await run_manager.on_llm_new_token(str(chunk.message.content), chunk=chunk)
+        yield chunk
+
+
+_cassette: Optional[Cassette] = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    Return the process-wide cassette
+
+    Returns:
+        Cassette: The shared cassette, or None when recording and replay are off
+    """
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                settings = dict(load_config_section("cassette"))
+                for env_name, field in (("CASSETTE_MODE", "mode"), ("CASSETTE_PATH", "path"), ("CASSETTE_LATENCY", "latency")):
+                    if os.getenv(env_name):
+                        settings[field] = os.environ[env_name]
+                mode = str(settings.get("mode", "off")).lower()
+                if mode not in MODES:
+                    raise ValueError(f"Unsupported cassette mode: {mode} (expected one of {MODES})")
+                if isinstance(settings.get("latency"), str) and settings["latency"] != "recorded":
+                    settings["latency"] = float(settings["latency"])
+                if mode != "off":
+                    settings["mode"] = mode
+                    _cassette = Cassette.from_config(settings)
+                    atexit.register(_cassette.flush)
+                    logger.info(f"Cassette {mode} mode: {_cassette.path}")
+                _cassette_loaded = True
+    return _cassette
+
+
+def cassette_replaying() -> bool:
+    """True when API calls are served from the cassette (no API keys needed)"""
+    cassette = get_cassette()
+    return cassette is not None and cassette.replaying
+
+
+def cassette_cache_settings(section: str, in_memory: bool = True) -> dict:
+    """
+    Settings of a persistent cache, kept away from .cache/ while the cassette is on
+
+    Caches in front of the cassette would otherwise answer a recording run from
+    earlier sessions, so those calls never reach the cassette, and a replay run
+    from whatever is still fresh on disk.
+
+    Args:
+        section (str): Config section of the cache, e.g. "search_cache"
+        in_memory (bool): True for SQLite caches, which get a private in-memory database;
+                          False for directory-backed stores, which are disabled
+
+    Returns:
+        dict: The section's settings, isolated when recording or replaying
+    """
+    settings = dict(load_config_section(section))
+    if get_cassette() is not None:
+        if in_memory:
+            settings["path"] = ":memory:"
+        else:
+            settings["enabled"] = False
+        settings["segment_store"] = {"enabled": False}
+    return settings
+
+
+def cassette_search_client(factory: Callable[[], Any]) -> Any:
+    """
+    Tavily client, wrapped for recording or replay when the cassette is on
+
+    Args:
+        factory (Callable): Builds the real TavilySearch client; not called in replay mode
+
+    Returns:
+        The real client, or a CassetteSearchTool
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return factory()
+    return CassetteSearchTool(None if cassette.replaying else factory(), cassette)
+
+
+def cassette_chat_model(model_name: str, factory: Callable[[], BaseChatModel]) -> BaseChatModel:
+    """
+    Chat model, wrapped for recording or replay when the cassette is on
+
+    Args:
+        model_name (str): Model name used in the request fingerprint
+        factory (Callable): Builds the real ChatGroq model; not called in replay mode
+
+    Returns:
+        BaseChatModel: The real model, or a CassetteChatModel
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return factory()
+    inner = None if cassette.replaying else factory()
+    return CassetteChatModel(inner=inner, model_name=model_name, cassette=cassette)
@@ -5,4 +5,12 @@ def load_config(config_path: str = "config/config.yaml") -> dict:
     with open(config_path, "r") as file:
         config = yaml.safe_load(file)
         # print(config)
-    return config
\ No newline at end of file
+    return config
+
+def load_config_section(section: str, config_path: str = "config/config.yaml") -> dict:
+    """Return one top-level section of the config, or {} if it (or the file) is missing"""
+    try:
+        config = load_config(config_path)
+    except FileNotFoundError:
+        return {}
+    return (config or {}).get(section) or {}
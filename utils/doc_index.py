@@ -0,0 +1,381 @@
+"""
+Offline full-text index over every fetched search document.
+
+Each Tavily result stored by CachedSearchTool is also added to an incremental
+inverted index in SQLite (one posting per term and document) and ranked with
+BM25 at query time, so follow-up and repeat questions can be answered from
+local retrieval without a live search. With a segment store, document text is
+kept compressed in segment files and only decompressed for returned hits.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from utils.cassette import cassette_cache_settings
+from utils.sqlite_utils import connect_sqlite, ensure_column
+from utils.segment_store import SegmentStore, segment_store_for
+from utils.result_merge import canonicalize_url, extract_results
+from logger.logger import get_logger
+
+logger = get_logger("doc_index")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+# Words too common in search snippets to help ranking
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "what which who how when where why do does did can i me my you your about into than then there their "
+    "today latest news".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms
+
+    Args:
+        text (str): Document or query text
+
+    Returns:
+        list: Lower-cased word and number tokens without stopwords
+    """
+    return [token for token in _TOKEN_RE.findall(str(text).lower()) if token not in STOPWORDS]
+
+
+class DocumentIndex:
+    """SQLite-backed inverted index of search result documents ranked with BM25"""
+
+    def __init__(
+        self,
+        path: str = ".cache/doc_index.sqlite3",
+        k1: float = 1.5,
+        b: float = 0.75,
+        max_documents: int = 20000,
+        max_age_seconds: Optional[int] = 3 * 24 * 60 * 60,
+        content_store: Optional[SegmentStore] = None,
+    ):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory index)
+            k1 (float): BM25 term-frequency saturation
+            b (float): BM25 document-length normalization
+            max_documents (int): Upper bound on indexed documents before the oldest are dropped
+            max_age_seconds (int): Documents fetched longer ago are not returned (None for no limit)
+            content_store (SegmentStore): Compressed segment files for document text, or None to keep it inline
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_documents = max_documents
+        self.max_age_seconds = max_age_seconds
+        self.content_store = content_store
+
+        self.searches = 0
+        self.added = 0
+        self.unchanged = 0
+
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._doc_count = 0
+        self._total_length = 0
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "DocumentIndex":
+        """Build an index from the doc_index section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/doc_index.sqlite3"),
+            k1=settings.get("k1", 1.5),
+            b=settings.get("b", 0.75),
+            max_documents=settings.get("max_documents", 20000),
+            max_age_seconds=settings.get("max_age_seconds", 3 * 24 * 60 * 60),
+            content_store=segment_store_for("doc_index", ".cache/segments/doc_index"),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close())"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    search_type TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_fetched ON documents(fetched_at);
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+                """
+            )
+            ensure_column(conn, "documents", "content_ref", "TEXT")
+            conn.commit()
+            self._doc_count, self._total_length = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents"
+            ).fetchone()
+            self._conn = conn
+        return self._conn
+
+    def _remove(self, conn: sqlite3.Connection, doc_id: int, length: int) -> None:
+        conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        self._doc_count -= 1
+        self._total_length -= length
+
+    def add_documents(self, results: Any, search_type: str = "general", fetched_at: Optional[float] = None) -> int:
+        """
+        Index the documents of a search response
+
+        A URL that is already indexed with the same text only has its fetch time
+        bumped; changed text replaces the old postings.
+
+        Args:
+            results (Any): Tavily response dict or list of result dicts
+            search_type (str): Search type the response was fetched for
+            fetched_at (float): Fetch time (defaults to now)
+
+        Returns:
+            int: Number of new or changed documents indexed
+        """
+        fetched_at = fetched_at or time.time()
+        indexed = 0
+        with self._lock:
+            conn = self._connection()
+            for result in extract_results(results):
+                url = canonicalize_url(result.get("url", ""))
+                title = str(result.get("title") or "")
+                content = str(result.get("content") or "")
+                if not url or not content:
+                    continue
+                terms = Counter(tokenize(f"{title} {content}"))
+                if not terms:
+                    continue
+                digest = hashlib.sha1(f"{title}\x1f{content}".encode("utf-8")).hexdigest()
+
+                row = conn.execute("SELECT doc_id, digest, length FROM documents WHERE url = ?", (url,)).fetchone()
+                if row is not None and row[1] == digest:
+                    conn.execute("UPDATE documents SET fetched_at = ? WHERE doc_id = ?", (fetched_at, row[0]))
+                    self.unchanged += 1
+                    continue
+                if row is not None:
+                    self._remove(conn, row[0], row[2])
+
+                length = sum(terms.values())
+                content_ref = None
+                if self.content_store is not None:
+                    content_ref, content = self.content_store.put(content.encode("utf-8")), ""
+                doc_id = conn.execute(
+                    """
+                    INSERT INTO documents (url, title, content, search_type, digest, length, fetched_at, content_ref)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (url, title, content, search_type, digest, length, fetched_at, content_ref),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in terms.items()],
+                )
+                self._doc_count += 1
+                self._total_length += length
+                indexed += 1
+            if indexed:
+                self._evict(conn)
+            conn.commit()
+            self.added += indexed
+        return indexed
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop the least recently fetched documents above max_documents"""
+        overflow = self._doc_count - self.max_documents
+        if overflow <= 0:
+            return
+        rows = conn.execute("SELECT doc_id, length FROM documents ORDER BY fetched_at ASC LIMIT ?", (overflow,)).fetchall()
+        for doc_id, length in rows:
+            self._remove(conn, doc_id, length)
+
+    def backfill(self, payloads: Iterable[tuple]) -> int:
+        """
+        Index previously cached responses, e.g. the search cache on first start
+
+        Args:
+            payloads (Iterable): (search type, payload, created_at) tuples
+
+        Returns:
+            int: Number of documents indexed
+        """
+        return sum(self.add_documents(payload, search_type, created_at) for search_type, payload, created_at in payloads)
+
+    def search(self, query: str, k: int = 5, search_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Rank indexed documents against a query with BM25
+
+        Args:
+            query (str): Free-text query
+            k (int): Maximum number of documents returned
+            search_type (str): Only return documents fetched for this search type
+
+        Returns:
+            list: Documents (url, title, content, search_type, fetched_at, score, coverage)
+                  best first, where coverage is the share of query terms the document contains
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            conn = self._connection()
+            self.searches += 1
+            if not self._doc_count:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            postings = conn.execute(
+                f"SELECT term, doc_id, tf FROM postings WHERE term IN ({placeholders})", terms
+            ).fetchall()
+            if not postings:
+                return []
+
+            doc_freq = Counter(term for term, _, _ in postings)
+            doc_ids = {doc_id for _, doc_id, _ in postings}
+            id_placeholders = ",".join("?" * len(doc_ids))
+            lengths = dict(conn.execute(
+                f"SELECT doc_id, length FROM documents WHERE doc_id IN ({id_placeholders})", list(doc_ids)
+            ).fetchall())
+            doc_count = self._doc_count
+            average_length = self._total_length / doc_count
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = Counter()
+        for term, doc_id, tf in postings:
+            df = doc_freq[term]
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[doc_id] / average_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            matched[doc_id] += 1
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        min_fetched = time.time() - self.max_age_seconds if self.max_age_seconds else 0.0
+        documents = []
+        with self._lock:
+            conn = self._connection()
+            for doc_id in ranked:
+                row = conn.execute(
+                    "SELECT url, title, content, search_type, fetched_at, content_ref FROM documents WHERE doc_id = ?",
+                    (doc_id,),
+                ).fetchone()
+                if row is None or row[4] < min_fetched or (search_type and row[3] != search_type):
+                    continue
+                content = self._content(row[2], row[5])
+                if content is None:
+                    continue
+                documents.append({
+                    "url": row[0],
+                    "title": row[1],
+                    "content": content,
+                    "search_type": row[3],
+                    "fetched_at": row[4],
+                    "score": round(scores[doc_id], 4),
+                    "coverage": matched[doc_id] / len(terms),
+                })
+                if len(documents) >= k:
+                    break
+        return documents
+
+    def _content(self, content: str, content_ref: Optional[str]) -> Optional[str]:
+        """Document text, decompressed from the segment store when the row only holds a reference"""
+        if not content_ref:
+            return content
+        data = self.content_store.get(content_ref) if self.content_store is not None else None
+        return None if data is None else data.decode("utf-8")
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Drop documents too old to be returned, then rewrite the segment files so they only
+        hold the text of the remaining documents
+
+        Returns:
+            dict: Number of documents removed and texts kept in the segment store
+        """
+        with self._lock:
+            conn = self._connection()
+            removed = 0
+            if self.max_age_seconds:
+                rows = conn.execute(
+                    "SELECT doc_id, length FROM documents WHERE fetched_at < ?", (time.time() - self.max_age_seconds,)
+                ).fetchall()
+                for doc_id, length in rows:
+                    self._remove(conn, doc_id, length)
+                removed = len(rows)
+            kept = 0
+            if self.content_store is not None:
+                refs = [row[0] for row in conn.execute("SELECT content_ref FROM documents WHERE content_ref IS NOT NULL")]
+                moved = self.content_store.compact(refs)
+                conn.executemany("UPDATE documents SET content_ref = ? WHERE content_ref = ?",
+                                 [(new, old) for old, new in moved.items()])
+                # Documents whose text could not be read back are dropped from the index
+                for ref in set(refs) - set(moved):
+                    row = conn.execute("SELECT doc_id, length FROM documents WHERE content_ref = ?", (ref,)).fetchone()
+                    if row is not None:
+                        self._remove(conn, row[0], row[1])
+                kept = len(moved)
+            conn.commit()
+        return {"removed": removed, "kept_contents": kept}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            terms = conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+            return {
+                "documents": self._doc_count,
+                "terms": terms,
+                "searches": self.searches,
+                "added": self.added,
+                "unchanged": self.unchanged,
+                "content_store": self.content_store.stats() if self.content_store is not None else None,
+            }
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self.content_store is not None:
+                self.content_store.close()
+
+
+_doc_index: Optional[DocumentIndex] = None
+_doc_index_loaded = False
+_doc_index_lock = threading.Lock()
+
+
+def get_doc_index() -> Optional[DocumentIndex]:
+    """
+    Return the process-wide document index configured in config/config.yaml
+
+    Returns:
+        DocumentIndex: The shared index, or None when disabled in config
+    """
+    global _doc_index, _doc_index_loaded
+    if not _doc_index_loaded:
+        with _doc_index_lock:
+            if not _doc_index_loaded:
+                settings = cassette_cache_settings("doc_index")
+                if settings.get("enabled", True):
+                    _doc_index = DocumentIndex.from_config(settings)
+                _doc_index_loaded = True
+    return _doc_index
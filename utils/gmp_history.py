@@ -0,0 +1,266 @@
+"""
+Append-only GMP history per IPO.
+
+Every GMP value extracted from search results is appended as a fixed-size
+(timestamp, GMP, GMP %) sample to one binary file per company. Files are read
+back through numpy.memmap, so trend, momentum, volatility and day-over-day
+change are vectorized computations over the whole history instead of more
+searches and LLM reasoning.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from utils.cassette import cassette_cache_settings
+from utils.ipo_extractor import IPORecord
+from utils.ipo_store import company_key
+
+# One sample on disk: observation time (epoch seconds), GMP in ₹, GMP as % of the issue price (NaN if unknown)
+SAMPLE_DTYPE = np.dtype([("ts", "<f8"), ("gmp", "<f4"), ("gmp_percent", "<f4")])
+
+# Daily buckets follow the Indian trading day
+IST_OFFSET_SECONDS = 5.5 * 60 * 60
+
+
+def parse_observed_at(value: Any, now: Optional[float] = None) -> float:
+    """
+    Observation time of a sample from a result's published date
+
+    Args:
+        value (Any): ISO or RFC 2822 date string, epoch seconds, or None
+        now (float): Fallback and upper bound (defaults to the current time)
+
+    Returns:
+        float: Epoch seconds, never in the future
+    """
+    now = now or time.time()
+    if isinstance(value, (int, float)):
+        return min(float(value), now)
+    if not value:
+        return now
+    text = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return now
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return min(parsed.timestamp(), now)
+
+
+class GMPHistory:
+    """Memory-mappable, append-only GMP samples with vectorized trend queries"""
+
+    def __init__(self, directory: str = ".cache/gmp_history", min_interval_seconds: int = 15 * 60, momentum_hours: float = 24.0):
+        """
+        Args:
+            directory (str): Directory holding one .gmp file per company
+            min_interval_seconds (int): An unchanged GMP is only re-recorded after this long
+            momentum_hours (float): Default look-back for the momentum change in trend()
+        """
+        self.directory = directory
+        self.min_interval_seconds = min_interval_seconds
+        self.momentum_hours = momentum_hours
+        self.appended = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._last: Dict[str, Tuple[float, float]] = {}
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "GMPHistory":
+        """Build a history from the gmp_history section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            directory=settings.get("directory", ".cache/gmp_history"),
+            min_interval_seconds=settings.get("min_interval_seconds", 15 * 60),
+            momentum_hours=settings.get("momentum_hours", 24.0),
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key.replace(' ', '_')}.gmp")
+
+    def _samples(self, key: str) -> np.ndarray:
+        """All samples of a company, memory-mapped (empty array if none)"""
+        path = self._path(key)
+        if not os.path.exists(path) or os.path.getsize(path) < SAMPLE_DTYPE.itemsize:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        count = os.path.getsize(path) // SAMPLE_DTYPE.itemsize
+        return np.memmap(path, dtype=SAMPLE_DTYPE, mode="r", shape=(count,))
+
+    def _last_sample(self, key: str) -> Optional[Tuple[float, float]]:
+        if key not in self._last:
+            samples = self._samples(key)
+            if len(samples):
+                newest = samples[np.argmax(samples["ts"])]
+                self._last[key] = (float(newest["ts"]), float(newest["gmp"]))
+        return self._last.get(key)
+
+    def append(self, company: str, gmp: float, gmp_percent: Optional[float] = None, observed_at: Optional[float] = None) -> bool:
+        """
+        Append one GMP sample
+
+        Args:
+            company (str): Company name
+            gmp (float): Grey market premium in ₹
+            gmp_percent (float): GMP as a percentage of the issue price, if known
+            observed_at (float): Observation time in epoch seconds (defaults to now)
+
+        Returns:
+            bool: True if written, False if it repeats the latest sample within min_interval_seconds
+        """
+        key = company_key(company) if company else ""
+        if not key or gmp is None:
+            return False
+        observed_at = observed_at or time.time()
+        sample = np.array(
+            [(observed_at, gmp, np.nan if gmp_percent is None else gmp_percent)], dtype=SAMPLE_DTYPE
+        )
+        with self._lock:
+            last = self._last_sample(key)
+            if last is not None and abs(observed_at - last[0]) < self.min_interval_seconds and float(sample["gmp"][0]) == last[1]:
+                self.skipped += 1
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(key), "ab") as f:
+                f.write(sample.tobytes())
+            if last is None or observed_at >= last[0]:
+                self._last[key] = (observed_at, float(sample["gmp"][0]))
+            self.appended += 1
+        return True
+
+    def append_records(self, records: Iterable[Any], now: Optional[float] = None) -> int:
+        """
+        Append the GMP of extracted IPO records; for a company seen twice the first record wins
+        (records arrive in search rank order)
+
+        Args:
+            records (Iterable): IPORecord instances or record dicts
+            now (float): Observation time for records without a published date
+
+        Returns:
+            int: Number of samples written
+        """
+        written = 0
+        seen = set()
+        for record in records:
+            data = record.to_dict() if isinstance(record, IPORecord) else dict(record)
+            company, gmp = data.get("company"), data.get("gmp")
+            if not company or gmp is None or company_key(company) in seen:
+                continue
+            seen.add(company_key(company))
+            observed_at = parse_observed_at(data.get("published_date"), now)
+            written += self.append(company, gmp, data.get("gmp_percent"), observed_at)
+        return written
+
+    def series(self, company: str, since: Optional[float] = None) -> np.ndarray:
+        """
+        GMP samples of a company in time order
+
+        Args:
+            company (str): Company name
+            since (float): Only samples observed at or after this epoch time
+
+        Returns:
+            np.ndarray: Structured array with 'ts', 'gmp' and 'gmp_percent' fields
+        """
+        samples = np.sort(self._samples(company_key(company)), order="ts")
+        if since is not None:
+            samples = samples[samples["ts"] >= since]
+        return samples
+
+    def trend(self, company: str, since: Optional[float] = None, momentum_hours: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Trend statistics over a company's GMP history
+
+        Args:
+            company (str): Company name
+            since (float): Start of the window (e.g. the IPO open date); defaults to the first sample
+            momentum_hours (float): Look-back for the momentum change (defaults to the configured one)
+
+        Returns:
+            dict: first/last/high/low GMP, absolute and % change over the window, slope per day,
+                  momentum, volatility (std of day-over-day changes), day-over-day change and
+                  direction; None if there are no samples
+        """
+        samples = self.series(company, since)
+        if not len(samples):
+            return None
+        momentum_hours = self.momentum_hours if momentum_hours is None else momentum_hours
+        ts = samples["ts"]
+        gmp = samples["gmp"].astype(np.float64)
+        first, last = gmp[0], gmp[-1]
+
+        # Closing GMP of each IST day
+        days = np.floor((ts + IST_OFFSET_SECONDS) / 86400).astype(np.int64)
+        daily = gmp[np.flatnonzero(np.r_[days[1:] != days[:-1], True])]
+        daily_changes = np.diff(daily)
+
+        elapsed_days = (ts - ts[0]) / 86400
+        slope = float(np.polyfit(elapsed_days, gmp, 1)[0]) if len(gmp) > 1 and elapsed_days[-1] > 0 else 0.0
+        reference = np.searchsorted(ts, ts[-1] - momentum_hours * 3600, side="right") - 1
+        momentum = float(last - gmp[max(reference, 0)])
+
+        def percent(change: float, base: float) -> Optional[float]:
+            return round(change / abs(base) * 100, 2) if base else None
+
+        change = float(last - first)
+        day_change = float(daily_changes[-1]) if len(daily_changes) else None
+        return {
+            "company": company,
+            "samples": int(len(samples)),
+            "first_at": float(ts[0]),
+            "last_at": float(ts[-1]),
+            "first": round(float(first), 2),
+            "last": round(float(last), 2),
+            "high": round(float(gmp.max()), 2),
+            "low": round(float(gmp.min()), 2),
+            "change": round(change, 2),
+            "change_percent": percent(change, first),
+            "slope_per_day": round(slope, 2),
+            "momentum": round(momentum, 2),
+            "momentum_hours": momentum_hours,
+            "volatility": round(float(daily_changes.std()), 2) if len(daily_changes) > 1 else None,
+            "day_over_day": round(day_change, 2) if day_change is not None else None,
+            "day_over_day_percent": percent(day_change, daily[-2]) if day_change is not None else None,
+            "last_gmp_percent": None if np.isnan(samples["gmp_percent"][-1]) else round(float(samples["gmp_percent"][-1]), 2),
+            "direction": "rising" if slope > 0.5 else "falling" if slope < -0.5 else "flat",
+        }
+
+    def companies(self) -> List[str]:
+        """Company keys with recorded history"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4].replace("_", " ") for name in os.listdir(self.directory) if name.endswith(".gmp"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"companies": len(self.companies()), "appended": self.appended, "skipped": self.skipped}
+
+
+_gmp_history: Optional[GMPHistory] = None
+_gmp_history_loaded = False
+_gmp_history_lock = threading.Lock()
+
+
+def get_gmp_history() -> Optional[GMPHistory]:
+    """
+    Return the process-wide GMP history configured in config/config.yaml
+
+    Returns:
+        GMPHistory: The shared history, or None when disabled in config
+    """
+    global _gmp_history, _gmp_history_loaded
+    if not _gmp_history_loaded:
+        with _gmp_history_lock:
+            if not _gmp_history_loaded:
+                settings = cassette_cache_settings("gmp_history", in_memory=False)
+                if settings.get("enabled", True):
+                    _gmp_history = GMPHistory.from_config(settings)
+                _gmp_history_loaded = True
+    return _gmp_history
@@ -0,0 +1,132 @@
+"""
+Event streams for the agent graphs.
+
+Runs a compiled LangGraph graph with stream_mode ["updates", "messages",
+"custom"] and subgraphs=True, and turns its output into plain event dicts:
+
+    {"type": "node_started", "agent": ..., "node": ...}
+    {"type": "token", "agent": ..., "node": ..., "content": ...}
+    {"type": "tool_call", "agent": ..., "name": ..., "args": ..., "id": ...}
+    {"type": "tool_result", "agent": ..., "name": ..., "content": ...}
+    {"type": "final", "content": ..., "time_to_first_token": ..., "latency": ...}
+
+Agents invoked inside a tool (the IPO advisor behind ipo_advisor_agent) run
+as nested graphs, so their node, tool and token events arrive with a non-empty
+namespace and are reported under that agent's name.
+"""
+
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langgraph.config import get_stream_writer
+
+STREAM_MODES = ["updates", "messages", "custom"]
+
+
+def node_started(node: str) -> None:
+    """Announce the start of a graph node on the custom stream (a no-op outside streaming runs)"""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"type": "node_started", "node": node})
+
+
+def _text(content: Any) -> str:
+    """Text of a message content that may be a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content or [])
+
+
+class _EventTranslator:
+    """Turns (namespace, mode, data) stream parts into event dicts and tracks timing"""
+
+    def __init__(self, root_agent: str, nested_agent: str):
+        self.root_agent = root_agent
+        self.nested_agent = nested_agent
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.answer: Optional[str] = None
+
+    def _agent(self, namespace: Tuple[str, ...]) -> str:
+        return self.nested_agent if namespace else self.root_agent
+
+    def translate(self, namespace: Tuple[str, ...], mode: str, data: Any) -> List[Dict[str, Any]]:
+        agent = self._agent(namespace)
+        if mode == "custom":
+            return [{**data, "agent": agent}] if isinstance(data, dict) else []
+
+        if mode == "messages":
+            chunk, metadata = data
+            if not isinstance(chunk, AIMessageChunk):
+                return []
+            content = _text(chunk.content)
+            if not content:
+                return []
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            return [{"type": "token", "agent": agent, "node": metadata.get("langgraph_node"), "content": content}]
+
+        events = []
+        for node, update in (data or {}).items():
+            for message in (update or {}).get("messages", []) if isinstance(update, dict) else []:
+                if isinstance(message, AIMessage) and message.tool_calls:
+                    events.extend(
+                        {"type": "tool_call", "agent": agent, "name": call["name"], "args": call["args"], "id": call.get("id")}
+                        for call in message.tool_calls
+                    )
+                elif isinstance(message, ToolMessage):
+                    events.append({"type": "tool_result", "agent": agent, "name": message.name, "content": _text(message.content)})
+                elif isinstance(message, AIMessage) and not namespace:
+                    self.answer = _text(message.content)
+        return events
+
+    def final(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            "type": "final",
+            "content": self.answer or "",
+            "time_to_first_token": round(self.first_token_at - self.started, 3) if self.first_token_at else None,
+            "latency": round(now - self.started, 3),
+        }
+
+
+def stream_events(graph: Any, inputs: Dict[str, Any], root_agent: str, nested_agent: str = "ipo_advisor") -> Iterator[Dict[str, Any]]:
+    """
+    Run a graph and yield its events as they happen, ending with a "final" event
+
+    Args:
+        graph: Compiled LangGraph graph
+        inputs (dict): Initial graph state
+        root_agent (str): Agent name reported for the top-level graph
+        nested_agent (str): Agent name reported for graphs run inside its tools
+
+    Returns:
+        Iterator: Event dicts (see the module docstring)
+    """
+    translator = _EventTranslator(root_agent, nested_agent)
+    for namespace, mode, data in graph.stream(inputs, stream_mode=STREAM_MODES, subgraphs=True):
+        yield from translator.translate(namespace, mode, data)
+    yield translator.final()
+
+
+async def astream_events(graph: Any, inputs: Dict[str, Any], root_agent: str,
+                         nested_agent: str = "ipo_advisor") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async counterpart of stream_events()
+
+    Args:
+        graph: Compiled LangGraph graph
+        inputs (dict): Initial graph state
+        root_agent (str): Agent name reported for the top-level graph
+        nested_agent (str): Agent name reported for graphs run inside its tools
+
+    Returns:
+        AsyncIterator: Event dicts (see the module docstring)
+    """
+    translator = _EventTranslator(root_agent, nested_agent)
+    async for namespace, mode, data in graph.astream(inputs, stream_mode=STREAM_MODES, subgraphs=True):
+        for event in translator.translate(namespace, mode, data):
+            yield event
+    yield translator.final()
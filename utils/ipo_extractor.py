@@ -0,0 +1,386 @@
+"""
+Structured IPO record extraction from Tavily result content.
+
+Compiled patterns for Indian-market formats (₹ / Rs amounts, Cr / lakh issue
+sizes, "₹115 – ₹122" price bands, "12.5 times subscribed", "GMP ₹50 (8%)")
+turn a result page into a compact IPORecord, so the IPO agent receives a few
+typed fields per source instead of the full page text.
+"""
+
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.query_rewriter import detect_company
+from utils.result_merge import extract_results
+
+_AMOUNT = r"(?:₹|Rs\.?|INR)?\s*(\d[\d,]*(?:\.\d+)?)"
+_DASH = r"\s*(?:-|–|—|to)\s*"
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?"
+_DATE = rf"(?:(\d{{1,2}})(?:st|nd|rd|th)?\s+{_MONTH},?\s*(\d{{4}})?|{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s*(\d{{4}})?)"
+
+PRICE_BAND_RE = re.compile(rf"price\s*band[^₹\d]{{0,40}}{_AMOUNT}{_DASH}{_AMOUNT}", re.IGNORECASE)
+RUPEE_RANGE_RE = re.compile(rf"(?:₹|Rs\.?)\s*(\d[\d,]*(?:\.\d+)?){_DASH}(?:₹|Rs\.?)?\s*(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE)
+# A bare ₹ range is only a price band next to these words, and never next to premium / size words
+BAND_CONTEXT_RE = re.compile(r"price\s*band|per\s*(?:equity\s*)?share|a\s*share", re.IGNORECASE)
+NOT_BAND_CONTEXT_RE = re.compile(r"premium|\bGMP\b|grey\s*market|kostak|crores?\b|\bcr\b|lakhs?\b", re.IGNORECASE)
+ISSUE_PRICE_RE = re.compile(rf"(?:issue|offer|final)\s*price[^₹\d]{{0,30}}{_AMOUNT}(?!{_DASH}\d)", re.IGNORECASE)
+LOT_SIZE_RE = re.compile(r"(?:lot\s*size|market\s*lot|minimum\s*(?:bid|lot))[^\d]{0,30}(\d[\d,]*)\s*(?:shares|equity)?", re.IGNORECASE)
+ISSUE_SIZE_RE = re.compile(
+    rf"(?:issue|ipo|offer)\s*size[^₹\d]{{0,40}}{_AMOUNT}\s*(crores?|cr\.?|lakhs?|lacs?|billion|bn)\b",
+    re.IGNORECASE,
+)
+GMP_RE = re.compile(
+    r"(?:GMP|grey\s*market\s*premium)[^₹\d\-\n.]{0,30}(?:₹|Rs\.?)?\s*(-?\d[\d,]*(?:\.\d+)?)(?:\s*\(\s*(-?\d+(?:\.\d+)?)\s*%\s*\))?",
+    re.IGNORECASE,
+)
+SUBSCRIBED_RE = re.compile(
+    r"(?:subscribed|subscription)\s*(?:status)?\s*(?:of|at|by|:)?\s*(\d+(?:\.\d+)?)\s*(?:x|times)\b"
+    r"|(\d+(?:\.\d+)?)\s*(?:x|times)\s*(?:over)?\s*(?:subscribed|subscription)",
+    re.IGNORECASE,
+)
+CATEGORY_RE = re.compile(
+    r"\b(QIBs?|NIIs?|HNIs?|RIIs?|non[- ]institutional(?:\s*investors?)?|retail(?:\s*investors?)?|employees?)\b"
+    r"[^\d\n]{0,40}(\d+(?:\.\d+)?)\s*(?:x|times)\b",
+    re.IGNORECASE,
+)
+DATE_EVENT_RE = re.compile(
+    rf"\b(open(?:s|ing)?|clos(?:e|es|ing)|list(?:s|ing)?|allotment)\b(?:\s*(?:date|on|for subscription))?[^\w\n]{{0,6}}(?:on\s+)?{_DATE}",
+    re.IGNORECASE,
+)
+LEAD_MANAGERS_RE = re.compile(
+    r"(?:book\s*running\s*)?lead\s*managers?\s*(?:to\s*the\s*(?:issue|ipo|offer)\s*)?(?:are|is|:|-)\s*([^.\n;]{3,200})",
+    re.IGNORECASE,
+)
+# "<Name> IPO" / "<Name> SME IPO" mentions that name the company the facts belong to
+COMPANY_MENTION_RE = re.compile(r"((?:(?!IPO\b)[A-Z][\w&.\-]*[ \t]+){1,5})(?:SME[ \t]+)?IPO\b")
+SECTOR_RE = re.compile(r"\b(?:sector|industry)\s*[:\-]\s*([A-Za-z][A-Za-z &/\-]{2,40})", re.IGNORECASE)
+SME_RE = re.compile(r"\bSME\b|\bBSE\s*SME\b|\bNSE\s*Emerge\b", re.IGNORECASE)
+
+# Headline words that precede "IPO" without naming a company ("Mainboard IPO Calendar", "Live IPO updates")
+_GENERIC_IPO_WORDS = {
+    "mainboard", "main", "board", "sme", "live", "new", "full", "dates", "date", "day", "week", "month",
+    "list", "calendar", "upcoming", "latest", "recent", "today", "top", "best", "open", "closed", "listed",
+    "all", "next", "this", "these", "big", "mega", "hot", "key", "watch", "alert", "news",
+}
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _crores(amount: float, unit: str) -> float:
+    unit = unit.lower().rstrip(".")
+    if unit.startswith(("lakh", "lac")):
+        return round(amount / 100, 2)
+    if unit in ("billion", "bn"):
+        return round(amount * 100, 2)
+    return amount
+
+
+def parse_date(match: re.Match, start_group: int) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """(year or None, month, day) from the groups of a _DATE sub-pattern starting at start_group"""
+    day, month, year, month_b, day_b, year_b = match.groups()[start_group:start_group + 6]
+    if month is None:
+        day, month, year = day_b, month_b, year_b
+    try:
+        return (int(year) if year else None), _MONTHS[month[:3].lower()], int(day)
+    except (TypeError, ValueError, KeyError):
+        return None, None, None
+
+
+def _valid(year: int, month: int, day: int) -> bool:
+    try:
+        date(year, month, day)
+    except ValueError:
+        return False
+    return True
+
+
+def nearest_year(month: int, day: int, reference: date) -> Optional[date]:
+    """
+    Date of a day and month without a year: the one closest to the reference date, so
+    "January 3" next to "December 30, 2025" falls in 2026
+
+    Args:
+        month (int): Month number
+        day (int): Day of the month
+        reference (date): A date the text states or was published on
+
+    Returns:
+        date: The closest matching date, or None if the day does not exist
+    """
+    candidates = []
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidates.append(date(year, month, day))
+        except ValueError:
+            continue
+    return min(candidates, key=lambda value: abs((value - reference).days)) if candidates else None
+
+
+def _published(value: Any) -> Optional[date]:
+    """Date of a Tavily published_date (RFC 2822 or ISO 8601)"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(str(value)).date()
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+    except ValueError:
+        return None
+
+
+def _company_near(text: str, anchor: int) -> Optional[str]:
+    """Company of the "<Name> IPO" mention closest to (preferably before) the first extracted fact"""
+    mentions = []
+    for match in COMPANY_MENTION_RE.finditer(text):
+        words = match.group(1).split()
+        while words and words[0].lower().strip(".:") in _GENERIC_IPO_WORDS:
+            words.pop(0)
+        name = detect_company(" ".join(words)) if words else None
+        if name and not all(word.lower() in _GENERIC_IPO_WORDS for word in name.split()):
+            mentions.append((match.start(), name))
+    if not mentions:
+        return None
+    return min(mentions, key=lambda mention: (mention[0] > anchor, abs(anchor - mention[0])))[1]
+
+
+def _price_band_range(text: str) -> Optional[re.Match]:
+    """The first bare ₹ range that reads as a price band"""
+    for match in RUPEE_RANGE_RE.finditer(text):
+        before = text[max(0, match.start() - 40):match.start()]
+        after = text[match.end():match.end() + 25]
+        if NOT_BAND_CONTEXT_RE.search(f"{before[-20:]} {after}"):
+            continue
+        if BAND_CONTEXT_RE.search(f"{before} {after}"):
+            return match
+    return None
+
+
+@dataclass
+class IPORecord:
+    """Typed IPO facts extracted from one search result"""
+
+    company: Optional[str] = None
+    sector: Optional[str] = None
+    board: Optional[str] = None
+    price_band_low: Optional[float] = None
+    price_band_high: Optional[float] = None
+    issue_price: Optional[float] = None
+    lot_size: Optional[int] = None
+    issue_size_cr: Optional[float] = None
+    gmp: Optional[float] = None
+    gmp_percent: Optional[float] = None
+    subscription_times: Optional[float] = None
+    subscription_by_category: Dict[str, float] = field(default_factory=dict)
+    open_date: Optional[str] = None
+    close_date: Optional[str] = None
+    allotment_date: Optional[str] = None
+    listing_date: Optional[str] = None
+    lead_managers: List[str] = field(default_factory=list)
+    source_url: Optional[str] = None
+    published_date: Optional[str] = None
+    extracted_at: Optional[str] = None
+
+    FACT_FIELDS = (
+        "price_band_low", "price_band_high", "issue_price", "lot_size", "issue_size_cr", "gmp",
+        "subscription_times", "open_date", "close_date", "allotment_date", "listing_date", "sector",
+    )
+
+    def has_facts(self) -> bool:
+        """True if anything beyond the company name and source was found"""
+        return (
+            any(getattr(self, name) is not None for name in self.FACT_FIELDS)
+            or bool(self.subscription_by_category)
+            or bool(self.lead_managers)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact dict without empty fields"""
+        return {key: value for key, value in asdict(self).items() if value not in (None, {}, [], "")}
+
+    def summary(self) -> str:
+        """One-line rendering for LLM prompts"""
+        parts = [self.company or "Unknown company"]
+        for label in (self.board, self.sector):
+            if label:
+                parts.append(label)
+        if self.price_band_low is not None:
+            parts.append(f"price band ₹{self.price_band_low:g}-{self.price_band_high:g}")
+        if self.issue_price is not None:
+            parts.append(f"issue price ₹{self.issue_price:g}")
+        if self.lot_size is not None:
+            parts.append(f"lot {self.lot_size} shares")
+        if self.issue_size_cr is not None:
+            parts.append(f"issue size ₹{self.issue_size_cr:g} Cr")
+        if self.gmp is not None:
+            gmp = f"GMP ₹{self.gmp:g}"
+            if self.gmp_percent is not None:
+                gmp += f" ({self.gmp_percent:g}%)"
+            parts.append(gmp)
+        if self.subscription_times is not None:
+            parts.append(f"subscribed {self.subscription_times:g}x")
+        if self.subscription_by_category:
+            parts.append(", ".join(f"{name} {times:g}x" for name, times in self.subscription_by_category.items()))
+        for label, value in (("opens", self.open_date), ("closes", self.close_date),
+                             ("allotment", self.allotment_date), ("lists", self.listing_date)):
+            if value:
+                parts.append(f"{label} {value}")
+        if self.lead_managers:
+            parts.append(f"lead managers {', '.join(self.lead_managers)}")
+        return " | ".join(parts)
+
+
+def extract_ipo_record(
+    result: Dict[str, Any],
+    company: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> IPORecord:
+    """
+    Extract an IPO record from one Tavily result
+
+    Args:
+        result (dict): Tavily result with 'title', 'url' and 'content'
+        company (str): Company the search was about; otherwise the "<Name> IPO" mention
+                       closest to the extracted facts (None if the text names none)
+        now (datetime): Extraction time, the reference for dates without a year when
+                        neither the text nor published_date gives one
+
+    Returns:
+        IPORecord: Extracted fields (check has_facts() before relying on it)
+    """
+    now = now or datetime.now()
+    title = result.get("title") or ""
+    text = f"{title}\n{result.get('content') or ''}"
+    record = IPORecord(
+        company=company,
+        source_url=result.get("url"),
+        published_date=result.get("published_date"),
+        extracted_at=now.isoformat(timespec="seconds"),
+    )
+    # Positions of the matched facts, to find the company they are written about
+    anchors = []
+    match = SECTOR_RE.search(text)
+    if match:
+        record.sector = match.group(1).strip()
+    match = LEAD_MANAGERS_RE.search(text)
+    if match:
+        names = re.split(r",\s*|\s+and\s+|\s*&\s+", match.group(1))
+        record.lead_managers = [name.strip() for name in names if len(name.strip()) > 2][:6]
+    if SME_RE.search(text):
+        record.board = "SME"
+    elif re.search(r"\bmainboard\b|\bmain\s*board\b", text, re.IGNORECASE):
+        record.board = "Mainboard"
+
+    match = PRICE_BAND_RE.search(text) or _price_band_range(text)
+    if match:
+        low, high = sorted((_number(match.group(1)), _number(match.group(2))))
+        if high < 100000:
+            record.price_band_low, record.price_band_high = low, high
+            anchors.append(match.start())
+    match = ISSUE_PRICE_RE.search(text)
+    if match:
+        record.issue_price = _number(match.group(1))
+        anchors.append(match.start())
+    match = LOT_SIZE_RE.search(text)
+    if match:
+        record.lot_size = int(_number(match.group(1)))
+        anchors.append(match.start())
+    match = ISSUE_SIZE_RE.search(text)
+    if match:
+        record.issue_size_cr = _crores(_number(match.group(1)), match.group(2))
+        anchors.append(match.start())
+    match = GMP_RE.search(text)
+    if match:
+        record.gmp = _number(match.group(1))
+        if match.group(2):
+            record.gmp_percent = float(match.group(2))
+        anchors.append(match.start())
+
+    subscribed = list(SUBSCRIBED_RE.finditer(text))
+    anchors.extend(m.start() for m in subscribed[:1])
+    overall = [float(m.group(1) or m.group(2)) for m in subscribed]
+    categories = {}
+    for m in CATEGORY_RE.finditer(text):
+        name = m.group(1).lower()
+        name = "QIB" if name.startswith("qib") else "NII" if name.startswith(("nii", "hni", "non")) else \
+            "Employee" if name.startswith("employee") else "Retail"
+        categories.setdefault(name, float(m.group(2)))
+    if categories:
+        record.subscription_by_category = categories
+    # The overall figure is the largest one not attributed to a category
+    overall = [times for times in overall if times not in categories.values()] or overall
+    if overall:
+        record.subscription_times = max(overall)
+
+    # Dates without a year take the one that puts them closest to a date the text states in
+    # full ("opens on October 15 and closes on October 17, 2024"), else to published_date
+    events = []
+    for m in DATE_EVENT_RE.finditer(text):
+        year, month, day = parse_date(m, 1)
+        if month is not None:
+            events.append((m, year, month, day))
+    stated = [(m.start(), date(year, month, day)) for m, year, month, day in events if year is not None and _valid(year, month, day)]
+    fallback = _published(record.published_date) or now.date()
+    for m, year, month, day in events:
+        if year is not None:
+            value = date(year, month, day) if _valid(year, month, day) else None
+        else:
+            reference = min(stated, key=lambda item: abs(item[0] - m.start()))[1] if stated else fallback
+            value = nearest_year(month, day, reference)
+        event = m.group(1).lower()
+        attribute = (
+            "open_date" if event.startswith("open") else
+            "close_date" if event.startswith("clos") else
+            "allotment_date" if event.startswith("allot") else
+            "listing_date"
+        )
+        if value and getattr(record, attribute) is None:
+            setattr(record, attribute, value.isoformat())
+            anchors.append(m.start())
+
+    if record.company is None and anchors:
+        record.company = _company_near(text, min(anchors))
+    return record
+
+
+def extract_ipo_records(results: Any, company: Optional[str] = None, now: Optional[datetime] = None) -> List[IPORecord]:
+    """
+    Extract records from a Tavily response, skipping results without IPO facts or
+    without a company the facts can be attributed to
+
+    Args:
+        results: Tavily response dict or result list
+        company (str): Company the search was about, if any
+        now (datetime): Extraction time
+
+    Returns:
+        list: One IPORecord per result that contained IPO facts
+    """
+    records = []
+    for result in extract_results(results):
+        record = extract_ipo_record(result, company, now)
+        if record.company and record.has_facts():
+            records.append(record)
+    return records
+
+
+def format_ipo_records(records: Iterable[Dict[str, Any]]) -> str:
+    """Render record dicts (IPORecord.to_dict, or IPO store rows) one per line with their source"""
+    known = set(IPORecord.__dataclass_fields__)
+    lines = []
+    for i, data in enumerate(records, 1):
+        record = IPORecord(**{key: value for key, value in data.items() if key in known})
+        line = f"{i}. {record.summary()}"
+        if data.get("status"):
+            line += f" | status {data['status']}"
+        lines.append(f"{line}\n   Source: {record.source_url or 'unknown'}")
+    return "\n".join(lines)
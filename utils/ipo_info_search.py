@@ -1,22 +1,65 @@
 import os
+import re
 import json
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterable, Iterator, NamedTuple, Sequence
 from langchain_tavily import TavilySearch
 from utils.model_loader import ModelLoader
+from utils.search_cache import CachedSearchTool, get_search_cache, refreshing
+from utils.query_memo import QueryMemo, get_query_memo
+from utils.single_flight import get_single_flight
+from utils.query_rewriter import detect_company, get_query_rewriter
+from utils.cassette import cassette_replaying, cassette_search_client
+from utils.search_resilience import resilient_search_client
+from utils.config_loader import load_config_section
+from utils.ipo_extractor import extract_ipo_records
+from utils.ipo_store import get_ipo_store
+from utils.gmp_history import get_gmp_history
+from utils.subscription_history import get_subscription_history
+
+# Per-company lookups available to the bulk API, by kind
+BULK_LOOKUPS = {
+    "company": "search_ipo_by_company",
+    "gmp": "search_ipo_gmp",
+    "subscription": "search_ipo_subscription_status",
+}
+
+
+class IPOLookup(NamedTuple):
+    """One result of a bulk lookup"""
+    company: str
+    kind: str
+    result: dict
+
+
+# Plain fact lookups that the IPO store can answer on its own
+_LOCAL_QUERY_RE = re.compile(
+    r"\b(gmp|grey market|gray market|subscri\w*|price band|lot size|issue size|listing date|open date|close date|"
+    r"opens?|closes?|dates?|details|lead managers?)\b",
+    re.IGNORECASE,
+)
+
 
 class TavilyIPOInfoSearch:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, search_tool: CachedSearchTool = None):
         """
         Initialize the Tavily IPO search tool
         
         Args:
             api_key (str): Tavily API key. If None, will try to get from environment.
+            search_tool (CachedSearchTool): Optional existing search client to share instead of creating one.
         """
         self.api_key = api_key or os.getenv("TAVILY_API_KEY")
-        if not self.api_key:
+        if not self.api_key and not cassette_replaying():
             raise ValueError("TAVILY_API_KEY not found in environment variables or passed as parameter")
         
-        # Initialize the search tool with IPO-specific configuration
-        self.search_tool = TavilySearch(api_key=self.api_key)
+        # Initialize the search tool with IPO-specific configuration, behind the shared result cache
+        self.search_tool = search_tool or CachedSearchTool(
+            resilient_search_client(cassette_search_client(lambda: TavilySearch(api_key=self.api_key))),
+            get_search_cache(),
+        )
         
         # Initialize LLM for intelligent query generation
         try:
@@ -24,6 +67,62 @@ class TavilyIPOInfoSearch:
         except Exception as e:
             print(f"Warning: Could not initialize query generator: {e}")
             self.query_generator = None
+        
+        # Rule-based fast path and memo of previous rewrites so most queries skip the LLM
+        self.query_rewriter = get_query_rewriter()
+        self.query_memo = get_query_memo()
+        self.rewrite_flights = get_single_flight("rewrite")
+        
+        # Local knowledge store read before searching and fed with every extracted record
+        self.ipo_store = get_ipo_store()
+        # Append-only GMP samples behind the GMP trend tool
+        self.gmp_history = get_gmp_history()
+        # Subscription figures per category over time, behind the subscription status tool
+        self.subscription_history = get_subscription_history()
+        
+        # Concurrency cap for search_many / asearch_many
+        self.bulk_concurrency = int(load_config_section("bulk_search").get("max_concurrency", 6))
+
+    def _fallback_ipo_query(self, user_query: str, ipo_context: str) -> str:
+        """Manual query enhancement used when no query generator is available"""
+        if ipo_context == "listing":
+            return f"{user_query} IPO listing date price subscription"
+        elif ipo_context == "gmp":
+            return f"{user_query} grey market premium GMP kostak rate"
+        elif ipo_context == "upcoming":
+            return f"{user_query} upcoming IPO 2025 dates subscription"
+        elif ipo_context == "performance":
+            return f"{user_query} IPO performance stock price gains"
+        else:
+            return f"{user_query} IPO information India stock market"
+
+    def _build_ipo_prompt(self, user_query: str, ipo_context: str) -> str:
+        """Prompt asking the query generator for an IPO-optimized search query"""
+        return f"""
+            Generate an optimized search query for IPO-related information based on the user's query.
+            Focus on IPO-specific terms and Indian stock market context.
+            
+            User Query: {user_query}
+            IPO Context: {ipo_context}
+            
+            Include relevant terms like: IPO, listing, grey market premium (GMP), subscription, 
+            NSE, BSE, issue price, lot size, listing date, kostak rate, mainboard, SME
+            
+            Generate a concise search query (max 25 words) optimized for finding IPO information:
+            """
+
+    def _finish_ipo_query(self, user_query: str, ipo_context: str, response) -> str:
+        """Clean and validate the generator response, then memoize it"""
+        optimized_query = response.content.strip() if hasattr(response, 'content') else str(response).strip()
+        
+        # Clean and validate the response
+        optimized_query = optimized_query.replace('"', '').replace("'", "").strip()
+        if len(optimized_query) > 150:  # Fallback if too long
+            return f"{user_query} IPO information India"
+        
+        if self.query_memo is not None:
+            self.query_memo.set("ipo", user_query, ipo_context, optimized_query)
+        return optimized_query
 
     def _generate_ipo_query(self, user_query: str, ipo_context: str = "general") -> str:
         """
@@ -36,61 +135,154 @@ class TavilyIPOInfoSearch:
         Returns:
             str: AI-optimized IPO search query
         """
+        if self.query_rewriter is not None:
+            fast_query = self.query_rewriter.try_rewrite(user_query, ipo_context)
+            if fast_query is not None:
+                return fast_query
+        
         if not self.query_generator:
             # Fallback to manual query enhancement
-            if ipo_context == "listing":
-                return f"{user_query} IPO listing date price subscription"
-            elif ipo_context == "gmp":
-                return f"{user_query} grey market premium GMP kostak rate"
-            elif ipo_context == "upcoming":
-                return f"{user_query} upcoming IPO 2025 dates subscription"
-            elif ipo_context == "performance":
-                return f"{user_query} IPO performance stock price gains"
-            else:
-                return f"{user_query} IPO information India stock market"
+            return self._fallback_ipo_query(user_query, ipo_context)
+        
+        if self.query_memo is not None:
+            memoized = self.query_memo.get("ipo", user_query, ipo_context)
+            if memoized is not None:
+                return memoized
         
+        def rewrite() -> str:
+            try:
+                response = self.query_generator.invoke(self._build_ipo_prompt(user_query, ipo_context))
+                return self._finish_ipo_query(user_query, ipo_context, response)
+                
+            except Exception as e:
+                print(f"IPO query generation error: {e}")
+                return f"{user_query} IPO information grey market premium"
+        
+        # Identical concurrent rewrites share one LLM call
+        return self.rewrite_flights.do(QueryMemo.make_key("ipo", user_query, ipo_context), rewrite)
+
+    async def _agenerate_ipo_query(self, user_query: str, ipo_context: str = "general") -> str:
+        """Async counterpart of _generate_ipo_query using ChatGroq.ainvoke"""
+        if self.query_rewriter is not None:
+            fast_query = self.query_rewriter.try_rewrite(user_query, ipo_context)
+            if fast_query is not None:
+                return fast_query
+        
+        if not self.query_generator:
+            return self._fallback_ipo_query(user_query, ipo_context)
+        
+        if self.query_memo is not None:
+            memoized = self.query_memo.get("ipo", user_query, ipo_context)
+            if memoized is not None:
+                return memoized
+        
+        async def rewrite() -> str:
+            try:
+                response = await self.query_generator.ainvoke(self._build_ipo_prompt(user_query, ipo_context))
+                return self._finish_ipo_query(user_query, ipo_context, response)
+                
+            except Exception as e:
+                print(f"IPO query generation error: {e}")
+                return f"{user_query} IPO information grey market premium"
+        
+        return await self.rewrite_flights.ado(QueryMemo.make_key("ipo", user_query, ipo_context), rewrite)
+
+    def _with_records(self, results: dict, company: str = None) -> dict:
+        """Attach structured IPO records extracted from the result content"""
+        if not isinstance(results, dict) or not results.get("results"):
+            return results
+        records = extract_ipo_records(results, company)
+        if self.ipo_store is not None and records:
+            try:
+                self.ipo_store.upsert_many(records)
+            except Exception as e:
+                print(f"Warning: Could not update IPO store: {e}")
+        if self.gmp_history is not None and records:
+            try:
+                self.gmp_history.append_records(records)
+            except Exception as e:
+                print(f"Warning: Could not record GMP history: {e}")
+        if self.subscription_history is not None and records:
+            try:
+                self.subscription_history.append_records(records)
+            except Exception as e:
+                print(f"Warning: Could not record subscription history: {e}")
+        return {**results, "records": [record.to_dict() for record in records]}
+
+    def _local_response(self, query: str, records: list) -> dict:
+        """Search-shaped response served from the IPO store"""
+        records = [{key: value for key, value in record.items() if key != "field_updated_at"} for record in records]
+        return {"query": query, "results": [], "records": records, "source": "ipo_store"}
+
+    def _local_lookup(self, company_name: str, kind: str) -> dict:
+        """Fresh store record for a per-company lookup, or None (always None while the cache warmer refreshes)"""
+        if self.ipo_store is None or not company_name or refreshing():
+            return None
         try:
-            ipo_prompt = f"""
-            Generate an optimized search query for IPO-related information based on the user's query.
-            Focus on IPO-specific terms and Indian stock market context.
-            
-            User Query: {user_query}
-            IPO Context: {ipo_context}
-            
-            Include relevant terms like: IPO, listing, grey market premium (GMP), subscription, 
-            NSE, BSE, issue price, lot size, listing date, kostak rate, mainboard, SME
-            
-            Generate a concise search query (max 25 words) optimized for finding IPO information:
-            """
-            
-            response = self.query_generator.invoke(ipo_prompt)
-            optimized_query = response.content.strip() if hasattr(response, 'content') else str(response).strip()
-            
-            # Clean and validate the response
-            optimized_query = optimized_query.replace('"', '').replace("'", "").strip()
-            if len(optimized_query) > 150:  # Fallback if too long
-                return f"{user_query} IPO information India"
-            
-            return optimized_query
-            
+            record = self.ipo_store.lookup(company_name, kind)
         except Exception as e:
-            print(f"IPO query generation error: {e}")
-            return f"{user_query} IPO information grey market premium"
+            print(f"Warning: IPO store lookup failed: {e}")
+            return None
+        return self._local_response(company_name, [record]) if record else None
+
+    def _local_list(self, name: str) -> dict:
+        """Upcoming / recently listed IPOs from the store while the last list search is fresh"""
+        if self.ipo_store is None or refreshing() or not self.ipo_store.list_is_fresh(name):
+            return None
+        records = self.ipo_store.upcoming() if name == "upcoming" else self.ipo_store.recently_listed()
+        return self._local_response(f"{name} IPOs", records) if records else None
 
-    def tavily_search_with_custom_query(self, custom_query: str) -> dict:
+    def _list_searched(self, name: str, results: dict) -> dict:
+        if self.ipo_store is not None and isinstance(results, dict) and "error" not in results:
+            self.ipo_store.mark_list_refreshed(name)
+        return results
+
+    def local_answer(self, user_query: str) -> dict:
+        """
+        Answer a user query from the IPO store when it is a plain lookup about a known company
+        
+        Args:
+            user_query (str): Original user query
+            
+        Returns:
+            dict: Store-backed response, or None when the query needs a search
+        """
+        if not _LOCAL_QUERY_RE.search(user_query):
+            return None
+        lowered = user_query.lower()
+        kind = "gmp" if re.search(r"\bgmp\b|grey market|gray market", lowered) else \
+            "subscription" if "subscri" in lowered else "company"
+        return self._local_lookup(detect_company(user_query), kind)
+
+    def tavily_search_with_custom_query(self, custom_query: str, search_type: str = "ipo", company: str = None) -> dict:
         """
         Search for IPO information using a custom generated query
         
         Args:
             custom_query (str): Pre-optimized search query
+            search_type (str): Search type used for result caching ('ipo', 'gmp', 'subscription', ...)
+            company (str): Company the search is about, used to label the extracted records
             
         Returns:
-            dict: Search results from Tavily
+            dict: Search results from Tavily, plus a 'records' list of extracted IPO facts
         """
         try:
-            # Use the custom query directly
-            results = self.search_tool.invoke(custom_query)
-            return results
+            # Use the custom query directly (served from the search cache when fresh)
+            results = self.search_tool.invoke(custom_query, search_type=search_type)
+            return self._with_records(results, company)
+            
+        except Exception as e:
+            return {
+                "error": f"Error performing custom IPO search: {str(e)}",
+                "query": custom_query,
+                "results": []
+            }
+
+    async def atavily_search_with_custom_query(self, custom_query: str, search_type: str = "ipo", company: str = None) -> dict:
+        """Async counterpart of tavily_search_with_custom_query"""
+        try:
+            results = await self.search_tool.ainvoke(custom_query, search_type=search_type)
+            return self._with_records(results, company)
             
         except Exception as e:
             return {
@@ -115,9 +307,24 @@ class TavilyIPOInfoSearch:
             print(f"🎯 IPO Query Enhanced: {query} → {enhanced_query}")
             
             # Perform the search using enhanced query
-            results = self.search_tool.invoke(enhanced_query)
+            results = self.search_tool.invoke(enhanced_query, search_type="ipo")
             
-            return results
+            return self._with_records(results)
+            
+        except Exception as e:
+            return {
+                "error": f"Error performing IPO search: {str(e)}",
+                "query": query,
+                "results": []
+            }
+
+    async def atavily_search_(self, query: str) -> dict:
+        """Async counterpart of tavily_search_"""
+        try:
+            enhanced_query = await self._agenerate_ipo_query(query, "general")
+            print(f"🎯 IPO Query Enhanced: {query} → {enhanced_query}")
+            
+            return self._with_records(await self.search_tool.ainvoke(enhanced_query, search_type="ipo"))
             
         except Exception as e:
             return {
@@ -136,8 +343,11 @@ class TavilyIPOInfoSearch:
         Returns:
             dict: IPO information for the company
         """
+        local = self._local_lookup(company_name, "company")
+        if local is not None:
+            return local
         optimized_query = self._generate_ipo_query(f"{company_name} IPO", "listing")
-        return self.tavily_search_with_custom_query(optimized_query)
+        return self.tavily_search_with_custom_query(optimized_query, search_type="company", company=company_name)
     
     def search_upcoming_ipos(self) -> dict:
         """
@@ -146,8 +356,11 @@ class TavilyIPOInfoSearch:
         Returns:
             dict: Information about upcoming IPOs
         """
+        local = self._local_list("upcoming")
+        if local is not None:
+            return local
         optimized_query = self._generate_ipo_query("upcoming IPOs 2025", "upcoming")
-        return self.tavily_search_with_custom_query(optimized_query)
+        return self._list_searched("upcoming", self.tavily_search_with_custom_query(optimized_query, search_type="upcoming"))
     
     def search_recent_ipos(self) -> dict:
         """
@@ -156,8 +369,11 @@ class TavilyIPOInfoSearch:
         Returns:
             dict: Information about recent IPOs
         """
+        local = self._local_list("recent")
+        if local is not None:
+            return local
         optimized_query = self._generate_ipo_query("recent IPO listings 2025", "performance")
-        return self.tavily_search_with_custom_query(optimized_query)
+        return self._list_searched("recent", self.tavily_search_with_custom_query(optimized_query, search_type="performance"))
     
     def search_ipo_gmp(self, company_name: str = None) -> dict:
         """
@@ -169,9 +385,12 @@ class TavilyIPOInfoSearch:
         Returns:
             dict: GMP information
         """
+        local = self._local_lookup(company_name, "gmp")
+        if local is not None:
+            return local
         query = f"{company_name} GMP" if company_name else "IPO grey market premium today"
         optimized_query = self._generate_ipo_query(query, "gmp")
-        return self.tavily_search_with_custom_query(optimized_query)
+        return self.tavily_search_with_custom_query(optimized_query, search_type="gmp", company=company_name)
     
     def search_ipo_subscription_status(self, company_name: str) -> dict:
         """
@@ -183,5 +402,135 @@ class TavilyIPOInfoSearch:
         Returns:
             dict: Subscription status information
         """
+        local = self._local_lookup(company_name, "subscription")
+        if local is not None:
+            return local
         optimized_query = self._generate_ipo_query(f"{company_name} IPO subscription status", "listing")
-        return self.tavily_search_with_custom_query(optimized_query)
\ No newline at end of file
+        return self.tavily_search_with_custom_query(optimized_query, search_type="subscription", company=company_name)
+    
+    async def asearch_ipo_by_company(self, company_name: str) -> dict:
+        """Async counterpart of search_ipo_by_company"""
+        local = self._local_lookup(company_name, "company")
+        if local is not None:
+            return local
+        optimized_query = await self._agenerate_ipo_query(f"{company_name} IPO", "listing")
+        return await self.atavily_search_with_custom_query(optimized_query, search_type="company", company=company_name)
+    
+    async def asearch_upcoming_ipos(self) -> dict:
+        """Async counterpart of search_upcoming_ipos"""
+        local = self._local_list("upcoming")
+        if local is not None:
+            return local
+        optimized_query = await self._agenerate_ipo_query("upcoming IPOs 2025", "upcoming")
+        return self._list_searched("upcoming", await self.atavily_search_with_custom_query(optimized_query, search_type="upcoming"))
+    
+    async def asearch_recent_ipos(self) -> dict:
+        """Async counterpart of search_recent_ipos"""
+        local = self._local_list("recent")
+        if local is not None:
+            return local
+        optimized_query = await self._agenerate_ipo_query("recent IPO listings 2025", "performance")
+        return self._list_searched("recent", await self.atavily_search_with_custom_query(optimized_query, search_type="performance"))
+    
+    async def asearch_ipo_gmp(self, company_name: str = None) -> dict:
+        """Async counterpart of search_ipo_gmp"""
+        local = self._local_lookup(company_name, "gmp")
+        if local is not None:
+            return local
+        query = f"{company_name} GMP" if company_name else "IPO grey market premium today"
+        optimized_query = await self._agenerate_ipo_query(query, "gmp")
+        return await self.atavily_search_with_custom_query(optimized_query, search_type="gmp", company=company_name)
+    
+    async def asearch_ipo_subscription_status(self, company_name: str) -> dict:
+        """Async counterpart of search_ipo_subscription_status"""
+        local = self._local_lookup(company_name, "subscription")
+        if local is not None:
+            return local
+        optimized_query = await self._agenerate_ipo_query(f"{company_name} IPO subscription status", "listing")
+        return await self.atavily_search_with_custom_query(optimized_query, search_type="subscription", company=company_name)
+    
+    def _bulk_jobs(self, companies: Iterable[str], kinds: Sequence[str]) -> list:
+        """(company, kind) pairs for a bulk lookup, with duplicate companies removed"""
+        unknown = [kind for kind in kinds if kind not in BULK_LOOKUPS]
+        if unknown:
+            raise ValueError(f"Unsupported lookup kinds: {unknown} (expected {list(BULK_LOOKUPS)})")
+        seen = set()
+        unique = []
+        for company in companies:
+            name = " ".join(str(company).split())
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                unique.append(name)
+        return [(company, kind) for company in unique for kind in kinds]
+    
+    def search_many(
+        self,
+        companies: Iterable[str],
+        kinds: Sequence[str] = ("company", "gmp", "subscription"),
+        max_concurrency: int = None,
+    ) -> Iterator[IPOLookup]:
+        """
+        Run per-company lookups for many companies concurrently
+        
+        Lookups share the rewrite memo, search cache and in-flight coalescing
+        with single-company calls, so repeated companies cost nothing extra.
+        
+        Args:
+            companies (Iterable[str]): Company names
+            kinds (Sequence[str]): Lookups per company: 'company', 'gmp', 'subscription'
+            max_concurrency (int): Lookups in flight at once (defaults to bulk_search.max_concurrency)
+            
+        Yields:
+            IPOLookup: (company, kind, result) in completion order
+        """
+        jobs = self._bulk_jobs(companies, kinds)
+        if not jobs:
+            return
+        
+        def run(company: str, kind: str) -> dict:
+            try:
+                return getattr(self, BULK_LOOKUPS[kind])(company)
+            except Exception as e:
+                return {"error": f"Error in {kind} lookup: {str(e)}", "query": company, "results": []}
+        
+        executor = ThreadPoolExecutor(max_workers=max_concurrency or self.bulk_concurrency, thread_name_prefix="ipo-bulk")
+        try:
+            # Each lookup runs in a copy of the caller's context (e.g. the cache warmer's force_refresh)
+            futures = {
+                executor.submit(contextvars.copy_context().run, run, company, kind): (company, kind)
+                for company, kind in jobs
+            }
+            for future in as_completed(futures):
+                company, kind = futures[future]
+                yield IPOLookup(company, kind, future.result())
+        finally:
+            # A consumer that stops early does not wait for the remaining lookups
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def asearch_many(
+        self,
+        companies: Iterable[str],
+        kinds: Sequence[str] = ("company", "gmp", "subscription"),
+        max_concurrency: int = None,
+    ) -> AsyncIterator[IPOLookup]:
+        """Async counterpart of search_many using the async lookups and a semaphore"""
+        jobs = self._bulk_jobs(companies, kinds)
+        if not jobs:
+            return
+        semaphore = asyncio.Semaphore(max_concurrency or self.bulk_concurrency)
+        
+        async def run(company: str, kind: str) -> IPOLookup:
+            async with semaphore:
+                try:
+                    result = await getattr(self, f"a{BULK_LOOKUPS[kind]}")(company)
+                except Exception as e:
+                    result = {"error": f"Error in {kind} lookup: {str(e)}", "query": company, "results": []}
+            return IPOLookup(company, kind, result)
+        
+        tasks = [asyncio.create_task(run(company, kind)) for company, kind in jobs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
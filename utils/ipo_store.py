@@ -0,0 +1,379 @@
+"""
+Local IPO knowledge store.
+
+Keeps one row per company (sector, board, price band, lot size, issue size,
+dates, lead managers, latest GMP and subscription) in SQLite, indexed by
+company, board and dates, plus GMP / subscription snapshots over time.
+Every field carries its own update time, so slow-moving facts such as the
+price band are reused for days while GMP and subscription go stale in minutes.
+TavilyIPOInfoSearch reads the store first and only searches for fields that
+are missing or stale.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from utils.cassette import cassette_cache_settings
+from utils.sqlite_utils import connect_sqlite
+from utils.ipo_extractor import IPORecord
+
+# Stored fields: (freshness group, column type)
+FIELDS = {
+    "sector": ("static", "TEXT"),
+    "board": ("static", "TEXT"),
+    "price_band_low": ("static", "REAL"),
+    "price_band_high": ("static", "REAL"),
+    "issue_price": ("static", "REAL"),
+    "lot_size": ("static", "INTEGER"),
+    "issue_size_cr": ("static", "REAL"),
+    "open_date": ("static", "TEXT"),
+    "close_date": ("static", "TEXT"),
+    "allotment_date": ("static", "TEXT"),
+    "listing_date": ("static", "TEXT"),
+    "lead_managers": ("static", "TEXT"),
+    "gmp": ("gmp", "REAL"),
+    "gmp_percent": ("gmp", "REAL"),
+    "subscription_times": ("subscription", "REAL"),
+    "subscription_by_category": ("subscription", "TEXT"),
+}
+FIELD_GROUPS = {name: group for name, (group, _column_type) in FIELDS.items()}
+_JSON_FIELDS = {"lead_managers", "subscription_by_category"}
+
+# Fields a lookup needs before it can be answered locally
+LOOKUP_FIELDS = {
+    "company": ("price_band_low", "price_band_high", "lot_size", "open_date", "close_date"),
+    "gmp": ("gmp",),
+    "subscription": ("subscription_times",),
+}
+
+DEFAULT_TTL_SECONDS = {
+    "static": 3 * 24 * 60 * 60,
+    "gmp": 10 * 60,
+    "subscription": 5 * 60,
+    "list": 2 * 60 * 60,
+}
+
+_NAME_NOISE_RE = re.compile(r"\b(?:ltd|limited|pvt|private|ipo|the|co)\b\.?", re.IGNORECASE)
+
+
+def company_key(name: str) -> str:
+    """Normalized company identity ('Swiggy Ltd.' and 'swiggy IPO' -> 'swiggy')"""
+    text = _NAME_NOISE_RE.sub(" ", str(name).lower())
+    text = re.sub(r"[^\w\s&]", " ", text)
+    return " ".join(text.split())
+
+
+def ipo_status(record: Dict[str, Any], today: Optional[date] = None) -> Optional[str]:
+    """'upcoming', 'open', 'closed' (awaiting listing) or 'listed', from the stored dates"""
+    today = (today or date.today()).isoformat()
+    if record.get("listing_date") and record["listing_date"] <= today:
+        return "listed"
+    if record.get("close_date") and record["close_date"] < today:
+        return "closed"
+    if record.get("open_date"):
+        return "open" if record["open_date"] <= today else "upcoming"
+    return None
+
+
+class IPOStore:
+    """SQLite store of IPO facts with field-level freshness"""
+
+    def __init__(self, path: str = ".cache/ipo_store.sqlite3", ttl_seconds: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory store)
+            ttl_seconds (dict): Freshness per field group ('static', 'gmp', 'subscription', 'list')
+        """
+        self.path = path
+        self.ttl_seconds = {**DEFAULT_TTL_SECONDS, **(ttl_seconds or {})}
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.local_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "IPOStore":
+        """Build a store from the ipo_store section of config/config.yaml"""
+        settings = settings or {}
+        return cls(path=settings.get("path", ".cache/ipo_store.sqlite3"), ttl_seconds=settings.get("ttl_seconds"))
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close())"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            columns = ", ".join(f"{name} {column_type}" for name, (_group, column_type) in FIELDS.items())
+            conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS ipos (
+                    company_key TEXT PRIMARY KEY,
+                    company TEXT NOT NULL,
+                    {columns},
+                    source_url TEXT,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_ipos_open ON ipos(open_date);
+                CREATE INDEX IF NOT EXISTS idx_ipos_close ON ipos(close_date);
+                CREATE INDEX IF NOT EXISTS idx_ipos_listing ON ipos(listing_date);
+                CREATE INDEX IF NOT EXISTS idx_ipos_board ON ipos(board, open_date);
+
+                CREATE TABLE IF NOT EXISTS ipo_field_updates (
+                    company_key TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    source_url TEXT,
+                    PRIMARY KEY (company_key, field)
+                );
+
+                CREATE TABLE IF NOT EXISTS ipo_snapshots (
+                    company_key TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    observed_at REAL NOT NULL,
+                    source_url TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_ipo_snapshots ON ipo_snapshots(company_key, kind, observed_at);
+
+                CREATE TABLE IF NOT EXISTS ipo_lists (
+                    name TEXT PRIMARY KEY,
+                    refreshed_at REAL NOT NULL
+                );
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def upsert(self, record: Any, observed_at: Optional[float] = None) -> Optional[str]:
+        """
+        Merge an extracted record into the store
+
+        Args:
+            record (IPORecord | dict): Extracted facts; must name the company
+            observed_at (float): Observation time (defaults to now)
+
+        Returns:
+            str: The company key, or None if the record has no company
+        """
+        return self.upsert_many([record], observed_at)[0] if record else None
+
+    def upsert_many(self, records: Iterable[Any], observed_at: Optional[float] = None) -> List[Optional[str]]:
+        """
+        Merge several records; for a company seen twice in one batch the first value of each field wins
+        (records arrive in search rank order)
+
+        Returns:
+            list: Company key per record (None for records without a company)
+        """
+        now = observed_at or time.time()
+        keys: List[Optional[str]] = []
+        written = set()
+        with self._lock:
+            conn = self._connection()
+            for record in records:
+                data = record.to_dict() if isinstance(record, IPORecord) else dict(record)
+                company = data.get("company")
+                key = company_key(company) if company else ""
+                if not key:
+                    keys.append(None)
+                    continue
+                keys.append(key)
+                source = data.get("source_url")
+                conn.execute(
+                    "INSERT OR IGNORE INTO ipos (company_key, company, updated_at) VALUES (?, ?, ?)",
+                    (key, company, now),
+                )
+                fields = [name for name in FIELD_GROUPS if data.get(name) not in (None, [], {}) and (key, name) not in written]
+                for name in fields:
+                    value = data[name]
+                    stored = json.dumps(value, ensure_ascii=False) if name in _JSON_FIELDS else value
+                    conn.execute(f"UPDATE ipos SET {name} = ?, source_url = ?, updated_at = ? WHERE company_key = ?",
+                                 (stored, source, now, key))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO ipo_field_updates (company_key, field, updated_at, source_url) VALUES (?, ?, ?, ?)",
+                        (key, name, now, source),
+                    )
+                    written.add((key, name))
+                for kind, field_names in (("gmp", ("gmp", "gmp_percent")), ("subscription", ("subscription_times", "subscription_by_category"))):
+                    snapshot = {name: data[name] for name in field_names if name in fields}
+                    if snapshot:
+                        conn.execute(
+                            "INSERT INTO ipo_snapshots (company_key, kind, value, observed_at, source_url) VALUES (?, ?, ?, ?, ?)",
+                            (key, kind, json.dumps(snapshot), now, source),
+                        )
+            conn.commit()
+        return keys
+
+    def _row_to_record(self, row: sqlite3.Row, columns: Sequence[str]) -> Dict[str, Any]:
+        record = {}
+        for name, value in zip(columns, row):
+            if value is None:
+                continue
+            record[name] = json.loads(value) if name in _JSON_FIELDS else value
+        record.pop("company_key", None)
+        record["status"] = ipo_status(record)
+        return record
+
+    def _resolve_key(self, conn: sqlite3.Connection, company: str) -> Optional[str]:
+        key = company_key(company)
+        if not key:
+            return None
+        row = conn.execute("SELECT company_key FROM ipos WHERE company_key = ?", (key,)).fetchone()
+        if row is None:
+            # "Hyundai" finds "hyundai motor india"
+            row = conn.execute(
+                "SELECT company_key FROM ipos WHERE company_key LIKE ? ORDER BY updated_at DESC LIMIT 1",
+                (key.replace("%", "") + "%",),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, company: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored facts for a company
+
+        Args:
+            company (str): Company name (exact, or a prefix of the stored name)
+
+        Returns:
+            dict: Record fields plus 'status' and 'field_updated_at', or None if unknown
+        """
+        with self._lock:
+            conn = self._connection()
+            key = self._resolve_key(conn, company)
+            if key is None:
+                return None
+            cursor = conn.execute("SELECT * FROM ipos WHERE company_key = ?", (key,))
+            columns = [column[0] for column in cursor.description]
+            record = self._row_to_record(cursor.fetchone(), columns)
+            record["field_updated_at"] = dict(
+                conn.execute("SELECT field, updated_at FROM ipo_field_updates WHERE company_key = ?", (key,)).fetchall()
+            )
+        return record
+
+    def stale_fields(self, record: Optional[Dict[str, Any]], fields: Sequence[str], now: Optional[float] = None) -> List[str]:
+        """Fields that are missing from a stored record or older than their group's TTL"""
+        if record is None:
+            return list(fields)
+        now = now or time.time()
+        updated = record.get("field_updated_at", {})
+        return [
+            name for name in fields
+            if name not in updated or now - updated[name] > self.ttl_seconds[FIELD_GROUPS[name]]
+        ]
+
+    def lookup(self, company: str, kind: str = "company") -> Optional[Dict[str, Any]]:
+        """
+        Answer a per-company lookup locally when every field it needs is fresh
+
+        Args:
+            company (str): Company name
+            kind (str): 'company', 'gmp' or 'subscription'
+
+        Returns:
+            dict: The stored record, or None when the caller has to search
+        """
+        record = self.get(company)
+        fresh = record is not None and not self.stale_fields(record, LOOKUP_FIELDS[kind])
+        with self._lock:
+            if fresh:
+                self.local_hits += 1
+            else:
+                self.misses += 1
+        return record if fresh else None
+
+    def upcoming(self, today: Optional[date] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """IPOs opening today or later, or open right now, by open date"""
+        today = (today or date.today()).isoformat()
+        with self._lock:
+            cursor = self._connection().execute(
+                """
+                SELECT * FROM ipos
+                WHERE open_date >= ? OR (open_date <= ? AND close_date >= ?)
+                ORDER BY open_date ASC LIMIT ?
+                """,
+                (today, today, today, limit),
+            )
+            columns = [column[0] for column in cursor.description]
+            return [self._row_to_record(row, columns) for row in cursor.fetchall()]
+
+    def recently_listed(self, days: int = 30, today: Optional[date] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """IPOs listed in the last `days` days, newest first"""
+        today = today or date.today()
+        since = date.fromordinal(today.toordinal() - days).isoformat()
+        with self._lock:
+            cursor = self._connection().execute(
+                "SELECT * FROM ipos WHERE listing_date BETWEEN ? AND ? ORDER BY listing_date DESC LIMIT ?",
+                (since, today.isoformat(), limit),
+            )
+            columns = [column[0] for column in cursor.description]
+            return [self._row_to_record(row, columns) for row in cursor.fetchall()]
+
+    def snapshots(self, company: str, kind: str, since: float = 0.0) -> List[Dict[str, Any]]:
+        """GMP or subscription snapshots for a company, oldest first"""
+        with self._lock:
+            conn = self._connection()
+            key = self._resolve_key(conn, company)
+            if key is None:
+                return []
+            rows = conn.execute(
+                "SELECT value, observed_at, source_url FROM ipo_snapshots WHERE company_key = ? AND kind = ? AND observed_at >= ? ORDER BY observed_at",
+                (key, kind, since),
+            ).fetchall()
+        return [{**json.loads(value), "observed_at": observed_at, "source_url": source} for value, observed_at, source in rows]
+
+    def mark_list_refreshed(self, name: str) -> None:
+        """Record that a list search ('upcoming', 'recent') was just run"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO ipo_lists (name, refreshed_at) VALUES (?, ?)", (name, time.time()))
+            conn.commit()
+
+    def list_is_fresh(self, name: str) -> bool:
+        """Whether a list search ran within the 'list' TTL"""
+        with self._lock:
+            row = self._connection().execute("SELECT refreshed_at FROM ipo_lists WHERE name = ?", (name,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds["list"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            companies = self._connection().execute("SELECT COUNT(*) FROM ipos").fetchone()[0]
+            lookups = self.local_hits + self.misses
+            return {
+                "companies": companies,
+                "local_hits": self.local_hits,
+                "misses": self.misses,
+                "local_hit_rate": self.local_hits / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_ipo_store: Optional[IPOStore] = None
+_ipo_store_loaded = False
+_ipo_store_lock = threading.Lock()
+
+
+def get_ipo_store() -> Optional[IPOStore]:
+    """
+    Return the process-wide IPO knowledge store configured in config/config.yaml
+
+    Returns:
+        IPOStore: The shared store, or None when disabled in config
+    """
+    global _ipo_store, _ipo_store_loaded
+    if not _ipo_store_loaded:
+        with _ipo_store_lock:
+            if not _ipo_store_loaded:
+                settings = cassette_cache_settings("ipo_store")
+                if settings.get("enabled", True):
+                    _ipo_store = IPOStore.from_config(settings)
+                _ipo_store_loaded = True
+    return _ipo_store
@@ -0,0 +1,146 @@
+"""
+Vectorized listing-gain and application-cost calculator.
+
+Turns stored IPO records (price band / issue price, lot size, GMP, board) into
+expected listing price, listing gain %, profit per lot and minimum
+application amount for every IPO at once with NumPy, so the agent quotes
+computed numbers instead of doing the arithmetic itself.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from utils.config_loader import load_config_section
+
+
+def _column(records: List[Dict[str, Any]], name: str) -> np.ndarray:
+    """Float column of a record list, NaN where the field is missing"""
+    return np.array([np.nan if record.get(name) is None else float(record[name]) for record in records], dtype=np.float64)
+
+
+class ListingCalculator:
+    """Listing gain and application cost for a batch of IPOs"""
+
+    def __init__(self, mainboard_min_lots: int = 1, sme_min_lots: int = 2, retail_max_application: float = 200000.0):
+        """
+        Args:
+            mainboard_min_lots (int): Lots in the smallest mainboard retail application
+            sme_min_lots (int): Lots in the smallest SME application
+            retail_max_application (float): Largest retail application amount in ₹ (mainboard)
+        """
+        self.mainboard_min_lots = mainboard_min_lots
+        self.sme_min_lots = sme_min_lots
+        self.retail_max_application = retail_max_application
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "ListingCalculator":
+        """Build a calculator from the listing_calculator section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            mainboard_min_lots=settings.get("mainboard_min_lots", 1),
+            sme_min_lots=settings.get("sme_min_lots", 2),
+            retail_max_application=settings.get("retail_max_application", 200000.0),
+        )
+
+    def calculate(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Compute listing estimates for every record at once
+
+        Args:
+            records (Iterable): IPO record dicts (company, board, issue_price or price_band_high,
+                                lot_size, gmp)
+
+        Returns:
+            list: One row per record with issue_price, gmp, expected_listing_price, gain_percent,
+                  profit_per_lot, min_lots, min_application and max_retail_lots (None where inputs are missing)
+        """
+        records = [record for record in records if record.get("company")]
+        if not records:
+            return []
+
+        price = _column(records, "issue_price")
+        price = np.where(np.isnan(price), _column(records, "price_band_high"), price)
+        gmp = _column(records, "gmp")
+        lot_size = _column(records, "lot_size")
+        is_sme = np.array([str(record.get("board") or "").lower() == "sme" for record in records])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected_listing = price + gmp
+            gain_percent = np.where(price > 0, gmp / price * 100, np.nan)
+            profit_per_lot = gmp * lot_size
+            min_lots = np.where(is_sme, self.sme_min_lots, self.mainboard_min_lots)
+            lot_cost = price * lot_size
+            min_application = lot_cost * min_lots
+            max_retail_lots = np.where(is_sme | ~(lot_cost > 0), np.nan, np.floor(self.retail_max_application / lot_cost))
+
+        def value(array: np.ndarray, i: int, digits: int = 2) -> Optional[float]:
+            return None if np.isnan(array[i]) else round(float(array[i]), digits)
+
+        rows = []
+        for i, record in enumerate(records):
+            rows.append({
+                "company": record["company"],
+                "board": "SME" if is_sme[i] else "Mainboard",
+                "issue_price": value(price, i),
+                "gmp": value(gmp, i),
+                "lot_size": value(lot_size, i, 0),
+                "expected_listing_price": value(expected_listing, i),
+                "gain_percent": value(gain_percent, i),
+                "profit_per_lot": value(profit_per_lot, i),
+                "min_lots": int(min_lots[i]),
+                "min_application": value(min_application, i),
+                "max_retail_lots": value(max_retail_lots, i, 0),
+            })
+        return rows
+
+
+def format_listing_table(rows: List[Dict[str, Any]]) -> str:
+    """
+    Render calculator rows as a compact pipe table, best expected gain first
+
+    Args:
+        rows (list): Output of ListingCalculator.calculate()
+
+    Returns:
+        str: Table the agent can quote directly
+    """
+    def cell(number: Optional[float], prefix: str = "", suffix: str = "") -> str:
+        if number is None:
+            return "n/a"
+        return f"{prefix}{number:,.2f}".rstrip("0").rstrip(".") + suffix
+
+    ranked = sorted(rows, key=lambda row: -(row["gain_percent"] if row["gain_percent"] is not None else float("-inf")))
+    lines = [
+        "| IPO | Board | Issue price | GMP | Exp. listing | Gain % | Profit/lot | Min application | Max retail lots |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for row in ranked:
+        min_application = cell(row["min_application"], "₹")
+        if row["min_application"] is not None:
+            min_application += f" ({row['min_lots']} lot{'s' if row['min_lots'] > 1 else ''})"
+        lines.append(
+            f"| {row['company']} | {row['board']} | {cell(row['issue_price'], '₹')} | {cell(row['gmp'], '₹')} | "
+            f"{cell(row['expected_listing_price'], '₹')} | {cell(row['gain_percent'], suffix='%')} | "
+            f"{cell(row['profit_per_lot'], '₹')} | {min_application} | "
+            f"{'n/a' if row['max_retail_lots'] is None else int(row['max_retail_lots'])} |"
+        )
+    return "\n".join(lines)
+
+
+_listing_calculator: Optional[ListingCalculator] = None
+_listing_calculator_lock = threading.Lock()
+
+
+def get_listing_calculator() -> ListingCalculator:
+    """
+    Return the process-wide calculator configured in config/config.yaml
+
+    Returns:
+        ListingCalculator: The shared calculator
+    """
+    global _listing_calculator
+    if _listing_calculator is None:
+        with _listing_calculator_lock:
+            if _listing_calculator is None:
+                _listing_calculator = ListingCalculator.from_config(load_config_section("listing_calculator"))
+    return _listing_calculator
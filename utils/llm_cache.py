@@ -0,0 +1,249 @@
+"""
+Disk-backed exact-match cache for chat model responses.
+
+Plugged into the registry's chat models through LangChain's `cache=` hook, so
+every invoke of the orchestrator, the IPO advisor and the query generators
+checks it first. Keys hash the serialized messages together with LangChain's
+llm_string (model name, parameters and bound tool schemas) and the IST market
+date, because the prompts embed today's date. Entries expire after a TTL and
+the least recently used ones are evicted above max_entries.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from utils.cassette import cassette_cache_settings
+from utils.sqlite_utils import connect_sqlite
+from logger.logger import get_logger
+
+logger = get_logger("llm_cache")
+
+# Prompts embed the Indian market date, so entries are bucketed by it
+IST = timezone(timedelta(hours=5, minutes=30), name="IST")
+
+
+def market_date(now: Optional[float] = None) -> str:
+    """IST calendar date (YYYY-MM-DD) of an epoch time, defaulting to now"""
+    return datetime.fromtimestamp(time.time() if now is None else now, IST).date().isoformat()
+
+
+class LLMResponseCache(BaseCache):
+    """SQLite cache of chat generations with TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = ".cache/llm_cache.sqlite3",
+        ttl_seconds: int = 6 * 60 * 60,
+        max_entries: int = 2000,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory cache)
+            ttl_seconds (int): How long a response is served after it was stored
+            max_entries (int): Upper bound on stored responses before LRU eviction
+            clock (Callable): Time source in epoch seconds, for TTLs and the market date bucket
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "LLMResponseCache":
+        """Build a cache from the llm_cache section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/llm_cache.sqlite3"),
+            ttl_seconds=settings.get("ttl_seconds", 6 * 60 * 60),
+            max_entries=settings.get("max_entries", 2000),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close())"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    market_date TEXT NOT NULL,
+                    generations TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str, date: str) -> str:
+        """
+        Stable key for one model call
+
+        Args:
+            prompt (str): Serialized message list, as passed by LangChain
+            llm_string (str): Serialized model name, parameters and bound tools
+            date (str): IST market date the call was made on
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        raw = f"{date}\x1f{llm_string}\x1f{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """
+        Look up the cached generations of a call
+
+        Args:
+            prompt (str): Serialized message list
+            llm_string (str): Serialized model configuration
+
+        Returns:
+            Sequence: Cached chat generations, or None on a miss or expired entry
+        """
+        now = self.clock()
+        key = self.make_key(prompt, llm_string, market_date(now))
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT generations FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        stored = json.loads(row[0])
+        messages = messages_from_dict(stored["messages"])
+        return [
+            ChatGeneration(message=message, generation_info=info)
+            for message, info in zip(messages, stored["generation_info"])
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """
+        Store the generations of a successful call
+
+        Args:
+            prompt (str): Serialized message list
+            llm_string (str): Serialized model configuration
+            return_val (Sequence): Generations returned by the model
+        """
+        if not return_val or not all(isinstance(generation, ChatGeneration) for generation in return_val):
+            return
+        try:
+            serialized = json.dumps({
+                "messages": messages_to_dict([generation.message for generation in return_val]),
+                "generation_info": [generation.generation_info for generation in return_val],
+            }, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping unserializable LLM response: {e}")
+            return
+
+        now = self.clock()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache
+                    (key, market_date, generations, created_at, expires_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (
+                    self.make_key(prompt, llm_string, market_date(now)),
+                    market_date(now),
+                    serialized,
+                    now,
+                    now + self.ttl_seconds,
+                    now,
+                ),
+            )
+            self._evict(conn, now)
+            conn.commit()
+            self.stores += 1
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones above max_entries"""
+        count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every cached response"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_loaded = False
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Return the process-wide LLM response cache configured in config/config.yaml
+
+    Returns:
+        LLMResponseCache: The shared cache, or None when disabled in config
+    """
+    global _llm_cache, _llm_cache_loaded
+    if not _llm_cache_loaded:
+        with _llm_cache_lock:
+            if not _llm_cache_loaded:
+                settings = cassette_cache_settings("llm_cache")
+                if settings.get("enabled", True):
+                    _llm_cache = LLMResponseCache.from_config(settings)
+                _llm_cache_loaded = True
+    return _llm_cache
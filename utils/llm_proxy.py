@@ -0,0 +1,109 @@
+"""
+Base class for chat models that wrap another chat model.
+
+Wrappers (cassette recording, rate limiting, failover, ...) subclass
+DelegatingChatModel and override _generate / _agenerate; everything else,
+including tool binding, behaves like the wrapped ChatGroq model so agents and
+create_react_agent can use the wrapper as a drop-in replacement.
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+class DelegatingChatModel(BaseChatModel):
+    """Chat model that forwards every call to an inner chat model"""
+
+    inner: Optional[BaseChatModel] = None
+    model_name: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "delegating-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # The inner model's sampling params keep response cache keys apart per configuration;
+        # ChatGroq reports none of its own, so fall back to the request params it sends
+        params = {}
+        if self.inner is not None:
+            params.update(self.inner._identifying_params or getattr(self.inner, "_default_params", None) or {})
+        params["model_name"] = self.model_name
+        return params
+
+    def bind_tools(
+        self,
+        tools: Sequence[Union[Dict[str, Any], type, Callable, BaseTool]],
+        *,
+        tool_choice: Optional[Union[dict, str, bool]] = None,
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        """
+        Bind tools in the OpenAI format used by Groq
+
+        Args:
+            tools (Sequence): Tools to bind
+            tool_choice: 'auto', 'any', 'none', a tool name or True for the only tool
+
+        Returns:
+            Runnable: This model with the tools bound as call kwargs
+        """
+        kwargs.pop("strict", None)
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        if tool_choice:
+            if tool_choice == "any":
+                tool_choice = "required"
+            if isinstance(tool_choice, bool):
+                tool_choice = {"type": "function", "function": {"name": formatted_tools[0]["function"]["name"]}}
+            elif isinstance(tool_choice, str) and tool_choice not in ("auto", "none", "required"):
+                tool_choice = {"type": "function", "function": {"name": tool_choice}}
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted_tools, **kwargs)
+
+    def _require_inner(self) -> BaseChatModel:
+        if self.inner is None:
+            raise RuntimeError(f"{type(self).__name__} for '{self.model_name}' has no underlying model")
+        return self.inner
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self._require_inner()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self._require_inner()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        yield from self._require_inner()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in self._require_inner()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
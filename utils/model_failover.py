@@ -0,0 +1,284 @@
+"""
+Automatic failover between Groq models.
+
+Every model has a process-wide ModelHealth record: error rate and latency
+EWMAs, 429 count and the end of its current rate-limit reset window. A
+FailoverChatModel tries its primary model first and moves to the configured
+fallbacks when the primary is cooling down after a 429, would queue too long in
+its rate limiter or fails. Each response records the model that actually
+served it in response_metadata["served_by"].
+"""
+
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from pydantic import Field
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from utils.config_loader import load_config_section
+from utils.llm_proxy import DelegatingChatModel
+from utils.rate_limiter import RateLimitExceeded, get_rate_limiter
+from logger.logger import get_logger
+
+logger = get_logger("model_failover")
+
+# Groq phrases its reset window as "Please try again in 1m23.5s" (hours, minutes and seconds are optional)
+_TRY_AGAIN_RE = re.compile(r"try again in\s+(?:(\d+)h)?(?:(\d+)m(?!s))?(?:([\d.]+)s)?", re.IGNORECASE)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for a 429 from the API or a call the local rate limiter refused to queue"""
+    return (
+        isinstance(error, RateLimitExceeded)
+        or getattr(error, "status_code", None) == 429
+        or type(error).__name__ == "RateLimitError"
+    )
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Reset window announced by a rate-limit error
+
+    Args:
+        error (Exception): RateLimitExceeded, or a Groq RateLimitError with headers and message
+
+    Returns:
+        float: Seconds until the model accepts calls again, or None if the error does not say
+    """
+    if getattr(error, "retry_after", None) is not None:
+        return float(error.retry_after)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    match = _TRY_AGAIN_RE.search(str(error))
+    if match and any(match.groups()):
+        hours, minutes, seconds = (float(group) if group else 0.0 for group in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+    return None
+
+
+class ModelHealth:
+    """Error rate, latency and rate-limit state of one model"""
+
+    def __init__(self, model_name: str, alpha: float = 0.2, default_cooldown_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            model_name (str): Model being tracked
+            alpha (float): Weight of the newest observation in the EWMAs
+            default_cooldown_seconds (float): Cooldown after a 429 that announces no reset window
+            clock (Callable): Monotonic time source
+        """
+        self.model_name = model_name
+        self.alpha = alpha
+        self.default_cooldown_seconds = default_cooldown_seconds
+        self.clock = clock
+
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.error_rate = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.cooldown_until = 0.0
+
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.error_rate *= 1 - self.alpha
+            self.latency_ewma = latency if self.latency_ewma is None else (
+                self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+            )
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            if is_rate_limit_error(error):
+                self.rate_limited += 1
+                wait = retry_after_seconds(error)
+                self.cooldown_until = max(
+                    self.cooldown_until, self.clock() + (self.default_cooldown_seconds if wait is None else wait)
+                )
+
+    def cooling_down(self) -> bool:
+        """Whether the model is inside a rate-limit reset window"""
+        return self.clock() < self.cooldown_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "error_rate": round(self.error_rate, 3),
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - self.clock()), 1),
+        }
+
+
+_health: Dict[str, ModelHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_model_health(model_name: str) -> ModelHealth:
+    """
+    Return the process-wide health record of a model
+
+    Args:
+        model_name (str): Groq model name
+
+    Returns:
+        ModelHealth: The shared record, created on first use
+    """
+    with _health_lock:
+        if model_name not in _health:
+            settings = load_config_section("model_failover")
+            _health[model_name] = ModelHealth(
+                model_name,
+                alpha=settings.get("ewma_alpha", 0.2),
+                default_cooldown_seconds=settings.get("default_cooldown_seconds", 60.0),
+            )
+        return _health[model_name]
+
+
+def model_health_stats() -> Dict[str, Dict[str, Any]]:
+    """Health of every model seen so far, by model name"""
+    with _health_lock:
+        return {name: health.stats() for name, health in _health.items()}
+
+
+class FailoverChatModel(DelegatingChatModel):
+    """Chat model that routes each call to the healthiest of a primary model and its fallbacks"""
+
+    fallbacks: List[Any] = Field(default_factory=list)
+    fallback_names: List[str] = Field(default_factory=list)
+    max_queue_seconds: float = 10.0
+    max_error_rate: float = 0.5
+    served: Dict[str, int] = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "failover-chat-model"
+
+    def _candidates(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> List[tuple]:
+        """(model name, model, health) in the order they should be tried"""
+        candidates = list(zip([self.model_name] + self.fallback_names, [self._require_inner()] + self.fallbacks))
+
+        def rank(item: tuple) -> tuple:
+            index, (name, _) = item
+            health = get_model_health(name)
+            limiter = get_rate_limiter(name)
+            queued = limiter is not None and limiter.peek(limiter.estimate_tokens(messages, kwargs)) > self.max_queue_seconds
+            return health.cooling_down(), queued, health.error_rate > self.max_error_rate, index
+
+        ordered = sorted(enumerate(candidates), key=rank)
+        return [(name, model, get_model_health(name)) for _, (name, model) in ordered]
+
+    def _served(self, name: str, result: Any) -> Any:
+        self.served[name] = self.served.get(name, 0) + 1
+        for generation in getattr(result, "generations", None) or [result]:
+            generation.message.response_metadata["served_by"] = name
+        if name != self.model_name:
+            logger.info(f"Call for {self.model_name} served by {name}")
+        return result
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        error = None
+        for name, model, health in self._candidates(messages, kwargs):
+            started = time.perf_counter()
+            try:
+                result = model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                health.record_failure(e)
+                logger.warning(f"{name} failed, trying the next model: {e}")
+                error = e
+                continue
+            health.record_success(time.perf_counter() - started)
+            return self._served(name, result)
+        raise error
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        error = None
+        for name, model, health in self._candidates(messages, kwargs):
+            started = time.perf_counter()
+            try:
+                result = await model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                health.record_failure(e)
+                logger.warning(f"{name} failed, trying the next model: {e}")
+                error = e
+                continue
+            health.record_success(time.perf_counter() - started)
+            return self._served(name, result)
+        raise error
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # Failover is only possible until the first chunk has been handed out
+        error = None
+        for name, model, health in self._candidates(messages, kwargs):
+            started = time.perf_counter()
+            chunks = model._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                health.record_failure(e)
+                logger.warning(f"{name} failed, trying the next model: {e}")
+                error = e
+                continue
+            if first is not None:
+                yield self._served(name, first)
+                yield from chunks
+            health.record_success(time.perf_counter() - started)
+            return
+        raise error
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        error = None
+        for name, model, health in self._candidates(messages, kwargs):
+            started = time.perf_counter()
+            chunks = model._astream(messages, stop=stop, run_manager=run_manager, **kwargs).__aiter__()
+            try:
+                first = await anext(chunks, None)
+            except Exception as e:
+                health.record_failure(e)
+                logger.warning(f"{name} failed, trying the next model: {e}")
+                error = e
+                continue
+            if first is not None:
+                yield self._served(name, first)
+                async for chunk in chunks:
+                    yield chunk
+            health.record_success(time.perf_counter() - started)
+            return
+        raise error
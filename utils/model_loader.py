@@ -1,9 +1,16 @@
 import os
+import threading
 from dotenv import load_dotenv
-from typing import Literal, Optional, Any
+from typing import Literal, Optional, Any, Dict, Tuple
+import httpx
 from pydantic import BaseModel, Field
 from utils.config_loader import load_config
 from langchain_groq import ChatGroq
+from langchain_core.language_models import BaseChatModel
+from utils.cassette import cassette_chat_model
+from utils.llm_cache import get_llm_cache
+from utils.rate_limiter import rate_limited_chat_model
+from utils.model_failover import FailoverChatModel
 from logger.logger import get_logger
 
 # Load environment variables first
@@ -16,43 +23,217 @@ class ConfigLoader:
     def __init__(self):
         logger.info("Loading configuration")
         self.config = load_config()
-    
+
     def __getitem__(self, key):
         return self.config[key]
 
+
+class LLMRegistry:
+    """
+    Process-wide cache of chat model clients.
+
+    config/config.yaml is parsed once; each (provider, model, params) combination
+    gets a single client, and every Groq client shares one sync and one async
+    HTTP connection pool.
+    """
+
+    def __init__(self, config: Optional[ConfigLoader] = None):
+        """
+        Args:
+            config (ConfigLoader): Parsed configuration (loaded from config/config.yaml if None)
+        """
+        self.config = config or ConfigLoader()
+        settings = self.config.config.get("llm_client") or {}
+        self.limits = httpx.Limits(
+            max_connections=settings.get("max_connections", 20),
+            max_keepalive_connections=settings.get("max_keepalive_connections", 10),
+            keepalive_expiry=settings.get("keepalive_expiry", 60.0),
+        )
+        self.timeout = httpx.Timeout(settings.get("timeout", 60.0), connect=settings.get("connect_timeout", 10.0))
+        self.created = 0
+        self.reused = 0
+        self._clients: Dict[Tuple, BaseChatModel] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.RLock()
+
+    def providers(self) -> Dict[str, dict]:
+        """Model entries of the llm section, by config name"""
+        return dict(self.config.config.get("llm") or {})
+
+    def http_clients(self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """The shared sync and async HTTP clients, created on first use"""
+        with self._lock:
+            if self._http_client is None or self._http_client.is_closed:
+                self._http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+            if self._http_async_client is None or self._http_async_client.is_closed:
+                self._http_async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            return self._http_client, self._http_async_client
+
+    def _entry(self, model_provider: str) -> dict:
+        entry = self.providers().get(model_provider)
+        if not entry:
+            error_msg = f"Unsupported model provider: {model_provider}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        return entry
+
+    @staticmethod
+    def _params_key(params: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+    def get(self, model_provider: str, **params: Any) -> BaseChatModel:
+        """
+        Return the shared client for a configured model
+
+        Args:
+            model_provider (str): Entry name under llm in config/config.yaml, e.g. "groq_oss"
+            **params: Extra model parameters (temperature, max_tokens, ...), overriding the config entry
+
+        Returns:
+            BaseChatModel: The cached client, created on first request; entries with fallbacks
+                           get a FailoverChatModel over the client and its fallback clients
+        """
+        entry = self._entry(model_provider)
+        failover = self.config.config.get("model_failover") or {}
+        fallbacks = entry.get("fallbacks") or [] if failover.get("enabled", True) else []
+        llm = self._client(model_provider, params, routed=bool(fallbacks))
+        if not fallbacks:
+            return llm
+
+        key = ("failover", model_provider, self._params_key(params))
+        with self._lock:
+            routed = self._clients.get(key)
+            if routed is None:
+                routed = FailoverChatModel(
+                    inner=llm,
+                    model_name=entry["model_name"],
+                    fallbacks=[self._client(name, params, routed=True) for name in fallbacks],
+                    fallback_names=[self._entry(name)["model_name"] for name in fallbacks],
+                    max_queue_seconds=failover.get("max_queue_seconds", 10.0),
+                    max_error_rate=failover.get("max_error_rate", 0.5),
+                )
+                cache = get_llm_cache()
+                if cache is not None:
+                    routed.cache = cache
+                self._clients[key] = routed
+        return routed
+
+    def _client(self, model_provider: str, params: Dict[str, Any], routed: bool = False) -> BaseChatModel:
+        """
+        The single client of one configured model and parameter set
+
+        Args:
+            model_provider (str): Entry name under llm in config/config.yaml
+            params (dict): Extra model parameters
+            routed (bool): Whether the client sits under a FailoverChatModel, which should see
+                           a 429 at once instead of after the rate limiter's retries
+        """
+        entry = self._entry(model_provider)
+        provider = entry.get("provider", "groq")
+        model_name = entry["model_name"]
+        params = {**{k: v for k, v in entry.items() if k not in ("provider", "model_name", "fallbacks")}, **params}
+        key = (provider, model_name, self._params_key(params), routed)
+
+        with self._lock:
+            llm = self._clients.get(key)
+            if llm is not None:
+                self.reused += 1
+                return llm
+            llm = self._create(provider, model_name, params, max_retries=0 if routed else 2)
+            self._clients[key] = llm
+            self.created += 1
+        return llm
+
+    def _create(self, provider: str, model_name: str, params: Dict[str, Any], max_retries: int = 2) -> BaseChatModel:
+        if provider == "groq":
+            logger.info(f"Using Groq model: {model_name}")
+            groq_api_key = os.getenv("GROQ_API_KEY")
+
+            def factory() -> BaseChatModel:
+                http_client, http_async_client = self.http_clients()
+                llm = ChatGroq(
+                    model=model_name,
+                    api_key=groq_api_key,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    # 429s are retried by the rate limiter (or handed to failover), never by the SDK
+                    max_retries=0,
+                    **params,
+                )
+                # Live calls queue through the model's RPM/TPM/TPD buckets
+                return rate_limited_chat_model(model_name, llm, max_retries=max_retries)
+
+            # Recorded to / replayed from the cassette when CASSETTE_MODE is set
+            llm = cassette_chat_model(model_name, factory)
+            # Identical calls on the same market date are answered from the response cache
+            cache = get_llm_cache()
+            if cache is not None:
+                llm.cache = cache
+            return llm
+        # elif provider == "openai":
+        #     logger.debug("Loading LLM from OpenAI")
+        #     openai_api_key = os.getenv("OPENAI_API_KEY")
+        #     logger.info(f"Using OpenAI model: {model_name}")
+        #     return ChatOpenAI(model_name=model_name, api_key=openai_api_key)
+        error_msg = f"Unsupported provider: {provider}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+    def close(self) -> None:
+        """Drop every cached client and close the shared connection pools"""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            # The async pool is tied to the event loop that opened its connections; let it be collected
+            self._http_async_client = None
+
+
+_llm_registry: Optional[LLMRegistry] = None
+_llm_registry_lock = threading.Lock()
+
+
+def get_llm_registry() -> LLMRegistry:
+    """
+    Return the process-wide LLM client registry
+
+    Returns:
+        LLMRegistry: The shared registry
+    """
+    global _llm_registry
+    if _llm_registry is None:
+        with _llm_registry_lock:
+            if _llm_registry is None:
+                _llm_registry = LLMRegistry()
+    return _llm_registry
+
+
 class ModelLoader(BaseModel):
-    model_provider: Literal["groq_deepseek", "groq_oss", "openai"] = "groq_deepseek"
+    model_provider: Literal["groq_deepseek", "groq_oss", "groq_oss_20b", "openai"] = "groq_deepseek"
     config: Optional[ConfigLoader] = Field(default=None, exclude=True)
 
     def model_post_init(self, __context: Any) -> None:
-        self.config = ConfigLoader()
-    
+        # Shared with the registry instead of re-reading config/config.yaml
+        self.config = get_llm_registry().config
+
     class Config:
         arbitrary_types_allowed = True
-    
-    def load_llm(self):
+
+    def load_llm(self, **params: Any):
         """
         Load and return the LLM model.
+
+        Args:
+            **params: Extra model parameters (temperature, max_tokens, ...)
+
+        Returns:
+            BaseChatModel: The process-wide client for this provider and parameters
         """
-        logger.info("Loading LLM model")
         logger.debug(f"Loading model from provider: {self.model_provider}")
-        
-        if self.model_provider in ["groq_deepseek", "groq_oss"]:
-            logger.debug(f"Loading LLM from Groq with config: {self.model_provider}")
-            groq_api_key = os.getenv("GROQ_API_KEY")
-            model_name = self.config["llm"][self.model_provider]["model_name"]
-            logger.info(f"Using Groq model: {model_name}")
-            llm = ChatGroq(model=model_name, api_key=groq_api_key)
-        # elif self.model_provider == "openai":
-        #     logger.debug("Loading LLM from OpenAI")
-        #     openai_api_key = os.getenv("OPENAI_API_KEY")
-        #     model_name = self.config["llm"]["openai"]["model_name"]
-        #     logger.info(f"Using OpenAI model: {model_name}")
-        #     llm = ChatOpenAI(model_name="o4-mini", api_key=openai_api_key)
-        else:
-            error_msg = f"Unsupported model provider: {self.model_provider}"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
-        
-        return llm
-    
\ No newline at end of file
+        return get_llm_registry().get(self.model_provider, **params)
@@ -0,0 +1,87 @@
+"""
+Near-duplicate suppression for syndicated search results.
+
+Indian IPO news is widely syndicated, so one search often returns several
+copies of the same article under different URLs. Each result gets a 64-bit
+SimHash over the word unigrams and bigrams of its title and content; results
+whose fingerprints differ in only a few bits are collapsed into the
+best-scored (then most recent) copy before they are formatted into the prompt.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List
+
+_WORD_RE = re.compile(r"[^\W_]+|₹", re.UNICODE)
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    """Word shingles of every length from 1 to size (short snippets need the single words too)"""
+    words = _WORD_RE.findall(str(text).lower())
+    return [" ".join(words[i:i + n]) for n in range(1, size + 1) for i in range(len(words) - n + 1)]
+
+
+def simhash(text: str, shingle_size: int = 2) -> int:
+    """
+    64-bit SimHash fingerprint of a text
+
+    Args:
+        text (str): Text to fingerprint
+        shingle_size (int): Longest shingle in words
+
+    Returns:
+        int: Fingerprint; similar texts differ in few bits
+    """
+    weights = [0] * 64
+    for shingle in _shingles(text, shingle_size):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return (a ^ b).bit_count()
+
+
+def _preference(result: Dict[str, Any]) -> tuple:
+    """Sort key: higher Tavily score first, then the most recently published"""
+    return float(result.get("score") or 0.0), str(result.get("published_date") or "")
+
+
+def collapse_near_duplicates(results: List[Dict[str, Any]], max_distance: int = 14, shingle_size: int = 2) -> List[Dict[str, Any]]:
+    """
+    Drop results that are near-duplicates of a better one
+
+    Args:
+        results (list): Result dicts in ranking order
+        max_distance (int): Largest SimHash Hamming distance still treated as a duplicate
+        shingle_size (int): Longest shingle in words
+
+    Returns:
+        list: Surviving results in their original order; a survivor that absorbed
+              copies lists their URLs under 'duplicate_urls'
+    """
+    fingerprints = [
+        simhash(f"{result.get('title') or ''} {result.get('content') or ''}", shingle_size)
+        for result in results
+    ]
+    order = sorted(range(len(results)), key=lambda i: _preference(results[i]), reverse=True)
+
+    kept: List[int] = []
+    duplicates: Dict[int, List[str]] = {}
+    for i in order:
+        match = next((j for j in kept if hamming_distance(fingerprints[i], fingerprints[j]) <= max_distance), None)
+        if match is None:
+            kept.append(i)
+        else:
+            duplicates.setdefault(match, []).append(results[i].get("url", ""))
+
+    survivors = []
+    for i in sorted(kept):
+        result = results[i]
+        if i in duplicates:
+            result = {**result, "duplicate_urls": duplicates[i]}
+        survivors.append(result)
+    return survivors
@@ -0,0 +1,157 @@
+"""
+Log of recent IPO queries and the companies they mention.
+
+The cache warmer reads it to prefetch the hottest queries and companies first.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from utils.config_loader import load_config_section
+from utils.sqlite_utils import connect_sqlite
+from utils.query_memo import canonicalize_query
+from utils.query_rewriter import detect_company
+
+
+class QueryLog:
+    """SQLite-backed log of user queries and company lookups"""
+
+    def __init__(self, path: str = ".cache/query_log.sqlite3", retention_seconds: int = 7 * 24 * 60 * 60):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory log)
+            retention_seconds (int): How long entries are kept
+        """
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "QueryLog":
+        """Build a log from the query_log section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/query_log.sqlite3"),
+            retention_seconds=settings.get("retention_seconds", 7 * 24 * 60 * 60),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close())"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_log (
+                    kind TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    search_type TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_query_log_kind ON query_log(kind, created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _insert(self, rows: List[Tuple[str, str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT INTO query_log (kind, subject, search_type, created_at) VALUES (?, ?, ?, ?)",
+                [(kind, subject, search_type, now) for kind, subject, search_type in rows],
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute("DELETE FROM query_log WHERE created_at <= ?", (now - self.retention_seconds,))
+            conn.commit()
+
+    def record_query(self, query: str, search_type: str = "ipo") -> None:
+        """
+        Log a user query and the company it mentions, if any
+
+        Args:
+            query (str): Raw user query
+            search_type (str): Search type the query was run with
+        """
+        rows = [("query", " ".join(str(query).split()), search_type)]
+        company = detect_company(query)
+        if company:
+            rows.append(("company", company, search_type))
+        self._insert(rows)
+
+    def record_company(self, company: str, search_type: str = "company") -> None:
+        """Log a per-company lookup"""
+        company = " ".join(str(company).split())
+        if company:
+            self._insert([("company", company, search_type)])
+
+    def _hottest(self, kind: str, limit: int, window_seconds: int) -> List[Tuple[str, str, int]]:
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT subject, search_type, created_at FROM query_log
+                WHERE kind = ? AND created_at > ?
+                ORDER BY created_at DESC
+                """,
+                (kind, time.time() - window_seconds),
+            ).fetchall()
+        # Group case/punctuation variants, keeping the most recent spelling
+        counts: Dict[str, List[Any]] = {}
+        for subject, search_type, _created_at in rows:
+            group = counts.setdefault(canonicalize_query(subject), [subject, search_type, 0])
+            group[2] += 1
+        ranked = sorted(counts.values(), key=lambda group: -group[2])
+        return [tuple(group) for group in ranked[:limit]]
+
+    def hot_queries(self, limit: int = 10, window_seconds: int = 24 * 60 * 60) -> List[Tuple[str, str]]:
+        """
+        Most frequent recent user queries
+
+        Returns:
+            list: (query, search_type) pairs, hottest first
+        """
+        return [(subject, search_type) for subject, search_type, _count in self._hottest("query", limit, window_seconds)]
+
+    def hot_companies(self, limit: int = 20, window_seconds: int = 24 * 60 * 60) -> List[str]:
+        """
+        Most frequently asked-about companies
+
+        Returns:
+            list: Company names, hottest first
+        """
+        return [subject for subject, _search_type, _count in self._hottest("company", limit, window_seconds)]
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_query_log: Optional[QueryLog] = None
+_query_log_loaded = False
+_query_log_lock = threading.Lock()
+
+
+def get_query_log() -> Optional[QueryLog]:
+    """
+    Return the process-wide query log configured in config/config.yaml
+
+    Returns:
+        QueryLog: The shared log, or None when disabled in config
+    """
+    global _query_log, _query_log_loaded
+    if not _query_log_loaded:
+        with _query_log_lock:
+            if not _query_log_loaded:
+                settings = load_config_section("query_log")
+                if settings.get("enabled", True):
+                    _query_log = QueryLog.from_config(settings)
+                _query_log_loaded = True
+    return _query_log
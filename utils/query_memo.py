@@ -0,0 +1,265 @@
+"""
+Memo of LLM query rewrites.
+
+Maps (user query, search type / IPO context) to the optimized search query the
+query generator produced, so repeated and trivially different phrasings of the
+same question skip the rewrite LLM call. Lookups go through an in-process LRU
+first and a SQLite table second.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+from utils.cassette import cassette_cache_settings
+from utils.sqlite_utils import connect_sqlite
+from logger.logger import get_logger
+
+logger = get_logger("query_memo")
+
+_POSSESSIVE_RE = re.compile(r"(\w)['’]s\b")
+_PUNCTUATION_RE = re.compile(r"[^\w\s₹%.]")
+_LOOSE_DOT_RE = re.compile(r"(?<!\d)\.|\.(?!\d)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _shift_month(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+# Relative date phrases, longest first so "day after tomorrow" wins over "tomorrow"
+_RELATIVE_DATES = [
+    (re.compile(r"\bday after tomorrow\b", re.IGNORECASE), lambda d: (d + timedelta(days=2)).isoformat()),
+    (re.compile(r"\bday before yesterday\b", re.IGNORECASE), lambda d: (d - timedelta(days=2)).isoformat()),
+    (re.compile(r"\b(?:this|current) week\b", re.IGNORECASE), lambda d: f"week of {_week_start(d).isoformat()}"),
+    (re.compile(r"\bnext week\b", re.IGNORECASE), lambda d: f"week of {(_week_start(d) + timedelta(days=7)).isoformat()}"),
+    (re.compile(r"\blast week\b", re.IGNORECASE), lambda d: f"week of {(_week_start(d) - timedelta(days=7)).isoformat()}"),
+    (re.compile(r"\b(?:this|current) month\b", re.IGNORECASE), lambda d: d.strftime("%Y-%m")),
+    (re.compile(r"\bnext month\b", re.IGNORECASE), lambda d: _shift_month(d, 1).strftime("%Y-%m")),
+    (re.compile(r"\blast month\b", re.IGNORECASE), lambda d: _shift_month(d, -1).strftime("%Y-%m")),
+    (re.compile(r"\b(?:this|current) year\b", re.IGNORECASE), lambda d: str(d.year)),
+    (re.compile(r"\bnext year\b", re.IGNORECASE), lambda d: str(d.year + 1)),
+    (re.compile(r"\blast year\b", re.IGNORECASE), lambda d: str(d.year - 1)),
+    (re.compile(r"\b(?:today|tonight|right now)\b", re.IGNORECASE), lambda d: d.isoformat()),
+    (re.compile(r"\btomorrow\b", re.IGNORECASE), lambda d: (d + timedelta(days=1)).isoformat()),
+    (re.compile(r"\byesterday\b", re.IGNORECASE), lambda d: (d - timedelta(days=1)).isoformat()),
+]
+
+
+def resolve_relative_dates(text: str, today: Optional[date] = None) -> str:
+    """
+    Replace relative date phrases with absolute dates
+
+    Args:
+        text (str): Text to resolve (phrases are matched case-insensitively)
+        today (date): Reference date, defaults to the current date
+
+    Returns:
+        str: Text with 'today', 'this week', 'next month', ... resolved
+    """
+    today = today or date.today()
+    for pattern, resolve in _RELATIVE_DATES:
+        text = pattern.sub(lambda _match: resolve(today), text)
+    return text
+
+
+def canonicalize_query(query: str, today: Optional[date] = None) -> str:
+    """
+    Canonical form of a user query for memo keying
+
+    Args:
+        query (str): Raw user query
+        today (date): Reference date for relative date resolution
+
+    Returns:
+        str: Lower-cased query without punctuation, with resolved dates and collapsed whitespace
+    """
+    text = _POSSESSIVE_RE.sub(r"\1", str(query).lower())
+    text = _PUNCTUATION_RE.sub(" ", text)
+    text = _LOOSE_DOT_RE.sub(" ", text)
+    text = resolve_relative_dates(text, today)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class QueryMemo:
+    """Two-level (LRU + SQLite) memo of optimized search queries"""
+
+    def __init__(
+        self,
+        path: str = ".cache/query_memo.sqlite3",
+        max_memory_entries: int = 1024,
+        ttl_seconds: int = 7 * 24 * 60 * 60,
+    ):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory memo)
+            max_memory_entries (int): Size of the in-process LRU
+            ttl_seconds (int): How long a persisted rewrite stays valid
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "QueryMemo":
+        """Build a memo from the query_memo section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/query_memo.sqlite3"),
+            max_memory_entries=settings.get("max_memory_entries", 1024),
+            ttl_seconds=settings.get("ttl_seconds", 7 * 24 * 60 * 60),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close())"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_memo (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    context TEXT NOT NULL,
+                    canonical_query TEXT NOT NULL,
+                    optimized_query TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_query_memo_created ON query_memo(created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(namespace: str, query: str, context: str) -> str:
+        """Memo key for a query rewritten by a given generator under a given context"""
+        raw = f"{namespace}\x1f{context}\x1f{canonicalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, optimized_query: str) -> None:
+        self._lru[key] = optimized_query
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, namespace: str, query: str, context: str = "general") -> Optional[str]:
+        """
+        Look up a memoized rewrite
+
+        Args:
+            namespace (str): Query generator the rewrite belongs to ('web', 'ipo')
+            query (str): Original user query
+            context (str): Search type / IPO context passed to the generator
+
+        Returns:
+            str: Optimized query, or None if it has to be generated
+        """
+        key = self.make_key(namespace, query, context)
+        with self._lock:
+            cached = self._lru.get(key)
+            if cached is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return cached
+
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT optimized_query FROM query_memo WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE query_memo SET hits = hits + 1 WHERE key = ?", (key,))
+            conn.commit()
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def set(self, namespace: str, query: str, context: str, optimized_query: str) -> None:
+        """
+        Memoize a rewrite produced by the query generator
+
+        Args:
+            namespace (str): Query generator the rewrite belongs to ('web', 'ipo')
+            query (str): Original user query
+            context (str): Search type / IPO context passed to the generator
+            optimized_query (str): Generated search query
+        """
+        key = self.make_key(namespace, query, context)
+        with self._lock:
+            self._remember(key, optimized_query)
+            conn = self._connection()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO query_memo
+                    (key, namespace, context, canonical_query, optimized_query, created_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, namespace, context, canonicalize_query(query), optimized_query, time.time()),
+            )
+            conn.execute("DELETE FROM query_memo WHERE created_at <= ?", (time.time() - self.ttl_seconds,))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters for this process; every hit is one rewrite LLM call saved"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "llm_calls_saved": hits,
+                "memory_entries": len(self._lru),
+            }
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_query_memo: Optional[QueryMemo] = None
+_query_memo_loaded = False
+_query_memo_lock = threading.Lock()
+
+
+def get_query_memo() -> Optional[QueryMemo]:
+    """
+    Return the process-wide query rewrite memo configured in config/config.yaml
+
+    Returns:
+        QueryMemo: The shared memo, or None when disabled in config
+    """
+    global _query_memo, _query_memo_loaded
+    if not _query_memo_loaded:
+        with _query_memo_lock:
+            if not _query_memo_loaded:
+                settings = cassette_cache_settings("query_memo")
+                if settings.get("enabled", True):
+                    _query_memo = QueryMemo.from_config(settings)
+                _query_memo_loaded = True
+    return _query_memo
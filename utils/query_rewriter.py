@@ -0,0 +1,297 @@
+"""
+Rule-based search query rewriter.
+
+Expands IPO / GMP / subscription / market vocabulary from keyword tables,
+detects company names and resolves relative dates, then scores how confident
+it is in the rewrite. Callers only escalate to the LLM query generator when
+the confidence is below the configured threshold.
+"""
+
+import re
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from utils.config_loader import load_config_section
+from utils.query_memo import resolve_relative_dates
+
+# Phrase -> search terms it expands to (phrases are matched on word boundaries, longest first)
+TERM_EXPANSIONS = {
+    "gmp": "GMP grey market premium",
+    "grey market": "grey market premium GMP",
+    "gray market": "grey market premium GMP",
+    "kostak": "kostak rate",
+    "subject to sauda": "subject to sauda rate",
+    "subscription": "subscription status",
+    "subscribed": "subscription status times subscribed",
+    "oversubscribed": "subscription status times subscribed",
+    "qib": "QIB subscription",
+    "nii": "NII HNI subscription",
+    "hni": "NII HNI subscription",
+    "retail": "retail subscription",
+    "allotment": "allotment status",
+    "listing": "listing date listing price",
+    "listings": "listing date listing price",
+    "listing gain": "listing gain listing price",
+    "price band": "price band",
+    "issue price": "issue price price band",
+    "lot size": "lot size minimum investment",
+    "issue size": "issue size",
+    "anchor": "anchor investors",
+    "rhp": "RHP red herring prospectus",
+    "drhp": "DRHP draft red herring prospectus",
+    "sme": "SME IPO",
+    "mainboard": "mainboard IPO",
+    "upcoming": "upcoming IPO open date",
+    "recent": "recently listed IPO",
+    "ipo": "IPO",
+    "ipos": "IPO",
+    "nifty": "Nifty 50",
+    "sensex": "Sensex",
+    "share price": "share price NSE BSE",
+    "stock price": "share price NSE BSE",
+    "results": "quarterly results",
+    "dividend": "dividend record date",
+    "stock market": "stock market",
+    "trends": "market trends",
+}
+
+# Terms appended for each search type / IPO context
+CONTEXT_TERMS = {
+    "ipo": "IPO India NSE BSE",
+    "gmp": "IPO GMP grey market premium today",
+    "listing": "IPO listing date price band subscription",
+    "upcoming": "upcoming IPO dates price band",
+    "performance": "IPO listing gains performance",
+    "market": "stock market India",
+    "financial": "stock market India financial analysis",
+    "general": "",
+}
+
+# Domain vocabulary that marks a query as one the rules understand well
+_DOMAIN_CONTEXTS = {"ipo", "gmp", "listing", "upcoming", "performance", "market", "financial"}
+
+# Phrasings that need interpretation rather than keyword expansion
+_AMBIGUOUS_RE = re.compile(
+    r"\b(should i|compare|comparison|vs|versus|better than|why|explain|how does|what if|recommend|worth)\b",
+    re.IGNORECASE,
+)
+
+_COMPANY_STOPWORDS = {
+    "IPO", "IPOs", "GMP", "NSE", "BSE", "SME", "QIB", "NII", "HNI", "RHP", "DRHP", "SEBI",
+    "What", "Which", "When", "Where", "Who", "How", "Is", "Are", "The", "Tell", "Show", "Give",
+    "Latest", "Today", "Current", "Upcoming", "Recent", "Best", "Top", "India", "Indian", "Nifty", "Sensex",
+    "Grey", "Gray", "Market", "Premium", "Subscription", "Status", "Listing", "Price", "Band", "Lot", "Size",
+    "Me", "I", "My", "About", "Of", "For", "In", "On", "And", "Or", "A", "An", "Please",
+    "Should", "Can", "Could", "Will", "Does", "Do", "Compare", "Find", "List", "Explain", "Why",
+    "January", "February", "March", "April", "May", "June", "July", "August", "September",
+    "October", "November", "December",
+}
+_COMPANY_SUFFIXES = {"Ltd", "Limited", "Industries", "Motors", "Motor", "Finance", "Bank", "Technologies", "Labs"}
+_CAPITALIZED_RE = re.compile(r"\b[A-Z][A-Za-z0-9&.\-]*(?:\s+[A-Z][A-Za-z0-9&.\-]*)*")
+_COMPANY_BEFORE_IPO_RE = re.compile(r"\b([a-z][a-z0-9&.\-]*(?:\s+[a-z][a-z0-9&.\-]*){0,3})\s+ipo\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[\w₹%.&\-/]+")
+_DATE_TERM_RE = re.compile(
+    r"\bweek of \d{4}-\d{2}-\d{2}\b|\b\d{4}-\d{2}(?:-\d{2})?\b|\b\d{1,2} [A-Z][a-z]+ \d{4}\b|\b[A-Z][a-z]+ \d{4}\b|\b20\d{2}\b"
+)
+_POSSESSIVE_DATE_RE = re.compile(r"\b(today|tonight|tomorrow|yesterday)['’]s\b", re.IGNORECASE)
+# Words that carry no search intent; everything else the tables do not cover is kept in the rewrite
+_FILLER_WORDS = frozenset(
+    "a an the is are was were be am do does did can could will would should what which who when where how "
+    "me i my you your tell show give find please about of on in at for to from with and or any some there "
+    "it its this that these those know want need".split()
+)
+
+
+def detect_company(user_query: str) -> Optional[str]:
+    """
+    Best-effort company name detection
+
+    Args:
+        user_query (str): User query
+
+    Returns:
+        str: Company name, or None if no name could be found
+    """
+    candidates = []
+    for match in _CAPITALIZED_RE.finditer(user_query):
+        # Trim generic words from the edges only; a trailing "India" after a corporate word
+        # such as "Motor" is part of the name, so "Hyundai Motor India IPO" keeps it
+        words = match.group(0).split()
+        while words and words[0].strip(".") in _COMPANY_STOPWORDS:
+            words.pop(0)
+        while words and words[-1].strip(".") in _COMPANY_STOPWORDS:
+            if words[-1].strip(".") == "India" and len(words) > 1 and words[-2] in _COMPANY_SUFFIXES:
+                break
+            words.pop()
+        if words:
+            candidates.append(" ".join(words))
+    if candidates:
+        # Prefer names with a corporate suffix, then the longest one
+        candidates.sort(key=lambda name: (not any(word in _COMPANY_SUFFIXES for word in name.split()), -len(name)))
+        return candidates[0]
+
+    # Lower-case queries: "<name> ipo"
+    match = _COMPANY_BEFORE_IPO_RE.search(user_query)
+    if match:
+        words = [word for word in match.group(1).split() if word.capitalize() not in _COMPANY_STOPWORDS]
+        words = [word for word in words if word.lower() not in TERM_EXPANSIONS]
+        if words:
+            return " ".join(word.capitalize() for word in words)
+    return None
+
+
+class HeuristicQueryRewriter:
+    """Deterministic rewriter that handles the common queries without an LLM call"""
+
+    def __init__(self, min_confidence: float = 0.6, max_words: int = 20):
+        """
+        Args:
+            min_confidence (float): Rewrites scoring below this are escalated to the LLM
+            max_words (int): Cap on the length of the rewritten query
+        """
+        self.min_confidence = min_confidence
+        self.max_words = max_words
+        self._expansions = sorted(TERM_EXPANSIONS.items(), key=lambda item: -len(item[0]))
+        self._lock = threading.Lock()
+        self.fast_path = 0
+        self.escalated = 0
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "HeuristicQueryRewriter":
+        """Build a rewriter from the query_rewriter section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            min_confidence=settings.get("min_confidence", 0.6),
+            max_words=settings.get("max_words", 20),
+        )
+
+    def _matched_terms(self, text: str) -> Tuple[List[str], str]:
+        """Expansions of the table phrases found in text, and the lower-cased text they left over"""
+        lowered = text.lower()
+        terms = []
+        for phrase, expansion in self._expansions:
+            pattern = rf"\b{re.escape(phrase)}\b"
+            if re.search(pattern, lowered):
+                terms.append(expansion)
+                lowered = re.sub(pattern, " ", lowered)
+        return terms, lowered
+
+    def rewrite(self, user_query: str, context: str = "general", today: Optional[date] = None) -> Tuple[str, float]:
+        """
+        Rewrite a query with the keyword tables and score the result
+
+        Args:
+            user_query (str): Original user query
+            context (str): Search type / IPO context ('ipo', 'gmp', 'listing', 'upcoming', 'market', ...)
+            today (date): Reference date for relative date resolution
+
+        Returns:
+            tuple: (rewritten query, confidence between 0 and 1)
+        """
+        company = detect_company(user_query)
+        resolved = resolve_relative_dates(_POSSESSIVE_DATE_RE.sub(r"\1", user_query.strip()), today)
+        date_terms = _DATE_TERM_RE.findall(resolved)
+        undated = _DATE_TERM_RE.sub(" ", resolved)
+        terms, leftover = self._matched_terms(undated)
+
+        # Words the tables did not cover ("best", "news", "buy") still say what is being asked
+        leftover_words = {word.strip(".") for word in _WORD_RE.findall(leftover)}
+        known_words = {word.lower() for word in " ".join([company or ""] + terms).split()}
+        residual = []
+        for word in _WORD_RE.findall(undated):
+            word = word.strip(".")
+            key = word.lower()
+            if word and key in leftover_words and key not in _FILLER_WORDS and key not in known_words:
+                residual.append(word)
+
+        parts = []
+        if company:
+            parts.append(company)
+        parts.extend(residual)
+        parts.extend(terms)
+        parts.append(CONTEXT_TERMS.get(context, ""))
+
+        # De-duplicate words case-insensitively while keeping their first spelling
+        seen = set()
+        words = []
+        for word in _WORD_RE.findall(" ".join(parts)):
+            key = word.lower()
+            if key not in seen:
+                seen.add(key)
+                words.append(word)
+        # Dates stay whole phrases at the end of the query
+        for date_term in date_terms:
+            if date_term.lower() not in seen:
+                seen.add(date_term.lower())
+                words.append(date_term)
+        rewritten = " ".join(words[:self.max_words])
+
+        # Any capitalized word looks like a company ("Paris", "Nvidia"); it only counts as one
+        # next to an IPO / market term from the tables or with a corporate suffix
+        named = company if company and (terms or any(word in _COMPANY_SUFFIXES for word in company.split())) else None
+
+        confidence = 0.4
+        if terms:
+            confidence += 0.3
+        if named or context in ("upcoming", "performance") or (context == "gmp" and not company):
+            confidence += 0.2
+        if context in _DOMAIN_CONTEXTS and not terms and not named:
+            confidence -= 0.2
+        if _AMBIGUOUS_RE.search(user_query) or len(user_query.split()) > 14:
+            confidence -= 0.4
+        # The more of the query the tables do not understand, the more the LLM should phrase it
+        confidence -= 0.1 * max(0, len(set(word.lower() for word in residual)) - 2)
+        confidence = round(max(0.0, min(1.0, confidence)), 2)
+        return rewritten, confidence
+
+    def try_rewrite(self, user_query: str, context: str = "general") -> Optional[str]:
+        """
+        Rewrite if the rules are confident enough
+
+        Args:
+            user_query (str): Original user query
+            context (str): Search type / IPO context
+
+        Returns:
+            str: Rewritten query, or None when the caller should escalate to the LLM
+        """
+        rewritten, confidence = self.rewrite(user_query, context)
+        with self._lock:
+            if confidence >= self.min_confidence:
+                self.fast_path += 1
+                return rewritten
+            self.escalated += 1
+            return None
+
+    def stats(self) -> Dict[str, float]:
+        """How many rewrites took the rule-based fast path vs. the LLM"""
+        with self._lock:
+            total = self.fast_path + self.escalated
+            return {
+                "fast_path": self.fast_path,
+                "escalated": self.escalated,
+                "fast_path_rate": self.fast_path / total if total else 0.0,
+            }
+
+
+_query_rewriter: Optional[HeuristicQueryRewriter] = None
+_query_rewriter_loaded = False
+_query_rewriter_lock = threading.Lock()
+
+
+def get_query_rewriter() -> Optional[HeuristicQueryRewriter]:
+    """
+    Return the process-wide heuristic rewriter configured in config/config.yaml
+
+    Returns:
+        HeuristicQueryRewriter: The shared rewriter, or None when disabled in config
+    """
+    global _query_rewriter, _query_rewriter_loaded
+    if not _query_rewriter_loaded:
+        with _query_rewriter_lock:
+            if not _query_rewriter_loaded:
+                settings = load_config_section("query_rewriter")
+                if settings.get("enabled", True):
+                    _query_rewriter = HeuristicQueryRewriter.from_config(settings)
+                _query_rewriter_loaded = True
+    return _query_rewriter
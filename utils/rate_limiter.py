@@ -0,0 +1,426 @@
+"""
+Client-side rate limiting for Groq models.
+
+Each model gets one limiter holding three token buckets: requests per minute,
+tokens per minute and tokens per day. A call reserves its request and an
+estimate of its tokens up front; reservations are granted in arrival order and
+may drive a bucket negative, in which case the caller sleeps until the bucket
+has refilled. Once the response arrives the estimate is replaced by the
+reported usage. Callers therefore queue fairly at the highest rate the limits
+allow instead of failing with HTTP 429.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from utils.config_loader import load_config_section
+from utils.llm_proxy import DelegatingChatModel
+from logger.logger import get_logger
+
+logger = get_logger("rate_limiter")
+
+# Rough characters per token for English prompts and JSON tool schemas
+CHARS_PER_TOKEN = 4
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a call would have to wait longer than the limiter's max_wait_seconds"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket whose level may go negative to hold reservations for queued callers"""
+
+    def __init__(self, capacity: float, period_seconds: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            capacity (float): Tokens available per period (also the burst size)
+            period_seconds (float): Period over which the full capacity refills
+            clock (Callable): Monotonic time source
+        """
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period_seconds
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds a reservation of `amount` would have to wait, without taking anything"""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens, going into debt if necessary
+
+        Args:
+            amount (float): Tokens to take; capped at the capacity so oversized calls still get through
+
+        Returns:
+            float: Seconds until the debt (if any) is repaid
+        """
+        self._refill()
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (negative amount) or take additional tokens after the fact"""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the server answered 429"""
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class ModelRateLimiter:
+    """Requests-per-minute, tokens-per-minute and tokens-per-day buckets of one model"""
+
+    def __init__(
+        self,
+        model_name: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        tokens_per_day: Optional[int] = None,
+        max_wait_seconds: float = 120.0,
+        expected_completion_tokens: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            model_name (str): Model the limits apply to
+            requests_per_minute (int): RPM limit, or None for unlimited
+            tokens_per_minute (int): TPM limit, or None for unlimited
+            tokens_per_day (int): TPD limit, or None for unlimited
+            max_wait_seconds (float): Longest a caller is queued before RateLimitExceeded is raised
+            expected_completion_tokens (int): Completion size assumed when estimating a call
+            clock (Callable): Monotonic time source
+        """
+        self.model_name = model_name
+        self.max_wait_seconds = max_wait_seconds
+        self.expected_completion_tokens = expected_completion_tokens
+        self.requests = TokenBucket(requests_per_minute, 60, clock) if requests_per_minute else None
+        self.tokens = [
+            bucket for bucket in (
+                TokenBucket(tokens_per_minute, 60, clock) if tokens_per_minute else None,
+                TokenBucket(tokens_per_day, 24 * 60 * 60, clock) if tokens_per_day else None,
+            ) if bucket is not None
+        ]
+
+        self.calls = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+
+        self._lock = threading.Lock()
+
+    def estimate_tokens(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> int:
+        """
+        Token estimate of a call before it is made
+
+        Args:
+            messages (list): Prompt messages
+            kwargs (dict): Call kwargs; bound tool schemas count towards the prompt and max_tokens
+                           replaces the expected completion size
+
+        Returns:
+            int: Estimated prompt plus completion tokens
+        """
+        chars = sum(len(str(message.content)) + 16 for message in messages)
+        if kwargs.get("tools"):
+            chars += len(json.dumps(kwargs["tools"], default=str))
+        completion = kwargs.get("max_tokens") or self.expected_completion_tokens
+        return chars // CHARS_PER_TOKEN + completion
+
+    def _buckets(self, tokens: int) -> list:
+        return ([(self.requests, 1)] if self.requests else []) + [(bucket, tokens) for bucket in self.tokens]
+
+    def peek(self, tokens: int) -> float:
+        """
+        Wait a call of `tokens` would face right now, without reserving anything
+
+        Args:
+            tokens (int): Estimated tokens of the call
+
+        Returns:
+            float: Seconds until the call could be sent
+        """
+        with self._lock:
+            return max([bucket.wait_for(amount) for bucket, amount in self._buckets(tokens)], default=0.0)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve one request and an estimated token count
+
+        Args:
+            tokens (int): Estimated tokens of the call
+
+        Returns:
+            float: Seconds the caller must wait before sending the request
+
+        Raises:
+            RateLimitExceeded: If the wait would exceed max_wait_seconds (nothing is reserved)
+        """
+        with self._lock:
+            buckets = self._buckets(tokens)
+            wait = max([bucket.reserve(amount) for bucket, amount in buckets], default=0.0)
+            if wait > self.max_wait_seconds:
+                for bucket, amount in buckets:
+                    bucket.adjust(-min(amount, bucket.capacity))
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    f"rate_limit: {self.model_name} needs a {wait:.0f}s wait (limit {self.max_wait_seconds:.0f}s)",
+                    retry_after=wait,
+                )
+            self.calls += 1
+            self.estimated_tokens += tokens
+            if wait > 0:
+                self.queued += 1
+                self.wait_seconds += wait
+        return wait
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """
+        Replace a call's estimate by its reported usage
+
+        Args:
+            estimated (int): Tokens reserved for the call
+            actual (int): Tokens the API reported, or None to keep the estimate
+        """
+        if actual is None:
+            return
+        with self._lock:
+            self.actual_tokens += actual
+            for bucket in self.tokens:
+                bucket.adjust(actual - estimated)
+
+    def throttle(self) -> None:
+        """Treat the minute buckets as exhausted after a 429 from the server"""
+        with self._lock:
+            self.throttled += 1
+            if self.requests:
+                self.requests.drain()
+            for bucket in self.tokens:
+                if bucket.capacity / bucket.rate <= 60:
+                    bucket.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 2),
+            "estimated_tokens": self.estimated_tokens,
+            "actual_tokens": self.actual_tokens,
+        }
+
+
+def _usage(result: Any) -> Optional[int]:
+    """Total tokens reported for a ChatResult or the final ChatGenerationChunk of a stream"""
+    generations = getattr(result, "generations", None)
+    message = generations[0].message if generations else getattr(result, "message", None)
+    usage = getattr(message, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    token_usage = (getattr(result, "llm_output", None) or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens")
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+# Groq names the exhausted limit in its 429 message; a daily cap does not reset within a retry
+_DAILY_CAP_RE = re.compile(r"per day|\((?:TPD|RPD)\)", re.IGNORECASE)
+
+
+class RateLimitedChatModel(DelegatingChatModel):
+    """Chat model whose calls are queued through a ModelRateLimiter"""
+
+    limiter: Any = None
+    max_retries: int = 2
+
+    @property
+    def _llm_type(self) -> str:
+        return "rate-limited-chat-model"
+
+    def _requeue(self, error: Exception, attempt: int) -> bool:
+        """Throttle the buckets after a 429 and tell whether the call should be queued again"""
+        if not _is_rate_limited(error):
+            return False
+        self.limiter.throttle()
+        if attempt == self.max_retries or _DAILY_CAP_RE.search(str(error)):
+            return False
+        logger.warning(f"{self.model_name} answered 429, re-queuing the call")
+        return True
+
+    def _call(self, messages: List[BaseMessage], kwargs: Dict[str, Any], send: Callable[[], ChatResult]) -> ChatResult:
+        estimate = self.limiter.estimate_tokens(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.limiter.reserve(estimate))
+            try:
+                result = send()
+            except Exception as e:
+                if not self._requeue(e, attempt):
+                    raise
+                continue
+            self.limiter.settle(estimate, _usage(result))
+            return result
+
+    async def _acall(self, messages: List[BaseMessage], kwargs: Dict[str, Any], send: Callable[[], Any]) -> ChatResult:
+        estimate = self.limiter.estimate_tokens(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.limiter.reserve(estimate))
+            try:
+                result = await send()
+            except Exception as e:
+                if not self._requeue(e, attempt):
+                    raise
+                continue
+            self.limiter.settle(estimate, _usage(result))
+            return result
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        inner = self._require_inner()
+        return self._call(messages, kwargs, lambda: inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        inner = self._require_inner()
+        return await self._acall(
+            messages, kwargs, lambda: inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        estimate = self.limiter.estimate_tokens(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.limiter.reserve(estimate))
+            actual, started = None, False
+            try:
+                for chunk in self._require_inner()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    actual = _usage(chunk) or actual
+                    started = True
+                    yield chunk
+            except Exception as e:
+                # Once chunks have been handed out the stream cannot be restarted
+                if started or not self._requeue(e, attempt):
+                    raise
+                continue
+            self.limiter.settle(estimate, actual)
+            return
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        estimate = self.limiter.estimate_tokens(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.limiter.reserve(estimate))
+            actual, started = None, False
+            try:
+                async for chunk in self._require_inner()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    actual = _usage(chunk) or actual
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started or not self._requeue(e, attempt):
+                    raise
+                continue
+            self.limiter.settle(estimate, actual)
+            return
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str) -> Optional[ModelRateLimiter]:
+    """
+    Return the process-wide limiter of a model, configured in the rate_limits section of config/config.yaml
+
+    Args:
+        model_name (str): Groq model name, e.g. "openai/gpt-oss-120b"
+
+    Returns:
+        ModelRateLimiter: The shared limiter, or None when rate limiting is disabled or the model has no limits
+    """
+    with _limiters_lock:
+        if model_name not in _limiters:
+            settings = load_config_section("rate_limits")
+            limits = (settings.get("models") or {}).get(model_name)
+            if not settings.get("enabled", True) or not limits:
+                return None
+            _limiters[model_name] = ModelRateLimiter(
+                model_name,
+                requests_per_minute=limits.get("requests_per_minute"),
+                tokens_per_minute=limits.get("tokens_per_minute"),
+                tokens_per_day=limits.get("tokens_per_day"),
+                max_wait_seconds=settings.get("max_wait_seconds", 120.0),
+                expected_completion_tokens=settings.get("expected_completion_tokens", 512),
+            )
+        return _limiters[model_name]
+
+
+def rate_limited_chat_model(model_name: str, llm: BaseChatModel, max_retries: int = 2) -> BaseChatModel:
+    """
+    Chat model, queued through the model's rate limiter when one is configured
+
+    Args:
+        model_name (str): Model name the limits are looked up by
+        llm (BaseChatModel): The real ChatGroq model
+        max_retries (int): Times a 429 is re-queued before it is raised (0 when a failover
+                           model above should move to a fallback at once)
+
+    Returns:
+        BaseChatModel: The model itself, or a RateLimitedChatModel
+    """
+    limiter = get_rate_limiter(model_name)
+    if limiter is None:
+        return llm
+    return RateLimitedChatModel(inner=llm, model_name=model_name, limiter=limiter, max_retries=max_retries)
+
+
+def rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters of every limiter created so far, by model name"""
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
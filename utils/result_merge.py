@@ -0,0 +1,87 @@
+"""
+Merge Tavily result sets from several query variants into one ranked list.
+"""
+
+from typing import Any, Dict, Iterable, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the click and never change the page
+_TRACKING_PARAMS = {"fbclid", "gclid", "ref", "ref_src", "source", "mc_cid", "mc_eid", "amp"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a result URL for deduplication
+
+    Args:
+        url (str): Result URL as returned by Tavily
+
+    Returns:
+        str: URL with lower-cased host, no 'www.', fragment, tracking parameters or trailing slash
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    path = parts.path.rstrip("/")
+    if path.endswith("/amp"):
+        path = path[:-4]
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def extract_results(results: Any) -> List[Dict[str, Any]]:
+    """Pull the list of result dicts out of a Tavily response"""
+    if isinstance(results, dict):
+        results = results.get("results", [])
+    if not isinstance(results, list):
+        return []
+    return [result for result in results if isinstance(result, dict)]
+
+
+def merge_search_results(result_sets: Iterable[Any], limit: int = 8, overlap_bonus: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Merge result sets, dropping duplicate URLs and ranking by score
+
+    A page returned by several query variants keeps its best Tavily score and
+    gets a small bonus for every extra variant that found it.
+
+    Args:
+        result_sets (Iterable): Tavily responses, one per query variant
+        limit (int): Maximum number of merged results
+        overlap_bonus (float): Score added per additional variant that returned the page
+
+    Returns:
+        list: Result dicts with 'rank_score' and 'matched_queries' fields, best first
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    order = 0
+    for results in result_sets:
+        for result in extract_results(results):
+            key = canonicalize_url(result.get("url", "")) or f"untitled:{order}"
+            score = float(result.get("score") or 0.0)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**result, "score": score, "matched_queries": 1, "_order": order}
+                order += 1
+                continue
+            existing["matched_queries"] += 1
+            if score > existing["score"]:
+                # Keep the better-scored copy but remember where it was first seen
+                merged[key] = {**result, "score": score, "matched_queries": existing["matched_queries"], "_order": existing["_order"]}
+
+    ranked = []
+    for result in merged.values():
+        result["rank_score"] = result["score"] + overlap_bonus * (result["matched_queries"] - 1)
+        ranked.append(result)
+    ranked.sort(key=lambda result: (-result["rank_score"], result["_order"]))
+    for result in ranked:
+        del result["_order"]
+    return ranked[:limit]
@@ -0,0 +1,499 @@
+"""
+Disk-backed cache for Tavily search results.
+
+Results are keyed on the normalized (already optimized) query plus the search
+type, and each search type has its own TTL: live GMP/subscription numbers
+expire in minutes while company background is kept for days. With a segment
+store, payloads live compressed in mmap-backed segment files and the SQLite
+row only keeps their reference.
+"""
+
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+from utils.cassette import cassette_cache_settings
+from utils.sqlite_utils import connect_sqlite, ensure_column
+from utils.segment_store import SegmentStore, segment_store_for
+from utils.single_flight import get_single_flight
+from utils.search_resilience import SearchUnavailableError
+from logger.logger import get_logger
+
+logger = get_logger("search_cache")
+
+# TTLs (seconds) used when config/config.yaml has no search_cache section
+DEFAULT_TTL_SECONDS = {
+    "gmp": 10 * 60,
+    "subscription": 5 * 60,
+    "listing": 30 * 60,
+    "upcoming": 2 * 60 * 60,
+    "performance": 6 * 60 * 60,
+    "ipo": 60 * 60,
+    "market": 30 * 60,
+    "financial": 30 * 60,
+    "general": 6 * 60 * 60,
+    "company": 2 * 24 * 60 * 60,
+    "rhp": 7 * 24 * 60 * 60,
+}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION_RE = re.compile(r"^[^\w₹]+|[^\w%]+$")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a search query for cache keying
+
+    Args:
+        query (str): Search query as sent to Tavily
+
+    Returns:
+        str: Lower-cased query with collapsed whitespace and no edge punctuation
+    """
+    query = _WHITESPACE_RE.sub(" ", str(query).lower()).strip()
+    return _EDGE_PUNCTUATION_RE.sub("", query)
+
+
+# Set by force_refresh(): lookups skip cached entries expiring within this many seconds (inf: all
+# of them) but still store fresh results
+_force_refresh: ContextVar[Optional[float]] = ContextVar("search_cache_force_refresh", default=None)
+
+
+@contextmanager
+def force_refresh(ahead_seconds: float = math.inf) -> Iterator[None]:
+    """
+    Within this block CachedSearchTool re-fetches queries whose cached entry expires within
+    ahead_seconds (by default every query) and overwrites the cache (used by the cache warmer)
+
+    Args:
+        ahead_seconds (float): Entries with more time left than this are still served from the cache
+    """
+    token = _force_refresh.set(ahead_seconds)
+    try:
+        yield
+    finally:
+        _force_refresh.reset(token)
+
+
+def refreshing() -> bool:
+    """True inside force_refresh()"""
+    return _force_refresh.get() is not None
+
+
+def is_cacheable_result(results: Any) -> bool:
+    """Only successful, non-empty Tavily responses are worth caching"""
+    if isinstance(results, dict):
+        return "error" not in results and bool(results.get("results"))
+    return bool(results)
+
+
+class SearchCache:
+    """SQLite cache of search payloads with per-search-type TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = ".cache/search_cache.sqlite3",
+        ttl_seconds: Optional[Dict[str, int]] = None,
+        default_ttl_seconds: int = 60 * 60,
+        max_entries: int = 5000,
+        max_stale_seconds: int = 24 * 60 * 60,
+        payload_store: Optional[SegmentStore] = None,
+    ):
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a private in-memory cache)
+            ttl_seconds (dict): TTL per search type, merged over DEFAULT_TTL_SECONDS
+            default_ttl_seconds (int): TTL for search types without an explicit entry
+            max_entries (int): Upper bound on stored entries before LRU eviction
+            max_stale_seconds (int): How long past expiry an entry may still be served while search is down
+            payload_store (SegmentStore): Compressed segment files for the payloads, or None to keep them inline
+        """
+        self.path = path
+        self.ttl_seconds = {**DEFAULT_TTL_SECONDS, **(ttl_seconds or {})}
+        self.default_ttl_seconds = default_ttl_seconds
+        self.max_entries = max_entries
+        self.max_stale_seconds = max_stale_seconds
+        self.payload_store = payload_store
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.type_stats: Dict[str, Dict[str, int]] = {}
+
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "SearchCache":
+        """Build a cache from the search_cache section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            path=settings.get("path", ".cache/search_cache.sqlite3"),
+            ttl_seconds=settings.get("ttl_seconds"),
+            default_ttl_seconds=settings.get("default_ttl_seconds", 60 * 60),
+            max_entries=settings.get("max_entries", 5000),
+            max_stale_seconds=settings.get("max_stale_seconds", 24 * 60 * 60),
+            payload_store=segment_store_for("search_cache", ".cache/segments/search_cache"),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (and again after close())"""
+        if self._conn is None:
+            conn = connect_sqlite(self.path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    search_type TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_expires ON search_cache(expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)")
+            ensure_column(conn, "search_cache", "payload_ref", "TEXT")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(query: str, search_type: str) -> str:
+        """Stable cache key for a normalized query and search type"""
+        raw = f"{search_type}\x1f{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, search_type: str) -> int:
+        """TTL in seconds for a search type"""
+        return int(self.ttl_seconds.get(search_type, self.default_ttl_seconds))
+
+    def _load(self, payload: str, payload_ref: Optional[str]) -> Optional[Any]:
+        """Decode a stored payload, reading it from the segment store when the row only holds a reference"""
+        if payload_ref:
+            if self.payload_store is None:
+                return None
+            data = self.payload_store.get(payload_ref)
+            return None if data is None else json.loads(data)
+        return json.loads(payload)
+
+    def _count(self, search_type: str, outcome: str) -> None:
+        stats = self.type_stats.setdefault(search_type, {"hits": 0, "misses": 0})
+        stats[outcome] += 1
+        if outcome == "hits":
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get(self, query: str, search_type: str = "general", min_remaining_seconds: float = 0.0) -> Optional[Any]:
+        """
+        Look up a cached payload
+
+        Args:
+            query (str): Search query
+            search_type (str): Search type the query was issued for
+            min_remaining_seconds (float): Treat entries expiring sooner than this as expired
+
+        Returns:
+            Any: Cached payload, or None on a miss or expired entry
+        """
+        key = self.make_key(query, search_type)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT payload, expires_at, payload_ref FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            payload = self._load(row[0], row[2]) if row is not None and row[1] > now + min_remaining_seconds else None
+            if payload is None:
+                self._count(search_type, "misses")
+                return None
+            conn.execute(
+                "UPDATE search_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            self._count(search_type, "hits")
+        return payload
+
+    def get_stale(self, query: str, search_type: str = "general") -> Optional[Tuple[Any, float]]:
+        """
+        Look up an entry even if it has expired, for use while search is unavailable
+
+        Args:
+            query (str): Search query
+            search_type (str): Search type the query was issued for
+
+        Returns:
+            tuple: (payload, age in seconds), or None if nothing within max_stale_seconds of expiry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT payload, created_at, payload_ref FROM search_cache WHERE key = ? AND expires_at > ?",
+                (self.make_key(query, search_type), now - self.max_stale_seconds),
+            ).fetchone()
+            payload = self._load(row[0], row[2]) if row is not None else None
+            if payload is None:
+                return None
+            self.stale_hits += 1
+        return payload, now - row[1]
+
+    def set(self, query: str, search_type: str, payload: Any) -> bool:
+        """
+        Store a payload for a query and search type
+
+        Args:
+            query (str): Search query
+            search_type (str): Search type used to pick the TTL
+            payload (Any): JSON-serializable search payload
+
+        Returns:
+            bool: True if stored, False if the payload is not serializable
+        """
+        try:
+            serialized = json.dumps(payload, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return False
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            payload_ref = None
+            if self.payload_store is not None:
+                payload_ref = self.payload_store.put(serialized.encode("utf-8"))
+                serialized = ""
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO search_cache
+                    (key, search_type, query, payload, created_at, expires_at, last_access, hits, payload_ref)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)
+                """,
+                (
+                    self.make_key(query, search_type),
+                    search_type,
+                    normalize_query(query),
+                    serialized,
+                    now,
+                    now + self.ttl_for(search_type),
+                    now,
+                    payload_ref,
+                ),
+            )
+            self._evict(conn, now)
+            conn.commit()
+        return True
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones above max_entries"""
+        count = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+        count = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                """
+                DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+
+    def payloads(self) -> Iterator[Tuple[str, Any, float]]:
+        """
+        Iterate over every stored entry, e.g. to backfill the document index
+
+        Returns:
+            Iterator: (search type, payload, created_at) tuples
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT search_type, payload, payload_ref, created_at FROM search_cache"
+            ).fetchall()
+        for search_type, payload, payload_ref, created_at in rows:
+            payload = self._load(payload, payload_ref)
+            if payload is not None:
+                yield search_type, payload, created_at
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Drop entries too old to be served even as stale, then rewrite the segment files
+        so they only hold the payloads of the remaining entries
+
+        Returns:
+            dict: Number of entries removed and payloads kept in the segment store
+        """
+        with self._lock:
+            conn = self._connection()
+            removed = conn.execute(
+                "DELETE FROM search_cache WHERE expires_at <= ?", (time.time() - self.max_stale_seconds,)
+            ).rowcount
+            kept = 0
+            if self.payload_store is not None:
+                refs = [row[0] for row in conn.execute("SELECT payload_ref FROM search_cache WHERE payload_ref IS NOT NULL")]
+                moved = self.payload_store.compact(refs)
+                conn.executemany("UPDATE search_cache SET payload_ref = ? WHERE payload_ref = ?",
+                                 [(new, old) for old, new in moved.items()])
+                conn.executemany("DELETE FROM search_cache WHERE payload_ref = ?",
+                                 [(ref,) for ref in set(refs) - set(moved)])
+                kept = len(moved)
+            conn.commit()
+        return {"removed": removed, "kept_payloads": kept}
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM search_cache")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the current entry count"""
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "entries": entries,
+                "payload_store": self.payload_store.stats() if self.payload_store is not None else None,
+                "by_type": {name: dict(counts) for name, counts in self.type_stats.items()},
+            }
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self.payload_store is not None:
+                self.payload_store.close()
+
+
+class CachedSearchTool:
+    """
+    Wraps a TavilySearch client with a SearchCache lookup in front of invoke().
+    Concurrent misses for the same query share one in-flight Tavily request, and
+    expired entries are served (marked stale) when the search upstream is unavailable.
+    Fresh results are also added to the offline document index when one is given.
+    """
+
+    def __init__(self, search_tool, cache: Optional[SearchCache], document_index=None):
+        """
+        Args:
+            search_tool: TavilySearch (or compatible) client
+            cache (SearchCache): Cache to consult, or None to disable caching
+            document_index (DocumentIndex): Full-text index fed with every fetched result, or None
+        """
+        self.search_tool = search_tool
+        self.cache = cache
+        self.document_index = document_index
+        self.flights = get_single_flight("search")
+
+    def _cached(self, query: str, search_type: str) -> Optional[Any]:
+        ahead = _force_refresh.get()
+        if self.cache is None or ahead == math.inf:
+            return None
+        cached = self.cache.get(query, search_type, ahead or 0.0)
+        if cached is not None:
+            logger.debug(f"Search cache hit [{search_type}]: {query}")
+        return cached
+
+    def _store(self, query: str, search_type: str, results: Any) -> None:
+        if not is_cacheable_result(results):
+            return
+        if self.cache is not None:
+            self.cache.set(query, search_type, results)
+        if self.document_index is not None:
+            try:
+                self.document_index.add_documents(results, search_type)
+            except Exception as e:
+                logger.warning(f"Could not index search results: {e}")
+
+    def _stale(self, query: str, search_type: str, error: SearchUnavailableError) -> Any:
+        """Fallback used when the resilience layer gives up: a stale entry or the original error"""
+        stale = self.cache.get_stale(query, search_type) if self.cache is not None else None
+        if stale is None:
+            raise error
+        payload, age = stale
+        logger.warning(f"Serving stale results ({age:.0f}s old) [{search_type}]: {query}")
+        if isinstance(payload, dict):
+            return {**payload, "stale": True, "stale_age_seconds": round(age)}
+        return payload
+
+    def invoke(self, query: str, search_type: str = "general") -> Any:
+        """
+        Return cached results for the query, searching Tavily on a miss
+
+        Args:
+            query (str): Optimized search query
+            search_type (str): Search type used for keying and TTL selection
+
+        Returns:
+            Any: Tavily search results
+        """
+        cached = self._cached(query, search_type)
+        if cached is not None:
+            return cached
+
+        def fetch():
+            try:
+                results = self.search_tool.invoke(query)
+            except SearchUnavailableError as e:
+                return self._stale(query, search_type, e)
+            self._store(query, search_type, results)
+            return results
+
+        return self.flights.do(SearchCache.make_key(query, search_type), fetch)
+
+    async def ainvoke(self, query: str, search_type: str = "general") -> Any:
+        """Async counterpart of invoke() using the Tavily async client"""
+        cached = self._cached(query, search_type)
+        if cached is not None:
+            return cached
+
+        async def fetch():
+            try:
+                results = await self.search_tool.ainvoke(query)
+            except SearchUnavailableError as e:
+                return self._stale(query, search_type, e)
+            self._store(query, search_type, results)
+            return results
+
+        return await self.flights.ado(SearchCache.make_key(query, search_type), fetch)
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_loaded = False
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Return the process-wide search cache configured in config/config.yaml
+
+    Returns:
+        SearchCache: The shared cache, or None when disabled in config
+    """
+    global _search_cache, _search_cache_loaded
+    if not _search_cache_loaded:
+        with _search_cache_lock:
+            if not _search_cache_loaded:
+                settings = cassette_cache_settings("search_cache")
+                if settings.get("enabled", True):
+                    _search_cache = SearchCache.from_config(settings)
+                _search_cache_loaded = True
+    return _search_cache
@@ -0,0 +1,417 @@
+"""
+Resilience layer for Tavily calls: deadlines, hedged requests, jittered
+retries and a circuit breaker.
+
+ResilientSearchClient sits between CachedSearchTool and the TavilySearch
+client. A call that is slower than the recent p95 latency gets one duplicate
+("hedge") request and the first answer wins; failed attempts are retried with
+jittered exponential backoff inside an overall deadline. Repeated failures
+open the circuit breaker, after which calls fail fast with
+SearchUnavailableError and CachedSearchTool falls back to stale cache entries.
+While a cassette is replayed no hedges are sent, and a query missing from the
+cassette is raised at once instead of being retried.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+from langchain_core.tools import ToolException
+from utils.config_loader import load_config_section
+from utils.cassette import CassetteMissError, cassette_replaying
+from logger.logger import get_logger
+
+logger = get_logger("search_resilience")
+
+
+class SearchUnavailableError(RuntimeError):
+    """The search upstream failed, timed out or is behind an open circuit breaker"""
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe after a cool-down"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker
+            reset_timeout (float): Seconds the breaker stays open before letting a probe through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (half-open lets a single probe through)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Free a half-open probe slot without judging the upstream (the call never reached it)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                    logger.warning(f"Search circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class LatencyTracker:
+    """Rolling window of call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0-100) of the window, or None when it is empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+def _is_failure(result: Any) -> bool:
+    """TavilySearch returns {'error': exc} instead of raising on API errors"""
+    return isinstance(result, dict) and "error" in result
+
+
+class ResilientSearchClient:
+    """TavilySearch wrapper adding deadlines, hedging, retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        search_tool: Any,
+        deadline_seconds: float = 15.0,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+        hedge_percentile: float = 95.0,
+        initial_hedge_delay: float = 3.0,
+        min_hedge_delay: float = 0.5,
+        min_samples: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_workers: int = 8,
+        hedge: bool = True,
+    ):
+        """
+        Args:
+            search_tool: TavilySearch (or compatible) client
+            deadline_seconds (float): Overall budget for one call, including retries
+            max_retries (int): Extra attempts after a failed one
+            backoff_seconds (float): Base of the jittered exponential backoff
+            hedge_percentile (float): Latency percentile after which a hedge request is sent
+            initial_hedge_delay (float): Hedge delay used until min_samples latencies are known
+            min_hedge_delay (float): Lower bound on the hedge delay
+            min_samples (int): Latencies needed before the percentile is trusted
+            failure_threshold (int): Consecutive failed calls that open the breaker
+            reset_timeout (float): Seconds before an open breaker lets a probe through
+            max_workers (int): Threads available to synchronous attempts and hedges
+            hedge (bool): Send hedge requests; off while replaying a cassette, where a hedge
+                          would only replay the same recording twice
+        """
+        self.search_tool = search_tool
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tavily")
+
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "retries": 0, "timeouts": 0, "failures": 0}
+
+    @classmethod
+    def from_config(cls, search_tool: Any, settings: Optional[dict] = None) -> "ResilientSearchClient":
+        """Build a client from the search_resilience section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            search_tool,
+            deadline_seconds=settings.get("deadline_seconds", 15.0),
+            max_retries=settings.get("max_retries", 2),
+            backoff_seconds=settings.get("backoff_seconds", 0.5),
+            hedge_percentile=settings.get("hedge_percentile", 95.0),
+            initial_hedge_delay=settings.get("initial_hedge_delay", 3.0),
+            min_hedge_delay=settings.get("min_hedge_delay", 0.5),
+            min_samples=settings.get("min_samples", 20),
+            failure_threshold=settings.get("failure_threshold", 5),
+            reset_timeout=settings.get("reset_timeout", 30.0),
+            max_workers=settings.get("max_workers", 8),
+            hedge=settings.get("hedge", True),
+        )
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first attempt before sending a hedge"""
+        if len(self.latency) < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, self.latency.percentile(self.hedge_percentile))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, self.backoff_seconds * (2 ** attempt))
+
+    def _first_wait(self, deadline: float) -> float:
+        """Seconds to wait for the primary request before hedging (or giving up)"""
+        remaining = max(0.0, deadline - time.monotonic())
+        return min(self.hedge_delay(), remaining) if self.hedge else remaining
+
+    @staticmethod
+    def _track(request: Any, started: Dict[Any, float], finished: Dict[Any, float]) -> Any:
+        started[request] = time.perf_counter()
+        request.add_done_callback(lambda done: finished.setdefault(done, time.perf_counter()))
+        return request
+
+    def _record_latencies(self, started: Dict[Any, float], finished: Dict[Any, float]) -> None:
+        # Requests still in flight count up to now, so a timeout is recorded at the deadline
+        # and an abandoned request still weighs on the percentile instead of dropping out
+        now = time.perf_counter()
+        for request, began in started.items():
+            self.latency.add(finished.get(request, now) - began)
+
+    def _attempt(self, query: Any, deadline: float) -> Any:
+        """One attempt with at most one hedge; returns the first good result"""
+        started: Dict[Any, float] = {}
+        finished: Dict[Any, float] = {}
+        try:
+            primary = self._track(self.executor.submit(self.search_tool.invoke, query), started, finished)
+            done, pending = wait({primary}, timeout=self._first_wait(deadline))
+            if self.hedge and not done and time.monotonic() < deadline:
+                self._count("hedges")
+                pending.add(self._track(self.executor.submit(self.search_tool.invoke, query), started, finished))
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            while True:
+                if not done:
+                    self._count("timeouts")
+                    raise TimeoutError(f"Search exceeded its {self.deadline_seconds}s deadline")
+                winner = done.pop()
+                failed = winner.exception() is not None or _is_failure(winner.result())
+                if not failed or (not done and not pending):
+                    break
+                # The first finisher failed; the other request may still succeed
+                if not done:
+                    done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        finally:
+            self._record_latencies(started, finished)
+        if winner is not primary:
+            self._count("hedge_wins")
+        return winner.result()
+
+    def invoke(self, query: Any) -> Any:
+        """
+        Search with deadline, hedging and retries
+
+        Args:
+            query: Query passed through to TavilySearch.invoke
+
+        Returns:
+            Any: Tavily search results
+
+        Raises:
+            SearchUnavailableError: If the breaker is open or every attempt failed
+            ToolException: If Tavily found no results (not an upstream failure)
+            CassetteMissError: If the query is missing from the cassette being replayed
+        """
+        self._count("calls")
+        if not self.breaker.allow():
+            raise SearchUnavailableError("Search circuit breaker is open")
+        deadline = time.monotonic() + self.deadline_seconds
+        last_error: Any = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(min(self._backoff(attempt - 1), max(0.0, deadline - time.monotonic())))
+                if time.monotonic() >= deadline:
+                    break
+            try:
+                result = self._attempt(query, deadline)
+            except ToolException:
+                self.breaker.record_success()
+                raise
+            except CassetteMissError:
+                # Nothing was recorded for this query: retrying cannot help and Tavily is not at fault
+                self.breaker.release()
+                raise
+            except Exception as e:
+                last_error = e
+                continue
+            if _is_failure(result):
+                last_error = result["error"]
+                continue
+            self.breaker.record_success()
+            return result
+        return self._give_up(last_error)
+
+    async def _aattempt(self, query: Any, deadline: float) -> Any:
+        started: Dict[Any, float] = {}
+        finished: Dict[Any, float] = {}
+        primary = self._track(asyncio.create_task(self.search_tool.ainvoke(query)), started, finished)
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self._first_wait(deadline))
+            if self.hedge and not done and time.monotonic() < deadline:
+                self._count("hedges")
+                pending.add(self._track(asyncio.create_task(self.search_tool.ainvoke(query)), started, finished))
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+            while True:
+                if not done:
+                    self._count("timeouts")
+                    raise TimeoutError(f"Search exceeded its {self.deadline_seconds}s deadline")
+                winner = done.pop()
+                failed = winner.exception() is not None or _is_failure(winner.result())
+                if not failed or (not done and not pending):
+                    break
+                if not done:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                    )
+            if winner is not primary:
+                self._count("hedge_wins")
+            return winner.result()
+        finally:
+            self._record_latencies(started, finished)
+            # Losing hedges are cancelled
+            for task in pending:
+                task.cancel()
+
+    async def ainvoke(self, query: Any) -> Any:
+        """Async counterpart of invoke(); losing hedges are cancelled"""
+        self._count("calls")
+        if not self.breaker.allow():
+            raise SearchUnavailableError("Search circuit breaker is open")
+        deadline = time.monotonic() + self.deadline_seconds
+        last_error: Any = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                await asyncio.sleep(min(self._backoff(attempt - 1), max(0.0, deadline - time.monotonic())))
+                if time.monotonic() >= deadline:
+                    break
+            try:
+                result = await self._aattempt(query, deadline)
+            except ToolException:
+                self.breaker.record_success()
+                raise
+            except CassetteMissError:
+                # Nothing was recorded for this query: retrying cannot help and Tavily is not at fault
+                self.breaker.release()
+                raise
+            except Exception as e:
+                last_error = e
+                continue
+            if _is_failure(result):
+                last_error = result["error"]
+                continue
+            self.breaker.record_success()
+            return result
+        return self._give_up(last_error)
+
+    def _give_up(self, last_error: Any) -> Any:
+        self._count("failures")
+        self.breaker.record_failure()
+        raise SearchUnavailableError(f"Search failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state, hedge/retry counters and latency percentiles"""
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "breaker": self.breaker.stats(),
+            "p50_seconds": self.latency.percentile(50),
+            "p95_seconds": self.latency.percentile(95),
+            "hedge_delay_seconds": self.hedge_delay(),
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def resilient_search_client(search_tool: Any) -> Any:
+    """
+    Wrap a Tavily client with the resilience layer configured in config/config.yaml
+
+    Args:
+        search_tool: TavilySearch (or compatible) client
+
+    Returns:
+        ResilientSearchClient, or the client unchanged when disabled in config
+    """
+    settings = dict(load_config_section("search_resilience"))
+    if not settings.get("enabled", True):
+        return search_tool
+    if cassette_replaying():
+        settings["hedge"] = False
+    return ResilientSearchClient.from_config(search_tool, settings)
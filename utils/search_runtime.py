@@ -0,0 +1,483 @@
+"""
+Process-wide search runtime shared by the web search tools.
+
+The @tool functions in tools/web_search_tool.py resolve this runtime once and
+reuse its Tavily clients and query generator instead of rebuilding them on
+every tool call.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+from dotenv import load_dotenv
+from langchain_tavily import TavilySearch
+from utils.ipo_info_search import TavilyIPOInfoSearch
+from utils.model_loader import ModelLoader, get_llm_registry
+from utils.llm_cache import get_llm_cache
+from utils.rate_limiter import rate_limit_stats
+from utils.model_failover import model_health_stats
+from utils.search_cache import CachedSearchTool, get_search_cache
+from utils.query_memo import QueryMemo, get_query_memo
+from utils.single_flight import get_single_flight
+from utils.query_rewriter import get_query_rewriter
+from utils.query_log import get_query_log
+from utils.doc_index import get_doc_index
+from utils.near_duplicates import collapse_near_duplicates
+from utils.config_loader import load_config_section
+from utils.cassette import cassette_replaying, cassette_search_client, get_cassette
+from utils.search_resilience import ResilientSearchClient, resilient_search_client
+from logger.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("search_runtime")
+
+# Extra angles searched by the smart search fan-out, as (query suffix, search type)
+FAN_OUT_ANGLES = {
+    "ipo": [
+        ("grey market premium GMP today", "gmp"),
+        ("subscription status QIB NII retail", "subscription"),
+        ("price band lot size issue dates", "listing"),
+    ],
+    "market": [
+        ("share price today", "market"),
+        ("analyst outlook target", "market"),
+        ("latest news", "market"),
+    ],
+    "financial": [
+        ("financial results revenue profit", "financial"),
+        ("valuation P/E peers", "financial"),
+        ("latest news", "financial"),
+    ],
+    "general": [
+        ("latest news", "general"),
+        ("analysis", "general"),
+    ],
+}
+
+
+class SearchRuntime:
+    """Long-lived Tavily clients and query generator reused across tool calls"""
+
+    def __init__(self, api_key: str = None):
+        """
+        Build the shared search clients
+
+        Args:
+            api_key (str): Tavily API key. If None, will try to get from environment.
+        """
+        self.api_key = api_key or os.getenv("TAVILY_API_KEY")
+        if not self.api_key and not cassette_replaying():
+            raise ValueError("TAVILY_API_KEY not found in environment variables")
+
+        # General Tavily search client behind the result cache, also shared with the IPO search helper
+        self.search_cache = get_search_cache()
+        # Offline BM25 index over every fetched result, answering repeat questions without a live search
+        self.doc_index = get_doc_index()
+        doc_index_settings = load_config_section("doc_index")
+        self.local_max_results = int(doc_index_settings.get("max_results", 5))
+        self.local_min_score = float(doc_index_settings.get("min_score", 4.0))
+        self.local_min_coverage = float(doc_index_settings.get("min_coverage", 0.6))
+        self.local_min_documents = int(doc_index_settings.get("min_documents", 2))
+        # Deadlines, hedging, retries and the circuit breaker sit between the cache and Tavily
+        tavily = cassette_search_client(lambda: TavilySearch(api_key=self.api_key))
+        self.search_tool = CachedSearchTool(resilient_search_client(tavily), self.search_cache, self.doc_index)
+        self.ipo_search = TavilyIPOInfoSearch(self.api_key, search_tool=self.search_tool)
+
+        # Rule-based fast path and memo of previous LLM rewrites, shared with the IPO search helper
+        self.query_rewriter = get_query_rewriter()
+        self.query_memo = get_query_memo()
+        self.rewrite_flights = get_single_flight("rewrite")
+
+        # Recent user queries, read by the cache warmer to prefetch the hottest ones
+        self.query_log = get_query_log()
+
+        # LLM for query generation (using lighter model for cost efficiency)
+        try:
+            self.query_generator = ModelLoader(model_provider="groq_oss_20b").load_llm()
+        except Exception as e:
+            logger.warning(f"Query generator unavailable, using raw queries: {e}")
+            self.query_generator = None
+
+        # Syndicated copies of one article are collapsed before results reach the prompt
+        near_duplicates = load_config_section("near_duplicates")
+        self.near_duplicate_distance = (
+            int(near_duplicates.get("max_distance", 14)) if near_duplicates.get("enabled", True) else None
+        )
+        self.near_duplicate_shingle_size = int(near_duplicates.get("shingle_size", 2))
+        self.near_duplicates_dropped = 0
+
+        # Smart search fan-out settings and the pool that runs sync variants concurrently
+        smart_search = load_config_section("smart_search")
+        self.fan_out = int(smart_search.get("fan_out", 4))
+        self.fan_out_max_results = int(smart_search.get("max_results", 8))
+        self.executor = ThreadPoolExecutor(max_workers=int(smart_search.get("max_workers", 8)), thread_name_prefix="search")
+
+        self._closers: List[Callable[[], None]] = []
+        self.closed = False
+        if self.search_cache is not None:
+            self.add_closer(self.search_cache.close)
+        if self.query_memo is not None:
+            self.add_closer(self.query_memo.close)
+        if self.query_log is not None:
+            self.add_closer(self.query_log.close)
+        if self.doc_index is not None:
+            self.add_closer(self.doc_index.close)
+        if self.ipo_search.ipo_store is not None:
+            self.add_closer(self.ipo_search.ipo_store.close)
+        if isinstance(self.search_tool.search_tool, ResilientSearchClient):
+            self.add_closer(self.search_tool.search_tool.close)
+        cassette = get_cassette()
+        if cassette is not None:
+            self.add_closer(cassette.flush)
+
+    def _build_search_prompt(self, user_query: str, search_type: str) -> str:
+        """Prompt asking the query generator to rewrite a user query"""
+        if search_type == "ipo":
+            return f"""
+            Transform the following user query into an optimized search query for IPO information.
+            Focus on IPO-specific terms, dates, prices, grey market premium (GMP), listing details.
+
+            User Query: {user_query}
+
+            Generate a concise, search-optimized query (max 20 words) that includes relevant IPO keywords:
+            """
+        elif search_type == "market":
+            return f"""
+            Transform the following user query into an optimized search query for stock market information.
+            Focus on market trends, stock prices, financial data, company analysis.
+
+            User Query: {user_query}
+
+            Generate a concise, search-optimized query (max 20 words) that includes relevant market keywords:
+            """
+        else:  # general
+            return f"""
+            Transform the following user query into an optimized search query for web search.
+            Make it more specific and search-friendly while preserving the user's intent.
+
+            User Query: {user_query}
+
+            Generate a concise, search-optimized query (max 20 words):
+            """
+
+    def _fast_search_query(self, user_query: str, search_type: str) -> Optional[str]:
+        """Rule-based rewrite, or None when the LLM should handle the query"""
+        if self.query_rewriter is None:
+            return None
+        return self.query_rewriter.try_rewrite(user_query, search_type)
+
+    def _finish_search_query(self, user_query: str, search_type: str, response) -> str:
+        """Clean the generator response and memoize it"""
+        optimized_query = response.content.strip() if hasattr(response, 'content') else str(response).strip()
+
+        # Clean up the response (remove quotes, extra text)
+        optimized_query = optimized_query.replace('"', '').replace("'", "")
+        if len(optimized_query) > 100:  # Fallback if response is too long
+            return user_query
+
+        if self.query_memo is not None:
+            self.query_memo.set("web", user_query, search_type, optimized_query)
+        return optimized_query
+
+    def generate_search_query(self, user_query: str, search_type: str = "general") -> str:
+        """
+        Use LLM to generate optimized search queries based on user input
+
+        Args:
+            user_query (str): The original user query
+            search_type (str): Type of search - 'general', 'ipo', 'market'
+
+        Returns:
+            str: Optimized search query
+        """
+        fast_query = self._fast_search_query(user_query, search_type)
+        if fast_query is not None:
+            return fast_query
+
+        if not self.query_generator:
+            return user_query  # Fallback to original query
+
+        if self.query_memo is not None:
+            memoized = self.query_memo.get("web", user_query, search_type)
+            if memoized is not None:
+                return memoized
+
+        def rewrite() -> str:
+            try:
+                prompt = self._build_search_prompt(user_query, search_type)
+                response = self.query_generator.invoke(prompt)
+                return self._finish_search_query(user_query, search_type, response)
+
+            except Exception as e:
+                print(f"Query generation error: {e}")
+                return user_query  # Fallback to original query
+
+        # Identical concurrent rewrites share one LLM call
+        return self.rewrite_flights.do(QueryMemo.make_key("web", user_query, search_type), rewrite)
+
+    async def agenerate_search_query(self, user_query: str, search_type: str = "general") -> str:
+        """Async counterpart of generate_search_query using ChatGroq.ainvoke"""
+        fast_query = self._fast_search_query(user_query, search_type)
+        if fast_query is not None:
+            return fast_query
+
+        if not self.query_generator:
+            return user_query
+
+        if self.query_memo is not None:
+            memoized = self.query_memo.get("web", user_query, search_type)
+            if memoized is not None:
+                return memoized
+
+        async def rewrite() -> str:
+            try:
+                prompt = self._build_search_prompt(user_query, search_type)
+                response = await self.query_generator.ainvoke(prompt)
+                return self._finish_search_query(user_query, search_type, response)
+
+            except Exception as e:
+                print(f"Query generation error: {e}")
+                return user_query
+
+        return await self.rewrite_flights.ado(QueryMemo.make_key("web", user_query, search_type), rewrite)
+
+    def query_variants(self, optimized_query: str, search_context: str = "general", fan_out: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Build the query variants searched by the smart search fan-out
+
+        Args:
+            optimized_query (str): Query produced by the query generator
+            search_context (str): Search context ('ipo', 'market', 'general', 'financial')
+            fan_out (int): Number of variants including the base query; defaults to config
+
+        Returns:
+            list: (query, search type) pairs, base query first
+        """
+        fan_out = self.fan_out if fan_out is None else fan_out
+        angles = FAN_OUT_ANGLES.get(search_context, FAN_OUT_ANGLES["general"])
+        variants = [(optimized_query, search_context)]
+        for suffix, search_type in angles[:max(fan_out - 1, 0)]:
+            variants.append((f"{optimized_query} {suffix}", search_type))
+        return variants
+
+    def fan_out_search(self, variants: List[Tuple[str, str]]) -> List[Any]:
+        """
+        Run query variants concurrently on the runtime's thread pool
+
+        Args:
+            variants (list): (query, search type) pairs
+
+        Returns:
+            list: One Tavily response per variant, in variant order (failed variants are skipped)
+        """
+        futures = [self.executor.submit(self.search_tool.invoke, query, search_type) for query, search_type in variants]
+        responses = []
+        for (query, _), future in zip(variants, futures):
+            try:
+                responses.append(future.result())
+            except Exception as e:
+                logger.warning(f"Fan-out variant failed '{query}': {e}")
+        return responses
+
+    async def afan_out_search(self, variants: List[Tuple[str, str]]) -> List[Any]:
+        """Async counterpart of fan_out_search using asyncio.gather"""
+        outcomes = await asyncio.gather(
+            *(self.search_tool.ainvoke(query, search_type=search_type) for query, search_type in variants),
+            return_exceptions=True,
+        )
+        responses = []
+        for (query, _), outcome in zip(variants, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Fan-out variant failed '{query}': {outcome}")
+            else:
+                responses.append(outcome)
+        return responses
+
+    def collapse_duplicates(self, results: Any) -> Any:
+        """
+        Collapse near-duplicate articles in a search response
+
+        Args:
+            results (Any): Tavily response, possibly carrying extracted IPO 'records'
+
+        Returns:
+            Any: The response with only the best copy of each article (and its records)
+        """
+        if self.near_duplicate_distance is None or not isinstance(results, dict):
+            return results
+        documents = results.get("results")
+        if not isinstance(documents, list) or len(documents) < 2:
+            return results
+        kept = collapse_near_duplicates(
+            [document for document in documents if isinstance(document, dict)],
+            max_distance=self.near_duplicate_distance,
+            shingle_size=self.near_duplicate_shingle_size,
+        )
+        if len(kept) == len(documents):
+            return results
+        self.near_duplicates_dropped += len(documents) - len(kept)
+        collapsed = {**results, "results": kept}
+        if results.get("records"):
+            kept_urls = {document.get("url") for document in kept}
+            collapsed["records"] = [
+                record for record in results["records"]
+                if not record.get("source_url") or record.get("source_url") in kept_urls
+            ]
+        return collapsed
+
+    def local_search(self, query: str, max_results: Optional[int] = None) -> Optional[List[dict]]:
+        """
+        Answer a query from the offline document index
+
+        Args:
+            query (str): User query
+            max_results (int): Maximum number of documents; defaults to config
+
+        Returns:
+            list: Ranked documents, or None when local recall is too poor to skip a live search
+        """
+        if self.doc_index is None:
+            return None
+        try:
+            documents = self.doc_index.search(query, k=max_results or self.local_max_results)
+        except Exception as e:
+            logger.warning(f"Local document search failed: {e}")
+            return None
+        relevant = [
+            document for document in documents
+            if document["score"] >= self.local_min_score and document["coverage"] >= self.local_min_coverage
+        ]
+        if len(relevant) < min(self.local_min_documents, max_results or self.local_max_results):
+            return None
+        return relevant
+
+    def log_query(self, query: str, search_type: str) -> None:
+        """Record a user query in the query log; logging never fails the search"""
+        if self.query_log is None:
+            return
+        try:
+            self.query_log.record_query(query, search_type)
+        except Exception as e:
+            logger.warning(f"Could not log query: {e}")
+
+    def log_company(self, company: str, search_type: str) -> None:
+        """Record a per-company tool lookup in the query log; logging never fails the lookup"""
+        if self.query_log is None:
+            return
+        try:
+            self.query_log.record_company(company, search_type)
+        except Exception as e:
+            logger.warning(f"Could not log company lookup: {e}")
+
+    def compact_storage(self) -> dict:
+        """
+        Drop expired search cache entries and old indexed documents and rewrite their
+        compressed segment files
+
+        Returns:
+            dict: Compaction counts per store
+        """
+        compacted = {
+            "search_cache": self.search_cache.compact() if self.search_cache is not None else None,
+            "doc_index": self.doc_index.compact() if self.doc_index is not None else None,
+        }
+        logger.info(f"Storage compacted: {compacted}")
+        return compacted
+
+    def add_closer(self, closer: Callable[[], None]) -> None:
+        """Register a callback that releases a resource when the runtime closes"""
+        self._closers.append(closer)
+
+    def stats(self) -> dict:
+        """Cache and memo counters for monitoring"""
+        return {
+            "search_cache": self.search_cache.stats() if self.search_cache is not None else None,
+            "query_memo": self.query_memo.stats() if self.query_memo is not None else None,
+            "query_rewriter": self.query_rewriter.stats() if self.query_rewriter is not None else None,
+            "search_flights": get_single_flight("search").stats(),
+            "rewrite_flights": self.rewrite_flights.stats(),
+            "near_duplicates_dropped": self.near_duplicates_dropped,
+            "doc_index": self.doc_index.stats() if self.doc_index is not None else None,
+            "ipo_store": self.ipo_search.ipo_store.stats() if self.ipo_search.ipo_store is not None else None,
+            "gmp_history": self.ipo_search.gmp_history.stats() if self.ipo_search.gmp_history is not None else None,
+            "subscription_history": self.ipo_search.subscription_history.stats()
+            if self.ipo_search.subscription_history is not None else None,
+            "search_resilience": self.search_tool.search_tool.stats()
+            if isinstance(self.search_tool.search_tool, ResilientSearchClient) else None,
+            "cassette": get_cassette().stats() if get_cassette() is not None else None,
+            "llm_registry": get_llm_registry().stats(),
+            "llm_cache": get_llm_cache().stats() if get_llm_cache() is not None else None,
+            "rate_limits": rate_limit_stats(),
+            "model_health": model_health_stats(),
+        }
+
+    def warm_up(self) -> "SearchRuntime":
+        """
+        Prepare the runtime ahead of the first tool call (e.g. at application
+        startup) so tool invocations only pay for the HTTP request.
+
+        Returns:
+            SearchRuntime: self, for chaining
+        """
+        if self.search_cache is not None:
+            self.search_cache.stats()  # opens the cache database
+            # Results fetched before the document index existed are indexed once
+            if self.doc_index is not None and not self.doc_index.stats()["documents"]:
+                indexed = self.doc_index.backfill(self.search_cache.payloads())
+                logger.info(f"Indexed {indexed} cached search documents")
+        logger.info(f"Search runtime warmed up (query generator: {'on' if self.query_generator else 'off'})")
+        return self
+
+    def close(self) -> None:
+        """Release the HTTP clients and any registered resources"""
+        if self.closed:
+            return
+        self.closed = True
+        for closer in reversed(self._closers):
+            try:
+                closer()
+            except Exception as e:
+                logger.warning(f"Error while closing search runtime resource: {e}")
+        self._closers.clear()
+        # Query generators are shared clients owned by the LLM registry and stay open
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Search runtime closed")
+
+
+_runtime: Optional[SearchRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_search_runtime() -> SearchRuntime:
+    """
+    Return the process-wide search runtime, creating it on first use.
+
+    Returns:
+        SearchRuntime: The shared runtime
+    """
+    global _runtime
+    runtime = _runtime
+    if runtime is None or runtime.closed:
+        with _runtime_lock:
+            if _runtime is None or _runtime.closed:
+                logger.info("Creating shared search runtime")
+                _runtime = SearchRuntime()
+            runtime = _runtime
+    return runtime
+
+
+def warm_up_search_runtime() -> SearchRuntime:
+    """Create the shared runtime eagerly, e.g. at application startup"""
+    return get_search_runtime().warm_up()
+
+
+def close_search_runtime() -> None:
+    """Close the shared runtime; the next get_search_runtime() builds a new one"""
+    global _runtime
+    with _runtime_lock:
+        runtime, _runtime = _runtime, None
+    if runtime is not None:
+        runtime.close()
@@ -0,0 +1,252 @@
+"""
+Compressed, memory-mapped segment files for large search payloads.
+
+Payloads are compressed one by one with zlib primed with a shared dictionary
+of the strings every Tavily response repeats, then appended to
+size-capped segment files. The caller keeps the returned reference
+("segment:offset:length") in its own SQLite index; reads mmap the segment
+and decompress only the requested slice. compact() copies the still
+referenced payloads into fresh segments and deletes the old files.
+"""
+
+import glob
+import mmap
+import os
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, Optional
+from utils.cassette import cassette_cache_settings
+from logger.logger import get_logger
+
+logger = get_logger("segment_store")
+
+# Strings that recur in Tavily payloads and IPO coverage; zlib favours the end of the dictionary
+ZDICT = (
+    b' IPO allotment status anchor investors registrar listing date NSE BSE SME mainboard'
+    b' lot size shares issue size crore fresh issue offer for sale price band per share'
+    b' subscribed times QIB NII HNI retail investors employee portion day 1 day 2 day 3'
+    b' grey market premium GMP today expected listing gain per cent percent Rs '
+    b'\xe2\x82\xb9 Limited Ltd India stock market Sensex Nifty share price'
+    b'{"query": "", "follow_up_questions": null, "answer": null, "images": [], "results": ['
+    b'{"url": "https://www.", "title": "", "content": "", "score": 0., "raw_content": null}, '
+    b'"published_date": "", "response_time": 1., "request_id": "'
+)
+DICT_VERSION = 1
+_MAGIC = b"TSEG" + bytes([DICT_VERSION])
+_SEGMENT_RE = re.compile(r"segment-(\d+)\.seg$")
+
+
+class SegmentStore:
+    """Append-only compressed payload segments with lazy, mmap-backed reads"""
+
+    def __init__(self, directory: str, max_segment_bytes: int = 32 * 1024 * 1024, level: int = 6):
+        """
+        Args:
+            directory (str): Directory holding the segment files
+            max_segment_bytes (int): A new segment is started once the active one reaches this size
+            level (int): zlib compression level
+        """
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.level = level
+
+        self.puts = 0
+        self.reads = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+        self._lock = threading.RLock()
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._files: Dict[int, object] = {}
+        self._active: Optional[int] = None
+        self._writer = None
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict], directory: str) -> "SegmentStore":
+        """Build a store from a segment_store section, with the owner's default directory"""
+        settings = settings or {}
+        return cls(
+            directory=settings.get("directory", directory),
+            max_segment_bytes=settings.get("max_segment_bytes", 32 * 1024 * 1024),
+            level=settings.get("level", 6),
+        )
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.seg")
+
+    def _segments(self) -> list:
+        return sorted(
+            int(match.group(1))
+            for match in (_SEGMENT_RE.search(path) for path in glob.glob(os.path.join(self.directory, "segment-*.seg")))
+            if match
+        )
+
+    def _open_writer(self, segment: int) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self._writer = open(self._path(segment), "ab")
+        if self._writer.tell() == 0:
+            self._writer.write(_MAGIC)
+            self._writer.flush()
+        self._active = segment
+
+    def _writer_for(self, size: int):
+        """Writer for the active segment, rolling over to a new one when it is full"""
+        if self._writer is None:
+            segments = self._segments()
+            self._open_writer(segments[-1] if segments else 1)
+        if self._writer.tell() > len(_MAGIC) and self._writer.tell() + size > self.max_segment_bytes:
+            self._open_writer(self._active + 1)
+        return self._writer
+
+    @staticmethod
+    def compress(data: bytes, level: int = 6) -> bytes:
+        compressor = zlib.compressobj(level, zdict=ZDICT)
+        return compressor.compress(data) + compressor.flush()
+
+    @staticmethod
+    def decompress(blob: bytes) -> bytes:
+        decompressor = zlib.decompressobj(zdict=ZDICT)
+        return decompressor.decompress(blob) + decompressor.flush()
+
+    def _append(self, blob: bytes) -> str:
+        writer = self._writer_for(len(blob))
+        offset = writer.tell()
+        writer.write(blob)
+        writer.flush()
+        return f"{self._active}:{offset}:{len(blob)}"
+
+    def put(self, data: bytes) -> str:
+        """
+        Compress and append a payload
+
+        Args:
+            data (bytes): Raw payload (e.g. UTF-8 JSON)
+
+        Returns:
+            str: Reference to pass to get()
+        """
+        blob = self.compress(data, self.level)
+        with self._lock:
+            ref = self._append(blob)
+            self.puts += 1
+            self.raw_bytes += len(data)
+            self.compressed_bytes += len(blob)
+        return ref
+
+    def _map(self, segment: int, end: int) -> mmap.mmap:
+        """Memory map of a segment covering at least `end` bytes (remapped as the active segment grows)"""
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            handle = self._files.get(segment)
+            if handle is None:
+                handle = self._files[segment] = open(self._path(segment), "rb")
+            mapped = self._maps[segment] = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"Segment {segment} was written with another dictionary version")
+        return mapped
+
+    def _raw(self, ref: str) -> bytes:
+        segment, offset, length = (int(part) for part in ref.split(":"))
+        return self._map(segment, offset + length)[offset:offset + length]
+
+    def get(self, ref: str) -> Optional[bytes]:
+        """
+        Read and decompress one payload
+
+        Args:
+            ref (str): Reference returned by put()
+
+        Returns:
+            bytes: The raw payload, or None if the segment is gone or the bytes are corrupt
+        """
+        try:
+            with self._lock:
+                blob = self._raw(ref)
+                self.reads += 1
+            return self.decompress(blob)
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"Unreadable segment payload {ref}: {e}")
+            return None
+
+    def _release(self, segment: int) -> None:
+        mapped = self._maps.pop(segment, None)
+        if mapped is not None:
+            mapped.close()
+        handle = self._files.pop(segment, None)
+        if handle is not None:
+            handle.close()
+
+    def compact(self, live_refs: Iterable[str]) -> Dict[str, str]:
+        """
+        Copy the still referenced payloads into fresh segments and delete every older segment
+
+        Args:
+            live_refs (Iterable): References the owner still points to
+
+        Returns:
+            dict: Old reference -> new reference for every live payload that could be read
+        """
+        with self._lock:
+            old_segments = self._segments()
+            if not old_segments:
+                return {}
+            self._open_writer(old_segments[-1] + 1)
+            moved: Dict[str, str] = {}
+            for ref in dict.fromkeys(live_refs):
+                try:
+                    blob = self._raw(ref)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Dropping unreadable payload {ref} during compaction: {e}")
+                    continue
+                moved[ref] = self._append(bytes(blob))
+            for segment in old_segments:
+                self._release(segment)
+                os.remove(self._path(segment))
+            logger.info(f"Compacted {len(old_segments)} segments, kept {len(moved)} payloads")
+        return moved
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(self._path(segment)) for segment in self._segments())
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "segments": len(self._segments()),
+                "disk_bytes": self.disk_bytes(),
+                "puts": self.puts,
+                "reads": self.reads,
+                "compression_ratio": round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else None,
+            }
+
+    def close(self) -> None:
+        """Close the writer and every memory map; they are reopened on next use"""
+        with self._lock:
+            for segment in list(self._maps) + list(self._files):
+                self._release(segment)
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._active = None
+
+
+def segment_store_for(section: str, default_directory: str) -> Optional[SegmentStore]:
+    """
+    Segment store configured under `<section>.segment_store` in config/config.yaml
+
+    Args:
+        section (str): Owning config section, e.g. "search_cache"
+        default_directory (str): Directory used when the config names none
+
+    Returns:
+        SegmentStore: The store, or None when compressed payloads are disabled for that section
+            or the cassette is recording or replaying
+    """
+    settings = cassette_cache_settings(section).get("segment_store") or {}
+    if not settings.get("enabled", False):
+        return None
+    return SegmentStore.from_config(settings, default_directory)
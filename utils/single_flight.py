@@ -0,0 +1,151 @@
+"""
+Request coalescing ("single-flight") for identical in-flight calls.
+
+When several threads or coroutines ask for the same key at once, only the
+first one runs the call; the others wait for it and receive the same result
+(or exception). Nothing is cached once the call finishes.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """One in-flight synchronous call and the threads waiting on it"""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self, name: str = "default"):
+        """
+        Args:
+            name (str): Label used in stats
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key (Hashable): Identity of the call
+            fn (Callable): Zero-argument function performing the call
+
+        Returns:
+            Any: The result of the (possibly shared) call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async counterpart of do(); calls are coalesced per event loop
+
+        Args:
+            key (Hashable): Identity of the call
+            fn (Callable): Zero-argument coroutine function performing the call
+
+        Returns:
+            Any: The result of the (possibly shared) call
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            future = self._async_calls.get(flight_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_calls[flight_key] = future
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            # Shield so a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._async_calls.pop(flight_key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """How many calls ran vs. were served by another caller's in-flight call"""
+        with self._lock:
+            total = self.executed + self.shared
+            return {
+                "executed": self.executed,
+                "shared": self.shared,
+                "shared_rate": self.shared / total if total else 0.0,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """
+    Return the process-wide single-flight group for a call path
+
+    Args:
+        name (str): Group name, e.g. 'search' or 'rewrite'
+
+    Returns:
+        SingleFlight: Group shared by every caller in the process
+    """
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
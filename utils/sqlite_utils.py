@@ -0,0 +1,36 @@
+import os
+import sqlite3
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database shared between threads of this process
+
+    Args:
+        path (str): Database file, created with its parent directory if missing,
+            or ":memory:" for a private in-memory database
+
+    Returns:
+        sqlite3.Connection: Connection usable from any thread (callers serialize access)
+    """
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def ensure_column(conn: sqlite3.Connection, table: str, column: str, declaration: str) -> None:
+    """
+    Add a column to an existing table if a database created by an older version lacks it
+
+    Args:
+        conn (sqlite3.Connection): Open connection
+        table (str): Table name
+        column (str): Column name
+        declaration (str): Column type and constraints, e.g. "TEXT"
+    """
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
@@ -0,0 +1,250 @@
+"""
+Subscription-status time series per IPO.
+
+Every subscription figure extracted from search results (total, QIB, NII,
+retail, employee) is appended as one fixed-size sample to a binary file per
+company, several times a day while an issue is open. Day-wise growth,
+category ratios and a projected final subscription are vectorized NumPy
+computations over that series, so the most-asked live metric is served
+locally instead of by another search and LLM parse.
+"""
+
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from utils.cassette import cassette_cache_settings
+from utils.gmp_history import IST_OFFSET_SECONDS, parse_observed_at
+from utils.ipo_extractor import IPORecord
+from utils.ipo_store import company_key
+
+# Columns of a sample besides its timestamp; NaN where a figure was not reported
+CATEGORIES = ("total", "QIB", "NII", "Retail", "Employee")
+SAMPLE_DTYPE = np.dtype([("ts", "<f8")] + [(name, "<f4") for name in CATEGORIES])
+
+# Bids are accepted until 5 PM IST on the closing day
+_CLOSE_SECONDS = 17 * 60 * 60
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry the last reported value forward over NaN gaps, column by column"""
+    rows = np.arange(len(values))[:, None]
+    last_seen = np.maximum.accumulate(np.where(np.isnan(values), 0, rows), axis=0)
+    return values[last_seen, np.arange(values.shape[1])]
+
+
+class SubscriptionHistory:
+    """Memory-mappable, append-only subscription samples with vectorized summaries"""
+
+    def __init__(self, directory: str = ".cache/subscription_history", min_interval_seconds: int = 5 * 60, max_age_seconds: int = 5 * 60):
+        """
+        Args:
+            directory (str): Directory holding one .sub file per company
+            min_interval_seconds (int): Unchanged figures are only re-recorded after this long
+            max_age_seconds (int): How long the newest sample answers questions without a new search
+        """
+        self.directory = directory
+        self.min_interval_seconds = min_interval_seconds
+        self.max_age_seconds = max_age_seconds
+        self.appended = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._last: Dict[str, Tuple[float, tuple]] = {}
+
+    @classmethod
+    def from_config(cls, settings: Optional[dict] = None) -> "SubscriptionHistory":
+        """Build a history from the subscription_history section of config/config.yaml"""
+        settings = settings or {}
+        return cls(
+            directory=settings.get("directory", ".cache/subscription_history"),
+            min_interval_seconds=settings.get("min_interval_seconds", 5 * 60),
+            max_age_seconds=settings.get("max_age_seconds", 5 * 60),
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key.replace(' ', '_')}.sub")
+
+    def _samples(self, key: str) -> np.ndarray:
+        """All samples of a company, memory-mapped (empty array if none)"""
+        path = self._path(key)
+        if not os.path.exists(path) or os.path.getsize(path) < SAMPLE_DTYPE.itemsize:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        count = os.path.getsize(path) // SAMPLE_DTYPE.itemsize
+        return np.memmap(path, dtype=SAMPLE_DTYPE, mode="r", shape=(count,))
+
+    @staticmethod
+    def _values(sample: np.ndarray) -> tuple:
+        return tuple(None if np.isnan(sample[name]) else float(sample[name]) for name in CATEGORIES)
+
+    def _last_sample(self, key: str) -> Optional[Tuple[float, tuple]]:
+        if key not in self._last:
+            samples = self._samples(key)
+            if len(samples):
+                newest = samples[np.argmax(samples["ts"])]
+                self._last[key] = (float(newest["ts"]), self._values(newest))
+        return self._last.get(key)
+
+    def append(self, company: str, total: Optional[float] = None, categories: Optional[Dict[str, float]] = None,
+               observed_at: Optional[float] = None) -> bool:
+        """
+        Append one subscription sample
+
+        Args:
+            company (str): Company name
+            total (float): Overall subscription (times)
+            categories (dict): Subscription (times) per category: QIB, NII, Retail, Employee
+            observed_at (float): Observation time in epoch seconds (defaults to now)
+
+        Returns:
+            bool: True if written, False if empty or a repeat of the latest sample within min_interval_seconds
+        """
+        key = company_key(company) if company else ""
+        figures = {"total": total, **(categories or {})}
+        if not key or all(figures.get(name) is None for name in CATEGORIES):
+            return False
+        observed_at = observed_at or time.time()
+        sample = np.array(
+            [(observed_at, *(np.nan if figures.get(name) is None else figures[name] for name in CATEGORIES))],
+            dtype=SAMPLE_DTYPE,
+        )
+        values = self._values(sample[0])
+        with self._lock:
+            last = self._last_sample(key)
+            if last is not None and abs(observed_at - last[0]) < self.min_interval_seconds and values == last[1]:
+                self.skipped += 1
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(key), "ab") as f:
+                f.write(sample.tobytes())
+            if last is None or observed_at >= last[0]:
+                self._last[key] = (observed_at, values)
+            self.appended += 1
+        return True
+
+    def append_records(self, records: Iterable[Any], now: Optional[float] = None) -> int:
+        """
+        Append the subscription figures of extracted IPO records; for a company seen twice
+        the first record wins (records arrive in search rank order)
+
+        Args:
+            records (Iterable): IPORecord instances or record dicts
+            now (float): Observation time for records without a published date
+
+        Returns:
+            int: Number of samples written
+        """
+        written = 0
+        seen = set()
+        for record in records:
+            data = record.to_dict() if isinstance(record, IPORecord) else dict(record)
+            company = data.get("company")
+            total, categories = data.get("subscription_times"), data.get("subscription_by_category") or {}
+            if not company or (total is None and not categories) or company_key(company) in seen:
+                continue
+            seen.add(company_key(company))
+            observed_at = parse_observed_at(data.get("published_date"), now)
+            written += self.append(company, total, categories, observed_at)
+        return written
+
+    def series(self, company: str) -> np.ndarray:
+        """Subscription samples of a company in time order (structured array, NaN for unreported figures)"""
+        return np.sort(self._samples(company_key(company)), order="ts")
+
+    def is_fresh(self, company: str, now: Optional[float] = None) -> bool:
+        """Whether the newest sample was observed within max_age_seconds"""
+        last = self._last_sample(company_key(company))
+        return last is not None and (now or time.time()) - last[0] <= self.max_age_seconds
+
+    def summary(self, company: str, close_date: Optional[str] = None, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Latest subscription with day-wise growth, category ratios and a projected final figure
+
+        Args:
+            company (str): Company name
+            close_date (str): ISO closing date of the issue, enabling the projection while it is open
+            now (float): Current time (defaults to now)
+
+        Returns:
+            dict: latest figures per category, IST day-wise closing totals and their growth multiples,
+                  each category's ratio to retail, and a linear projection of the final total
+                  subscription (None once the issue has closed); None if there are no samples
+        """
+        samples = self.series(company)
+        if not len(samples):
+            return None
+        ts = samples["ts"]
+        values = _forward_fill(np.column_stack([samples[name].astype(np.float64) for name in CATEGORIES]))
+        latest = dict(zip(CATEGORIES, values[-1]))
+
+        # Closing figures of each IST day
+        days = np.floor((ts + IST_OFFSET_SECONDS) / 86400).astype(np.int64)
+        day_ends = np.flatnonzero(np.r_[days[1:] != days[:-1], True])
+        daily_total = values[day_ends, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth = daily_total[1:] / daily_total[:-1]
+            ratios = values[-1, 1:] / values[-1, CATEGORIES.index("Retail")]
+
+        projected = None
+        now = now or time.time()
+        total = values[:, 0]
+        if close_date and not np.isnan(total[-1]):
+            close_day = date.fromisoformat(close_date).toordinal() - _EPOCH_ORDINAL
+            closes_at = close_day * 86400 - IST_OFFSET_SECONDS + _CLOSE_SECONDS
+            remaining_days = (closes_at - ts[-1]) / 86400
+            if closes_at > now and remaining_days > 0:
+                known = ~np.isnan(total)
+                elapsed = (ts[known] - ts[known][0]) / 86400
+                rate = float(np.polyfit(elapsed, total[known], 1)[0]) if known.sum() > 1 and elapsed[-1] > 0 else 0.0
+                projected = float(total[-1] + max(rate, 0.0) * remaining_days)
+
+        def rounded(value: float) -> Optional[float]:
+            return None if np.isnan(value) else round(float(value), 2)
+
+        return {
+            "company": company,
+            "samples": int(len(samples)),
+            "as_of": float(ts[-1]),
+            "latest": {name: rounded(value) for name, value in latest.items()},
+            "daily_totals": [
+                {"date": date.fromordinal(_EPOCH_ORDINAL + int(days[i])).isoformat(), "total": rounded(values[i, 0])}
+                for i in day_ends
+            ],
+            "day_growth": [rounded(value) for value in growth],
+            "ratio_to_retail": {name: rounded(value) for name, value in zip(CATEGORIES[1:], ratios) if name != "Retail"},
+            "projected_final": rounded(projected) if projected is not None else None,
+        }
+
+    def companies(self) -> List[str]:
+        """Company keys with recorded history"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4].replace("_", " ") for name in os.listdir(self.directory) if name.endswith(".sub"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"companies": len(self.companies()), "appended": self.appended, "skipped": self.skipped}
+
+
+_subscription_history: Optional[SubscriptionHistory] = None
+_subscription_history_loaded = False
+_subscription_history_lock = threading.Lock()
+
+
+def get_subscription_history() -> Optional[SubscriptionHistory]:
+    """
+    Return the process-wide subscription history configured in config/config.yaml
+
+    Returns:
+        SubscriptionHistory: The shared history, or None when disabled in config
+    """
+    global _subscription_history, _subscription_history_loaded
+    if not _subscription_history_loaded:
+        with _subscription_history_lock:
+            if not _subscription_history_loaded:
+                settings = cassette_cache_settings("subscription_history", in_memory=False)
+                if settings.get("enabled", True):
+                    _subscription_history = SubscriptionHistory.from_config(settings)
+                _subscription_history_loaded = True
+    return _subscription_history